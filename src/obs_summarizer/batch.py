@@ -0,0 +1,222 @@
+"""Anthropic Message Batches mode for large backlogs."""
+
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from obs_summarizer.llm import claude_message_params, claude_response, get_claude_api_key
+from obs_summarizer.metrics import BATCH_PRICE_FACTOR, RunMetrics, note_usage
+from obs_summarizer.reader import read_note
+from obs_summarizer.retry import RetryPolicy, create_retry_policy
+from obs_summarizer.scanner import FileRecord
+from obs_summarizer.state import save_state
+from obs_summarizer.summarizer import TRUNCATION_MARKER, build_summary_prompt, parse_summary
+from obs_summarizer.tokens import create_input_budget
+
+logger = logging.getLogger(__name__)
+
+# Message Batches API limits per batch: request count and total size
+MAX_BATCH_REQUESTS = 100_000
+MAX_BATCH_BYTES = 256_000_000
+
+
+def run_summary_batch(
+    config: Dict,
+    pending: List[Tuple[str, FileRecord, Optional[str]]],
+    state: Dict[str, Any],
+    metrics: Optional[RunMetrics] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Summarize cache-missing notes as Message Batches jobs.
+
+    Notes are split into as many batches as the API's request count and
+    size limits require. Each batch's ID and the notes it covers are
+    written to the state file as soon as it is created. If state already
+    holds batches (a previous run was interrupted while submitting or
+    polling), those are resumed instead of submitting new ones, and notes
+    they didn't cover are left for the next run or the synchronous path.
+
+    Notes whose batch result failed or didn't parse are not returned; the
+    caller falls back to the normal per-note path for them.
+
+    Args:
+        config: Configuration dict (claude backend)
+        pending: (cache_key, record, normalized text or None) for cache misses
+        state: Pipeline state dict, updated and saved in place
+        metrics: Optional run metrics to record result usage in
+
+    Returns:
+        {cache_key: summary} for every note the batch summarized, including
+        notes from resumed batches that this run no longer targets
+
+    Raises:
+        ValueError: If the configured backend is not claude
+    """
+    import anthropic
+
+    if config["llm_backend"] != "claude":
+        raise ValueError("Batch mode requires llm_backend: claude")
+
+    client = anthropic.Anthropic(
+        api_key=get_claude_api_key(), timeout=config.get("llm_timeout", 60)
+    )
+    state_path = config["state_path"]
+    # A transient error while polling must not abandon batches still processing
+    policy = create_retry_policy(config, (anthropic.RateLimitError, anthropic.APIConnectionError))
+
+    batches = _stored_batches(state)
+    if batches:
+        resumed = sum(len(batch["notes"]) for batch in batches)
+        logger.info(f"Resuming {len(batches)} message batch(es) ({resumed} notes)")
+    else:
+        for requests, notes in _split_requests(_build_requests(config, pending, metrics)):
+            batches.append(_submit_batch(client, requests, notes))
+            # Checkpoint each batch as it is created, so none is orphaned
+            state["batch"] = batches
+            save_state(state, state_path)
+        if not batches:
+            return {}
+
+    # Collect only once every batch has ended: results not yet cached
+    # must stay resumable until the caller gets them
+    for batch in batches:
+        _wait_for_batch(client, batch["id"], config.get("batch_poll_interval", 30), policy)
+    summaries = {}
+    for batch in batches:
+        found = _collect_results(client, batch, metrics)
+        logger.info(f"Message batch {batch['id']}: {len(found)}/{len(batch['notes'])} summarized")
+        summaries.update(found)
+
+    # The batches have been consumed; a later run must not resume them again
+    state.pop("batch", None)
+    save_state(state, state_path)
+    return summaries
+
+
+def _stored_batches(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Batches recorded in state by an interrupted run."""
+    stored = state.get("batch")
+    if isinstance(stored, dict):
+        # A single batch, as recorded before batches were split
+        return [stored]
+    return list(stored or [])
+
+
+def _build_requests(
+    config: Dict,
+    pending: List[Tuple[str, FileRecord, Optional[str]]],
+    metrics: Optional[RunMetrics] = None,
+) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """One (batch request, [path, mtime_utc]) per distinct cache key."""
+    model = config.get("claude_model", "claude-sonnet-4-6")
+    cache_system = config.get("prompt_caching", True)
+    max_input_chars = config["max_input_chars"]
+    budget = create_input_budget(config)
+
+    built: List[Tuple[Dict[str, Any], List[str]]] = []
+    seen = set()
+    for cache_key, record, text in pending:
+        if cache_key in seen:
+            continue
+        seen.add(cache_key)
+        if text is None:
+            try:
+                text = read_note(record.path, max_input_chars, budget)
+            except OSError as e:
+                logger.warning(f"Failed to read {record.path.name}: {e}. Skipping.")
+                continue
+        if metrics is not None:
+            metrics.record_input(budget.estimate(text), text.endswith(TRUNCATION_MARKER))
+        system, user = build_summary_prompt(text, record.path.stem)
+        # SHA256 hex cache keys satisfy the custom_id format (<= 64 chars, [a-zA-Z0-9_-])
+        params = claude_message_params(model, system, user, cache_system)
+        built.append(
+            ({"custom_id": cache_key, "params": params}, [str(record.path), record.mtime.isoformat()])
+        )
+    return built
+
+
+def _split_requests(
+    built: List[Tuple[Dict[str, Any], List[str]]],
+) -> List[Tuple[List[Dict[str, Any]], Dict[str, List[str]]]]:
+    """Group requests into batches within MAX_BATCH_REQUESTS and MAX_BATCH_BYTES."""
+    groups: List[Tuple[List[Dict[str, Any]], Dict[str, List[str]]]] = []
+    requests: List[Dict[str, Any]] = []
+    notes: Dict[str, List[str]] = {}
+    size = 0
+    for request, note in built:
+        # Serialized size plus a separator, as sent in the request body
+        request_size = len(json.dumps(request).encode("utf-8")) + 1
+        if requests and (len(requests) >= MAX_BATCH_REQUESTS or size + request_size > MAX_BATCH_BYTES):
+            groups.append((requests, notes))
+            requests, notes, size = [], {}, 0
+        requests.append(request)
+        notes[request["custom_id"]] = note
+        size += request_size
+    if requests:
+        groups.append((requests, notes))
+    return groups
+
+
+def _submit_batch(
+    client: Any, requests: List[Dict[str, Any]], notes: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    """Create one batch and return the state entry describing it."""
+    created = client.messages.batches.create(requests=requests)
+    logger.info(f"Submitted message batch {created.id} with {len(requests)} notes")
+    return {
+        "id": created.id,
+        "created_iso": datetime.now(timezone.utc).isoformat(),
+        "notes": notes,
+    }
+
+
+def _wait_for_batch(client: Any, batch_id: str, poll_interval: float, policy: RetryPolicy) -> None:
+    """Poll until the batch has finished processing, retrying transient errors."""
+    while True:
+        batch, _ = policy.run(partial(client.messages.batches.retrieve, batch_id))
+        if batch.processing_status == "ended":
+            return
+        counts = batch.request_counts
+        logger.info(
+            f"Batch {batch_id}: {counts.processing} processing, {counts.succeeded} succeeded, "
+            f"{counts.errored} errored. Checking again in {poll_interval}s"
+        )
+        time.sleep(poll_interval)
+
+
+def _collect_results(
+    client: Any, batch: Dict[str, Any], metrics: Optional[RunMetrics]
+) -> Dict[str, Dict[str, Any]]:
+    """Parse succeeded results into summaries with path/mtime metadata."""
+    summaries = {}
+    for entry in client.messages.batches.results(batch["id"]):
+        note = batch["notes"].get(entry.custom_id)
+        if note is None:
+            continue
+        path, mtime_utc = note
+
+        if entry.result.type != "succeeded":
+            logger.warning(f"Batch request for {path} {entry.result.type}. Retrying individually.")
+            continue
+        response = claude_response(entry.result.message)
+        usage = None
+        if metrics is not None:
+            usage_before = metrics.thread_usage()
+            metrics.record_response(response, BATCH_PRICE_FACTOR)
+            usage = note_usage(usage_before, metrics.thread_usage(), metrics.model)
+        try:
+            summary = parse_summary(response.content)
+        except ValueError as e:
+            logger.warning(f"Failed to parse batch summary for {path}: {e}. Retrying individually.")
+            continue
+
+        # Add metadata
+        if usage is not None:
+            summary["usage"] = usage
+        summary["path"] = path
+        summary["mtime_utc"] = mtime_utc
+        summaries[entry.custom_id] = summary
+    return summaries
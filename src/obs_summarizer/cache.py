@@ -3,60 +3,772 @@
 import hashlib
 import json
 import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from obs_summarizer.records import RecordFormat, create_record_format, decode_record
+from obs_summarizer.state import write_json_atomic
 
 logger = logging.getLogger(__name__)
 
 
-def make_cache_key(file_path: str, mtime_ns: int) -> str:
-    """Generate cache key from file path and nanosecond mtime.
+INDEX_FILENAME = "index.json"
+SQLITE_FILENAME = "summaries.sqlite3"
+CACHE_BACKENDS = ("sqlite", "json")
+
+# File suffix of encoded records in a JSON-directory cache, and of the
+# pretty-printed JSON entries written before records existed
+RECORD_SUFFIX = ".rec"
+LEGACY_SUFFIX = ".json"
+
+SQLITE_SCHEMA_VERSION = 1
+
+# Keys per SELECT ... IN (...), well under SQLite's bound-parameter limit
+_SQLITE_LOOKUP_CHUNK = 500
+
+
+class CacheEntry(NamedTuple):
+    """One stored summary as seen by cache GC."""
+
+    key: str
+    size: int
+    accessed_at: float
+
+
+class MigrateResult(NamedTuple):
+    """Outcome of SummaryCache.migrate."""
+
+    converted: int
+    unreadable: int
+    bytes_before: int
+    bytes_after: int
+
+
+class MemoryStats(NamedTuple):
+    """Counters of a MemoryCache since it was created."""
+
+    hits: int
+    misses: int
+    entries: int
+    max_entries: int
+
+
+class PruneResult(NamedTuple):
+    """Outcome of a prune_cache call."""
+
+    removed: int
+    freed_bytes: int
+    remaining: int
+    remaining_bytes: int
+
+
+def make_cache_key(content: str, model: str, prompt_version: str) -> str:
+    """Generate a content-addressed cache key.
+
+    The key depends only on what is actually sent to the LLM, so touching,
+    re-syncing or moving a note keeps its summary.
+
+    Args:
+        content: Normalized note content (frontmatter stripped, truncated)
+        model: Model name the summary is produced with
+        prompt_version: Version of the summary prompt
+
+    Returns:
+        SHA256 hex digest
+    """
+    digest = hashlib.sha256(f"{prompt_version}\0{model}\0".encode())
+    digest.update(content.encode("utf-8", errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+def legacy_cache_key(file_path: str, mtime_ns: int) -> str:
+    """Key summaries were cached under before keys followed note content.
 
     Args:
         file_path: Full path to markdown file
         mtime_ns: File modification time in nanoseconds
 
     Returns:
-        SHA256 hex digest
+        SHA256 hex digest of "<path>:<mtime_ns>"
     """
-    key_input = f"{file_path}:{mtime_ns}"
-    return hashlib.sha256(key_input.encode()).hexdigest()
+    return hashlib.sha256(f"{file_path}:{mtime_ns}".encode()).hexdigest()
 
 
-def load_cache(cache_dir: str, cache_key: str) -> Optional[Dict[str, Any]]:
-    """Load cached summary from disk.
+def load_key_index(cache_dir: str) -> Dict[str, List[Any]]:
+    """Load the path -> cache key index used to skip re-hashing.
+
+    Entries are [size, mtime_ns, salt, cache_key]; a note whose size and
+    mtime still match (and whose salt, covering model/prompt/truncation
+    settings, is unchanged) reuses its key without being read.
 
     Args:
         cache_dir: Cache directory path
-        cache_key: Cache key (from make_cache_key)
 
     Returns:
-        Cached summary dict, or None if missing/corrupt
+        Index dict, empty if missing/corrupt
     """
-    cache_path = Path(cache_dir) / f"{cache_key}.json"
+    index_path = Path(cache_dir) / INDEX_FILENAME
 
-    if not cache_path.exists():
-        return None
+    if not index_path.exists():
+        return {}
 
     try:
-        with open(cache_path, "r", encoding="utf-8") as f:
+        with open(index_path, "r", encoding="utf-8") as f:
             return json.load(f)
     except (json.JSONDecodeError, IOError) as e:
-        logger.warning(f"Failed to load cache {cache_key}: {e}. Regenerating.")
-        return None
+        logger.warning(f"Failed to load cache index: {e}. Rehashing notes.")
+        return {}
 
 
-def save_cache(cache_dir: str, cache_key: str, data: Dict[str, Any]) -> None:
-    """Save summary to cache.
+def save_key_index(cache_dir: str, index: Dict[str, List[Any]]) -> None:
+    """Save the path -> cache key index atomically.
 
     Args:
         cache_dir: Cache directory path
-        cache_key: Cache key (from make_cache_key)
-        data: Summary data to cache
+        index: Index dict from load_key_index
+    """
+    write_json_atomic(Path(cache_dir) / INDEX_FILENAME, index, separators=(",", ":"))
+
+
+def _write_atomic(path: Path, payload: bytes, fsync: bool) -> None:
+    """Write payload to path via a temp file in the same directory plus rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        mode="wb", dir=path.parent, delete=False, prefix=".", suffix=".tmp"
+    ) as tmp:
+        tmp_path = Path(tmp.name)
+        try:
+            tmp.write(payload)
+            if fsync:
+                tmp.flush()
+                os.fsync(tmp.fileno())
+        except BaseException:
+            tmp.close()
+            tmp_path.unlink()
+            raise
+
+    tmp_path.replace(path)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Make renames in a directory durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _touch_file(path: Path) -> bool:
+    """Set a file's mtime to now; False if it couldn't be (e.g. it's gone)."""
+    try:
+        os.utime(path)
+    except OSError:
+        return False
+    return True
+
+
+class MemoryCache:
+    """Bounded in-process LRU of summaries by cache key, safe across threads.
+
+    open_cache keeps one per cache directory for the life of the process,
+    so repeated runs in a long-lived process (a scheduler, a library user
+    calling run_pipeline in a loop) serve repeat lookups without touching
+    disk. Keys are content-addressed, so an entry never goes stale; it only
+    leaves on eviction or when deleted from the cache.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up keys, counting hits and misses and refreshing recency."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                data = self._entries.get(key)
+                if data is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = data
+                self.hits += 1
+        return found
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Add or refresh entries, evicting the least recently used past max_entries."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, data in items.items():
+                self._entries[key] = data
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_many(self, keys: Iterable[str]) -> None:
+        """Drop entries; unknown keys are ignored."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def resize(self, max_entries: int) -> None:
+        """Change the size bound, evicting down to it."""
+        with self._lock:
+            self.max_entries = max_entries
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+
+    def stats(self) -> MemoryStats:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return MemoryStats(self.hits, self.misses, len(self._entries), self.max_entries)
+
+
+# One MemoryCache per resolved cache directory, shared by every open_cache call
+_memory_caches: Dict[str, MemoryCache] = {}
+_memory_caches_lock = threading.Lock()
+
+
+def memory_cache(cache_dir: str, max_entries: int) -> MemoryCache:
+    """The process-wide MemoryCache for cache_dir, created or resized to max_entries."""
+    location = str(Path(cache_dir).resolve())
+    with _memory_caches_lock:
+        memory = _memory_caches.get(location)
+        if memory is None:
+            memory = _memory_caches[location] = MemoryCache(max_entries)
+        elif memory.max_entries != max_entries:
+            memory.resize(max_entries)
+    return memory
+
+
+class SummaryCache(ABC):
+    """Summary cache backend: a key -> summary dict store.
+
+    Keys come from make_cache_key. Backends implement _load_many,
+    _store_many, entries and _delete_many; single-key get/put are
+    conveniences on top of get_many/put_many. An optional MemoryCache
+    sits in front of the backend for reads and is kept current on writes.
+    Memory hits don't read storage, but their access times are still
+    recorded (batched, on flush or close) so cache GC doesn't evict the
+    entries a long-running process uses most.
+
+    Writes are always atomic. By default they are left to the OS to flush;
+    with fsync_every, writes are group-committed instead: put_many holds
+    them (get_many still sees them) until fsync_every are pending, then
+    stores and fsyncs them together. fsync_every=0 commits once, on flush
+    or close.
+    """
+
+    def __init__(
+        self,
+        fsync_every: Optional[int] = None,
+        record_format: Optional[RecordFormat] = None,
+        memory: Optional[MemoryCache] = None,
+    ):
+        self.fsync_every = fsync_every
+        self.record_format = record_format or RecordFormat()
+        self.memory = memory
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Memory hits whose stored access time hasn't been updated yet
+        self._touched: Dict[str, None] = {}
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up several keys at once; missing or unreadable keys are left out."""
+        keys = list(dict.fromkeys(keys))
+        found = {key: self._pending[key] for key in keys if key in self._pending}
+        if self.memory is not None:
+            memory_hits = self.memory.get_many(key for key in keys if key not in found)
+            self._touched.update(dict.fromkeys(memory_hits))
+            found.update(memory_hits)
+        missing = [key for key in keys if key not in found]
+        if not missing:
+            return found
+        loaded = self._load_many(missing)
+        if self.memory is not None and loaded:
+            self.memory.put_many(loaded)
+        found.update(loaded)
+        return found
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        """Store several summaries, all-or-nothing where the backend allows."""
+        if self.memory is not None:
+            self.memory.put_many(items)
+        if self.fsync_every is None:
+            self._store_many(items, durable=False)
+            return
+        self._pending.update(items)
+        if self.fsync_every and len(self._pending) >= self.fsync_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Store and fsync every write held for group commit, and record access times."""
+        if self._pending:
+            self._store_many(self._pending, durable=True)
+            self._pending = {}
+        if self._touched:
+            self._touch_many(list(self._touched))
+            self._touched = {}
+
+    @abstractmethod
+    def _load_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several keys from storage."""
+
+    @abstractmethod
+    def _store_many(self, items: Dict[str, Dict[str, Any]], durable: bool) -> None:
+        """Write several summaries to storage, fsynced if durable."""
+
+    @abstractmethod
+    def _touch_many(self, keys: List[str]) -> None:
+        """Mark stored entries as accessed now; unknown keys are ignored."""
+
+    @abstractmethod
+    def entries(self) -> List[CacheEntry]:
+        """List every stored entry with its size and last access time."""
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove entries; unknown keys are ignored."""
+        keys = list(keys)
+        for key in keys:
+            self._pending.pop(key, None)
+            self._touched.pop(key, None)
+        if self.memory is not None:
+            self.memory.discard_many(keys)
+        self._delete_many(keys)
+
+    @abstractmethod
+    def _delete_many(self, keys: List[str]) -> None:
+        """Remove entries from storage."""
+
+    @abstractmethod
+    def migrate(self) -> MigrateResult:
+        """Re-encode every stored entry in record_format, keeping access times.
+
+        Entries already in the format are left alone; unreadable ones are
+        left for the normal corrupt-entry handling.
+        """
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up one key."""
+        return self.get_many([cache_key]).get(cache_key)
+
+    def put(self, cache_key: str, data: Dict[str, Any]) -> None:
+        """Store one summary."""
+        self.put_many({cache_key: data})
+
+    def close(self) -> None:
+        """Commit held writes and release any open handles."""
+        self.flush()
+
+    def __enter__(self) -> "SummaryCache":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class JsonDirCache(SummaryCache):
+    """A directory of binary records, one per key (cache_backend: json).
+
+    Files are <key>.rec records, or <key>.json plain JSON from before
+    records existed. Writes are always records; .json entries are read as
+    before and replaced when rewritten (or all at once by migrate). A file's mtime
+    doubles as its last access time: hits touch the file, since atime is
+    commonly disabled (noatime/relatime).
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        fsync_every: Optional[int] = None,
+        record_format: Optional[RecordFormat] = None,
+        memory: Optional[MemoryCache] = None,
+    ):
+        super().__init__(fsync_every, record_format, memory)
+        self.cache_dir = cache_dir
+
+    def _record_path(self, key: str) -> Path:
+        return Path(self.cache_dir) / f"{key}{RECORD_SUFFIX}"
+
+    def _legacy_path(self, key: str) -> Path:
+        return Path(self.cache_dir) / f"{key}{LEGACY_SUFFIX}"
+
+    def _load_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for key in keys:
+            for path in (self._record_path(key), self._legacy_path(key)):
+                try:
+                    found[key] = decode_record(path.read_bytes())
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Failed to load cache {key}: {e}. Regenerating.")
+                    break
+                _touch_file(path)
+                break
+        return found
+
+    def _touch_many(self, keys: List[str]) -> None:
+        for key in keys:
+            if not _touch_file(self._record_path(key)):
+                _touch_file(self._legacy_path(key))
+
+    def _store_many(self, items: Dict[str, Dict[str, Any]], durable: bool) -> None:
+        for key, data in items.items():
+            _write_atomic(self._record_path(key), self.record_format.encode(data), durable)
+            self._legacy_path(key).unlink(missing_ok=True)
+        if durable and items:
+            # One directory sync covers every rename in the group
+            _fsync_dir(Path(self.cache_dir))
+
+    def _entry_files(self) -> List[os.DirEntry]:
+        try:
+            with os.scandir(self.cache_dir) as it:
+                return [
+                    e
+                    for e in it
+                    if e.name.endswith(RECORD_SUFFIX)
+                    or (e.name.endswith(LEGACY_SUFFIX) and e.name != INDEX_FILENAME)
+                ]
+        except FileNotFoundError:
+            return []
+
+    def entries(self) -> List[CacheEntry]:
+        self.flush()
+        entries = []
+        for entry in self._entry_files():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append(CacheEntry(Path(entry.name).stem, st.st_size, st.st_mtime))
+        return entries
+
+    def _delete_many(self, keys: List[str]) -> None:
+        for key in keys:
+            self._record_path(key).unlink(missing_ok=True)
+            self._legacy_path(key).unlink(missing_ok=True)
+
+    def migrate(self) -> MigrateResult:
+        self.flush()
+        converted = unreadable = before = after = 0
+        durable = self.fsync_every is not None
+        for entry in self._entry_files():
+            path = Path(entry.path)
+            try:
+                st = entry.stat()
+                raw = path.read_bytes()
+                if self.record_format.matches(raw):
+                    continue
+                data = decode_record(raw)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot migrate cache entry {entry.name}: {e}")
+                unreadable += 1
+                continue
+
+            record_path = self._record_path(path.stem)
+            encoded = self.record_format.encode(data)
+            _write_atomic(record_path, encoded, durable)
+            os.utime(record_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            if path != record_path:
+                path.unlink()
+            converted += 1
+            before += st.st_size
+            after += len(encoded)
+        if durable and converted:
+            _fsync_dir(Path(self.cache_dir))
+        return MigrateResult(converted, unreadable, before, after)
+
+
+class SqliteCache(SummaryCache):
+    """All summaries in a single SQLite file.
+
+    Lookups for a whole run are a handful of indexed queries, and every
+    put_many is one transaction. The database runs in WAL mode so a reader
+    never blocks the writer. Each row carries its encoded size and last
+    access time for cache GC.
+
+    Commits are atomic either way. Without fsync_every the database runs
+    with synchronous=NORMAL and WAL commits reach disk at checkpoints; with
+    it, synchronous=FULL makes each group commit one WAL fsync.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        fsync_every: Optional[int] = None,
+        record_format: Optional[RecordFormat] = None,
+        memory: Optional[MemoryCache] = None,
+    ):
+        super().__init__(fsync_every, record_format, memory)
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._conn = self._connect()
+        except sqlite3.DatabaseError as e:
+            # Like a corrupt JSON entry, a corrupt database only costs re-summarizing
+            corrupt_path = db_path.with_name(db_path.name + ".corrupt")
+            logger.warning(f"Cache database {db_path} is unreadable: {e}. Moved to {corrupt_path}.")
+            db_path.replace(corrupt_path)
+            self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "PRAGMA synchronous=" + ("NORMAL" if self.fsync_every is None else "FULL")
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0, accessed_at REAL NOT NULL DEFAULT 0)"
+            )
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SQLITE_SCHEMA_VERSION:
+                self._migrate(conn)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS summaries_accessed_at ON summaries (accessed_at)"
+            )
+            conn.commit()
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Add GC columns to a database created before they existed."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(summaries)")}
+        if "size" not in columns:
+            conn.execute("ALTER TABLE summaries ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE summaries SET size = length(CAST(data AS BLOB))")
+        if "accessed_at" not in columns:
+            conn.execute("ALTER TABLE summaries ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            conn.execute("UPDATE summaries SET accessed_at = ?", (time.time(),))
+        conn.execute(f"PRAGMA user_version = {SQLITE_SCHEMA_VERSION}")
+
+    def _load_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), _SQLITE_LOOKUP_CHUNK):
+            chunk = keys[start : start + _SQLITE_LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, data FROM summaries WHERE key IN ({placeholders})", chunk
+            )
+            for key, data in rows:
+                try:
+                    found[key] = decode_record(data)
+                except ValueError as e:
+                    logger.warning(f"Failed to load cache {key}: {e}. Regenerating.")
+
+        # Record the hits for LRU eviction
+        if found:
+            self._touch_many(list(found))
+        return found
+
+    def _touch_many(self, keys: List[str]) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE summaries SET accessed_at = ? WHERE key = ?", [(now, key) for key in keys]
+            )
+
+    def _store_many(self, items: Dict[str, Dict[str, Any]], durable: bool) -> None:
+        now = time.time()
+        rows = []
+        for key, data in items.items():
+            encoded = self.record_format.encode(data)
+            rows.append((key, encoded, len(encoded), now))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO summaries (key, data, size, accessed_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def entries(self) -> List[CacheEntry]:
+        self.flush()
+        rows = self._conn.execute("SELECT key, size, accessed_at FROM summaries")
+        return [CacheEntry(*row) for row in rows]
+
+    def _delete_many(self, keys: List[str]) -> None:
+        with self._conn:
+            self._conn.executemany("DELETE FROM summaries WHERE key = ?", [(k,) for k in keys])
+
+    def migrate(self) -> MigrateResult:
+        self.flush()
+        converted = unreadable = before = after = 0
+        last_key = ""
+        while True:
+            rows = self._conn.execute(
+                "SELECT key, data FROM summaries WHERE key > ? ORDER BY key LIMIT ?",
+                (last_key, _SQLITE_LOOKUP_CHUNK),
+            ).fetchall()
+            if not rows:
+                break
+            last_key = rows[-1][0]
+
+            updates = []
+            for key, raw in rows:
+                if self.record_format.matches(raw):
+                    continue
+                try:
+                    encoded = self.record_format.encode(decode_record(raw))
+                except ValueError as e:
+                    logger.warning(f"Cannot migrate cache entry {key}: {e}")
+                    unreadable += 1
+                    continue
+                updates.append((encoded, len(encoded), key))
+                before += len(raw.encode("utf-8") if isinstance(raw, str) else raw)
+                after += len(encoded)
+            with self._conn:
+                self._conn.executemany("UPDATE summaries SET data = ?, size = ? WHERE key = ?", updates)
+            converted += len(updates)
+
+        if converted:
+            # Give the space freed by smaller records back to the filesystem
+            self._conn.execute("VACUUM")
+        return MigrateResult(converted, unreadable, before, after)
+
+    def import_json_dir(self, cache_dir: str) -> int:
+        """Copy entries from a JSON-directory cache into this database.
+
+        Args:
+            cache_dir: Directory holding <key>.rec or <key>.json files
+
+        Returns:
+            Number of entries imported
+        """
+        source = JsonDirCache(cache_dir)
+        items = source.get_many(entry.key for entry in source.entries())
+        if items:
+            self._store_many(items, durable=self.fsync_every is not None)
+        return len(items)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+
+def prune_cache(
+    cache: SummaryCache,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_age_days: Optional[float] = None,
+    dry_run: bool = False,
+    now: Optional[float] = None,
+) -> PruneResult:
+    """Evict cache entries by age, then least recently used first.
+
+    Entries not accessed within max_age_days are always removed. The rest
+    are kept most recently used first until max_entries or max_bytes would
+    be exceeded; that entry and every older one are evicted.
+
+    Args:
+        cache: Open summary cache
+        max_entries: Keep at most this many entries (None = no limit)
+        max_bytes: Keep at most this many stored bytes (None = no limit)
+        max_age_days: Remove entries unused for longer than this (None = no limit)
+        dry_run: Compute the result without deleting anything
+        now: Current time as a UNIX timestamp (defaults to time.time())
+
+    Returns:
+        PruneResult with removed/remaining counts and bytes
     """
-    cache_path = Path(cache_dir)
-    cache_path.mkdir(parents=True, exist_ok=True)
+    if now is None:
+        now = time.time()
+    cutoff = now - max_age_days * 86400 if max_age_days is not None else None
+
+    entries = sorted(cache.entries(), key=lambda e: e.accessed_at, reverse=True)
+    evicted = []
+    kept = 0
+    kept_bytes = 0
+    over_budget = False
+    for entry in entries:
+        if not over_budget:
+            over_budget = (max_entries is not None and kept + 1 > max_entries) or (
+                max_bytes is not None and kept_bytes + entry.size > max_bytes
+            )
+        if over_budget or (cutoff is not None and entry.accessed_at < cutoff):
+            evicted.append(entry)
+        else:
+            kept += 1
+            kept_bytes += entry.size
+
+    if evicted and not dry_run:
+        cache.delete_many(e.key for e in evicted)
+
+    return PruneResult(
+        removed=len(evicted),
+        freed_bytes=sum(e.size for e in evicted),
+        remaining=kept,
+        remaining_bytes=kept_bytes,
+    )
+
+
+def cache_limits(config: Dict[str, Any]) -> Dict[str, Any]:
+    """prune_cache keyword arguments from the cache_max_* config settings."""
+    return {
+        "max_entries": config.get("cache_max_entries"),
+        "max_bytes": config.get("cache_max_bytes"),
+        "max_age_days": config.get("cache_max_age_days"),
+    }
+
+
+def open_cache(config: Dict[str, Any]) -> SummaryCache:
+    """Open the configured summary cache backend.
+
+    A new SQLite cache imports any JSON entries already in cache_dir, so
+    switching backends doesn't throw away existing summaries. Unless
+    cache_memory_entries is 0, reads go through the process-wide
+    MemoryCache for cache_dir.
+
+    Args:
+        config: Configuration dict (cache_dir, cache_backend, cache_fsync_every,
+            cache_serializer, cache_compression, cache_memory_entries)
+
+    Returns:
+        Open SummaryCache; the caller closes it
+
+    Raises:
+        ValueError: If cache_backend or the record format is unknown, or
+            the record format needs a package that isn't installed
+    """
+    backend = config.get("cache_backend", "sqlite")
+    cache_dir = config["cache_dir"]
+    fsync_every = config.get("cache_fsync_every")
+    record_format = create_record_format(config)
+    memory_entries = config.get("cache_memory_entries", 10000)
+    memory = memory_cache(cache_dir, memory_entries) if memory_entries else None
+
+    if backend == "json":
+        return JsonDirCache(cache_dir, fsync_every, record_format, memory)
+
+    if backend == "sqlite":
+        db_path = Path(cache_dir) / SQLITE_FILENAME
+        is_new = not db_path.exists()
+        cache = SqliteCache(db_path, fsync_every, record_format, memory)
+        if is_new:
+            imported = cache.import_json_dir(cache_dir)
+            if imported:
+                logger.info(f"Imported {imported} JSON cache entries into {db_path}")
+        return cache
 
-    cache_file = cache_path / f"{cache_key}.json"
-    with open(cache_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    raise ValueError(f"Unknown cache_backend: {backend}. Must be one of {CACHE_BACKENDS}.")
@@ -0,0 +1,183 @@
+"""Circuit breaker around an LLM client."""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Connection failures and timeouts outside the SDKs' own error classes
+DEFAULT_FAILURE_TYPES: Tuple[Type[BaseException], ...] = (ConnectionError, TimeoutError)
+
+
+class BackendFailure(RuntimeError):
+    """An LLM call failed after its retries; the note is skipped, not the run."""
+
+    pass
+
+
+class CircuitOpenError(BackendFailure):
+    """Raised without calling the backend while the circuit is open."""
+
+    pass
+
+
+def is_backend_failure(
+    error: BaseException, failure_types: Tuple[Type[BaseException], ...] = DEFAULT_FAILURE_TYPES
+) -> bool:
+    """Whether error means the backend is unhealthy, not that one request was bad.
+
+    Only connection errors and timeouts (failure_types), 429 and server
+    errors (5xx, including Anthropic's 529) count. Anything else, client
+    errors and bugs alike, is not the backend's fault.
+    """
+    if isinstance(error, failure_types):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status == 429 or 500 <= status < 600)
+
+
+def _is_client_error(error: BaseException) -> bool:
+    """Whether error is a 4xx answer from the backend."""
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500
+
+
+class CircuitBreaker:
+    """Stops calling a backend that keeps failing, and probes it to recover.
+
+    Closed: calls go through; failure_threshold backend failures in a row
+    open the circuit. Open: calls fail at once with CircuitOpenError. Once
+    probe_seconds have passed, the next call is let through as a probe
+    (half-open): success closes the circuit, failure re-opens it for
+    another probe_seconds. Shared by every worker thread.
+
+    Args:
+        failure_threshold: Consecutive backend failures that open the circuit
+        probe_seconds: Seconds open before a probe call is allowed
+        failure_types: Error classes that count as backend failures
+            (the backend's connection/timeout errors)
+        clock: Monotonic clock, in seconds
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        probe_seconds: float = 60.0,
+        failure_types: Tuple[Type[BaseException], ...] = DEFAULT_FAILURE_TYPES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.probe_seconds = probe_seconds
+        self.failure_types = failure_types
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        # Times the circuit has opened (callers compare before/after a run)
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def _before_call(self) -> bool:
+        """Let a call through, or raise CircuitOpenError.
+
+        Returns:
+            True if the call is the half-open probe
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            waited = self._clock() - self._opened_at
+            if self._probing or waited < self.probe_seconds:
+                raise CircuitOpenError(
+                    f"LLM backend circuit open after {self.failures} consecutive failures; "
+                    f"next probe in {max(self.probe_seconds - waited, 0):.0f}s"
+                )
+            self.state = HALF_OPEN
+            self._probing = True
+            logger.info("Probing LLM backend (circuit half-open)")
+            return True
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("LLM backend recovered; circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+
+    def _on_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            probe_failed = self.state == HALF_OPEN
+            if probe_failed or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self.trips += 1
+                logger.error(
+                    f"Circuit opened after {self.failures} consecutive LLM backend failures "
+                    f"({error}); failing calls fast, probing again in {self.probe_seconds:g}s"
+                )
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call fn through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (fn is not called)
+            BackendFailure: If fn failed with a backend failure (chained)
+
+        Other errors from fn are re-raised unchanged.
+        """
+        probe = self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_backend_failure(e, self.failure_types):
+                self._on_failure(e)
+                raise BackendFailure(f"{type(e).__name__}: {e}") from e
+            if _is_client_error(e):
+                # The backend answered; this request was at fault
+                self._on_success()
+            raise
+        else:
+            self._on_success()
+            return result
+        finally:
+            if probe:
+                # However the probe ended, let the next one through
+                with self._lock:
+                    self._probing = False
+
+    def wrap(self, llm_call: Callable[[str, str], T]) -> Callable[[str, str], T]:
+        """An LLM client that calls llm_call through this breaker."""
+
+        def guarded(system: str, user: str) -> T:
+            return self.call(llm_call, system, user)
+
+        return guarded
+
+
+def create_circuit_breaker(
+    config: Dict[str, Any], failure_types: Tuple[Type[BaseException], ...] = ()
+) -> CircuitBreaker:
+    """Build the circuit breaker from configuration.
+
+    Args:
+        config: Configuration dict (llm_breaker_failures, llm_breaker_probe_seconds)
+        failure_types: The backend's connection/timeout error classes
+
+    Returns:
+        CircuitBreaker
+    """
+    return CircuitBreaker(
+        config.get("llm_breaker_failures", 5),
+        config.get("llm_breaker_probe_seconds", 60),
+        failure_types=DEFAULT_FAILURE_TYPES + tuple(failure_types),
+    )
@@ -5,8 +5,10 @@ import logging
 import sys
 from pathlib import Path
 
+from obs_summarizer.cache import cache_limits, open_cache, prune_cache
 from obs_summarizer.config import ConfigError, load_config
 from obs_summarizer.pipeline import run_pipeline
+from obs_summarizer.watch import run_watch
 
 
 def setup_logging(verbose: bool) -> None:
@@ -19,18 +21,71 @@ def setup_logging(verbose: bool) -> None:
     )
 
 
+def run_cache_gc(config: dict, args: argparse.Namespace) -> int:
+    """Prune the summary cache; command-line limits override the config."""
+    limits = cache_limits(config)
+    for key in limits:
+        if getattr(args, key) is not None:
+            limits[key] = getattr(args, key)
+    if all(v is None for v in limits.values()):
+        print(
+            "Error: no cache limits set. Configure cache_max_entries, cache_max_bytes or "
+            "cache_max_age_days, or pass --max-entries/--max-bytes/--max-age-days.",
+            file=sys.stderr,
+        )
+        return 1
+
+    with open_cache(config) as cache:
+        result = prune_cache(cache, dry_run=args.dry_run, **limits)
+
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"✓ {verb} {result.removed} cache entries ({result.freed_bytes} bytes); "
+        f"{result.remaining} remaining ({result.remaining_bytes} bytes)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_cache_migrate(config: dict) -> int:
+    """Re-encode every cache entry in the configured record format."""
+    with open_cache(config) as cache:
+        result = cache.migrate()
+
+    record_format = cache.record_format
+    print(
+        f"✓ Converted {result.converted} cache entries to {record_format.serializer} records "
+        f"(compression: {record_format.compression}): "
+        f"{result.bytes_before} -> {result.bytes_after} bytes",
+        file=sys.stderr,
+    )
+    if result.unreadable:
+        print(f"  {result.unreadable} unreadable entries left as is", file=sys.stderr)
+    return 0
+
+
 def main() -> int:
     """Main CLI entry point."""
+    # --config and --verbose are accepted before or after a subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--config",
+        default=argparse.SUPPRESS,
+        help="Config file path (default: config.yaml)",
+    )
+    common.add_argument(
+        "--verbose",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Show detailed debug output",
+    )
+
     parser = argparse.ArgumentParser(
         prog="obs-digest",
         description="Summarize Obsidian notes and create a daily digest",
+        parents=[common],
     )
-
-    parser.add_argument(
-        "--config",
-        default="config.yaml",
-        help="Config file path (default: config.yaml)",
-    )
+    parser.set_defaults(config="config.yaml", verbose=False, command=None)
     parser.add_argument(
         "--since",
         help="Process files modified since this date (YYYY-MM-DD)",
@@ -46,9 +101,34 @@ def main() -> int:
         help="Ignore cached summaries, re-summarize everything",
     )
     parser.add_argument(
-        "--verbose",
+        "--batch",
         action="store_true",
-        help="Show detailed debug output",
+        help="Summarize uncached notes as Anthropic Message Batches jobs (claude backend)",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    cache_parser = subparsers.add_parser("cache", help="Manage the summary cache")
+    cache_commands = cache_parser.add_subparsers(dest="cache_command", metavar="ACTION", required=True)
+    gc_parser = cache_commands.add_parser(
+        "gc", parents=[common], help="Evict old or least recently used summaries"
+    )
+    gc_parser.add_argument("--max-entries", dest="max_entries", type=int, help="Keep at most N entries")
+    gc_parser.add_argument("--max-bytes", dest="max_bytes", type=int, help="Keep at most N bytes")
+    gc_parser.add_argument(
+        "--max-age-days", dest="max_age_days", type=int, help="Remove entries unused for N days"
+    )
+    gc_parser.add_argument(
+        "--dry-run", action="store_true", help="Report what would be removed without deleting"
+    )
+    cache_commands.add_parser(
+        "migrate",
+        parents=[common],
+        help="Convert existing entries to the configured cache_serializer/cache_compression",
+    )
+    subparsers.add_parser(
+        "watch",
+        parents=[common],
+        help="Summarize notes as they change and write the digest daily at watch_digest_at",
     )
 
     args = parser.parse_args()
@@ -65,11 +145,18 @@ def main() -> int:
 
     # Run pipeline
     try:
+        if args.command == "cache":
+            if args.cache_command == "migrate":
+                return run_cache_migrate(config)
+            return run_cache_gc(config, args)
+        if args.command == "watch":
+            return run_watch(config)
         return run_pipeline(
             config,
             since=args.since,
             dry_run=args.dry_run,
             no_cache=args.no_cache,
+            batch=args.batch,
         )
     except KeyboardInterrupt:
         print("\nInterrupted.", file=sys.stderr)
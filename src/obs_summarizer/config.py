@@ -6,6 +6,15 @@ from typing import Any, Optional
 
 import yaml
 
+from obs_summarizer.cache import CACHE_BACKENDS
+from obs_summarizer.metrics import PRICE_KINDS
+from obs_summarizer.records import CACHE_COMPRESSIONS, CACHE_SERIALIZERS
+from obs_summarizer.retry import DEFAULT_RETRY_STATUSES
+from obs_summarizer.tokens import TOKEN_ESTIMATORS
+
+# watch_backend choices, defined here so config needn't import watch mode
+WATCH_BACKENDS = ("auto", "inotify", "poll")
+
 
 class ConfigError(Exception):
     """Raised when configuration is invalid."""
@@ -13,6 +22,55 @@ class ConfigError(Exception):
     pass
 
 
+def _require_positive_int(config: dict, key: str) -> None:
+    """Raise ConfigError unless config[key] is an int >= 1."""
+    value = config[key]
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ConfigError(f"{key} must be a positive integer, got: {value!r}")
+
+
+def _require_non_negative_int(config: dict, key: str) -> None:
+    """Raise ConfigError unless config[key] is an int >= 0."""
+    value = config[key]
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ConfigError(f"{key} must be a non-negative integer, got: {value!r}")
+
+
+def _require_non_negative_number(config: dict, key: str) -> None:
+    """Raise ConfigError unless config[key] is an int or float >= 0."""
+    value = config[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ConfigError(f"{key} must be a non-negative number, got: {value!r}")
+
+
+def _is_clock_time(value: Any) -> bool:
+    """Whether value is an "HH:MM" time of day."""
+    if not isinstance(value, str):
+        return False
+    hour, _, minute = value.partition(":")
+    if not (hour.isdigit() and minute.isdigit() and len(minute) == 2):
+        return False
+    return int(hour) < 24 and int(minute) < 60
+
+
+def _validate_pricing(pricing: Any) -> None:
+    """Raise ConfigError unless pricing maps model names to per-token-kind prices."""
+    if not isinstance(pricing, dict):
+        raise ConfigError(f"llm_pricing must be a mapping of model name to prices, got: {pricing!r}")
+    for model, prices in pricing.items():
+        if not isinstance(prices, dict):
+            raise ConfigError(f"llm_pricing.{model} must be a mapping, got: {prices!r}")
+        for kind, price in prices.items():
+            if kind not in PRICE_KINDS:
+                raise ConfigError(
+                    f"Invalid llm_pricing.{model} key: {kind}. Must be one of: {', '.join(PRICE_KINDS)}."
+                )
+            if isinstance(price, bool) or not isinstance(price, (int, float)) or price < 0:
+                raise ConfigError(
+                    f"llm_pricing.{model}.{kind} must be a non-negative number, got: {price!r}"
+                )
+
+
 def load_config(config_path: Optional[str] = None) -> dict:
     """Load and validate configuration from YAML file.
 
@@ -88,8 +146,102 @@ def load_config(config_path: Optional[str] = None) -> dict:
     config.setdefault("exclude_globs", [])
     config.setdefault("digest_folder", "Daily Digests")
     config.setdefault("max_input_chars", 16000)
+    config.setdefault("max_input_tokens", 4000)
+    config.setdefault("token_estimator", "auto")
     config.setdefault("cache_dir", ".cache/summaries")
+    config.setdefault("cache_backend", "sqlite")
+    config.setdefault("cache_max_entries", None)
+    config.setdefault("cache_max_bytes", None)
+    config.setdefault("cache_max_age_days", None)
+    config.setdefault("cache_auto_prune", False)
+    config.setdefault("cache_fsync_every", None)
+    config.setdefault("cache_serializer", "json")
+    config.setdefault("cache_compression", "none")
+    config.setdefault("cache_memory_entries", 10000)
     config.setdefault("state_path", "state.json")
+    config.setdefault("llm_concurrency", 1)
+    config.setdefault("rollup", True)
+    config.setdefault("rollup_chunk_tokens", 8000)
+    config.setdefault("long_note_mode", False)
+    config.setdefault("long_note_max_chars", 1_000_000)
+    config.setdefault("watch_backend", "auto")
+    config.setdefault("watch_debounce_seconds", 5)
+    config.setdefault("watch_poll_seconds", 60)
+    config.setdefault("watch_digest_at", "07:00")
+    config.setdefault("llm_pricing", {})
+    config.setdefault("llm_requests_per_minute", None)
+    config.setdefault("llm_tokens_per_minute", None)
+    config.setdefault("usage_outlier_factor", 5)
+    config.setdefault("report_history_runs", 365)
+    config.setdefault("llm_retry_attempts", 3)
+    config.setdefault("llm_retry_base_delay", 2)
+    config.setdefault("llm_retry_max_delay", 30)
+    config.setdefault("llm_retry_deadline", None)
+    config.setdefault("llm_retry_statuses", list(DEFAULT_RETRY_STATUSES))
+    config.setdefault("llm_breaker_failures", 5)
+    config.setdefault("llm_breaker_probe_seconds", 60)
+
+    _require_positive_int(config, "llm_concurrency")
+    _require_positive_int(config, "rollup_chunk_tokens")
+    _require_positive_int(config, "long_note_max_chars")
+    _require_positive_int(config, "max_input_tokens")
+    _require_non_negative_int(config, "watch_debounce_seconds")
+    _require_positive_int(config, "watch_poll_seconds")
+    _require_positive_int(config, "llm_retry_attempts")
+    _require_non_negative_number(config, "llm_retry_base_delay")
+    _require_non_negative_number(config, "llm_retry_max_delay")
+    _require_positive_int(config, "llm_breaker_failures")
+    _require_non_negative_number(config, "llm_breaker_probe_seconds")
+    if config["llm_retry_deadline"] is not None:
+        _require_non_negative_number(config, "llm_retry_deadline")
+    statuses = config["llm_retry_statuses"]
+    if not isinstance(statuses, list) or not all(
+        isinstance(s, int) and not isinstance(s, bool) and 100 <= s <= 599 for s in statuses
+    ):
+        raise ConfigError(f"llm_retry_statuses must be a list of HTTP status codes, got: {statuses!r}")
+
+    if config["token_estimator"] not in TOKEN_ESTIMATORS:
+        raise ConfigError(
+            f"Invalid token_estimator: {config['token_estimator']}. "
+            f"Must be one of: {', '.join(TOKEN_ESTIMATORS)}."
+        )
+
+    for key in (
+        "cache_max_entries",
+        "cache_max_bytes",
+        "cache_max_age_days",
+        "llm_requests_per_minute",
+        "llm_tokens_per_minute",
+    ):
+        if config[key] is not None:
+            _require_positive_int(config, key)
+
+    if config["cache_fsync_every"] is not None:
+        _require_non_negative_int(config, "cache_fsync_every")
+    _require_non_negative_int(config, "cache_memory_entries")
+    _require_non_negative_int(config, "report_history_runs")
+
+    for key, allowed in (
+        ("cache_backend", CACHE_BACKENDS),
+        ("cache_serializer", CACHE_SERIALIZERS),
+        ("cache_compression", CACHE_COMPRESSIONS),
+        ("watch_backend", WATCH_BACKENDS),
+    ):
+        if config[key] not in allowed:
+            raise ConfigError(
+                f"Invalid {key}: {config[key]}. Must be one of: {', '.join(allowed)}."
+            )
+
+    _validate_pricing(config["llm_pricing"])
+    factor = config["usage_outlier_factor"]
+    if isinstance(factor, bool) or not isinstance(factor, (int, float)) or factor <= 1:
+        raise ConfigError(f"usage_outlier_factor must be a number above 1, got: {factor!r}")
+
+    if not _is_clock_time(config["watch_digest_at"]):
+        raise ConfigError(
+            f"watch_digest_at must be a quoted time of day like \"07:00\", "
+            f"got: {config['watch_digest_at']!r}"
+        )
 
     # SECURITY: Reject absolute paths for write destinations
     # Prevents writing cache/state files to arbitrary system locations
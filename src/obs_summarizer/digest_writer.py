@@ -1,25 +1,45 @@
 """Write digest notes to Obsidian vault."""
 
 import logging
+import os
+import stat
+import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
 
+def _digest_mode(digest_path: Path) -> int:
+    """Permission bits for the digest: the existing note's, else 0666 less the umask."""
+    try:
+        return stat.S_IMODE(digest_path.stat().st_mode)
+    except FileNotFoundError:
+        pass
+    # The umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
 def write_digest_note(
     vault_path: str,
     digest_folder: str,
-    digest_content: str,
+    digest_content: Union[str, Iterable[str]],
     date: Optional[datetime] = None,
 ) -> Path:
     """Write digest as a new Obsidian note.
 
+    The content is streamed to a temp file in the digest folder, which then
+    replaces the note in one rename, so Obsidian and sync clients never see
+    a half-written digest.
+
     Args:
         vault_path: Path to Obsidian vault
         digest_folder: Folder name for digests (relative to vault)
-        digest_content: Markdown content of digest
+        digest_content: Markdown content of digest, whole or in pieces
+            (from iter_digest_markdown)
         date: Date for digest filename (defaults to today UTC)
 
     Returns:
@@ -58,8 +78,25 @@ def write_digest_note(
     filename = f"{date.strftime('%Y-%m-%d')}-digest.md"
     digest_path = digest_dir / filename
 
-    # Write file (overwrites if exists - idempotent)
-    digest_path.write_text(digest_content, encoding="utf-8")
+    if isinstance(digest_content, str):
+        digest_content = [digest_content]
+
+    # Write to a hidden temp file, then rename over the note (overwrites if
+    # exists - idempotent)
+    with tempfile.NamedTemporaryFile(
+        mode="w", encoding="utf-8", dir=digest_dir, delete=False, prefix=".", suffix=".tmp"
+    ) as tmp:
+        tmp_path = Path(tmp.name)
+        try:
+            # mkstemp creates 0600; give the note the mode a plain open would
+            os.chmod(tmp_path, _digest_mode(digest_path))
+            tmp.writelines(digest_content)
+        except BaseException:
+            tmp.close()
+            tmp_path.unlink()
+            raise
+
+    tmp_path.replace(digest_path)
     logger.info(f"Wrote digest to {digest_path}")
 
     return digest_path
@@ -68,21 +105,45 @@ def write_digest_note(
 def format_digest_markdown(
     summaries: List[Dict],
     date: Optional[datetime] = None,
+    rollup: Optional[str] = None,
 ) -> str:
     """Format summaries into digest markdown.
 
     Args:
         summaries: List of summary dicts (from summarizer)
         date: Date for digest header (defaults to today UTC)
+        rollup: Optional Top Insights markdown (from create_rollup)
 
     Returns:
         Formatted markdown string
     """
+    return "".join(iter_digest_markdown(summaries, date, rollup))
+
+
+def iter_digest_markdown(
+    summaries: List[Dict],
+    date: Optional[datetime] = None,
+    rollup: Optional[str] = None,
+) -> Iterator[str]:
+    """Yield the digest markdown piece by piece.
+
+    Joined, the pieces are exactly format_digest_markdown's output; passed
+    to write_digest_note they are written as they are produced, without
+    building the whole digest in memory.
+
+    Args:
+        summaries: List of summary dicts (from summarizer)
+        date: Date for digest header (defaults to today UTC)
+        rollup: Optional Top Insights markdown (from create_rollup)
+
+    Yields:
+        Consecutive pieces of the digest markdown
+    """
     if date is None:
         date = datetime.now(timezone.utc)
 
     # YAML frontmatter
-    frontmatter = (
+    yield (
         f"---\n"
         f"type: digest\n"
         f"date: {date.strftime('%Y-%m-%d')}\n"
@@ -92,7 +153,7 @@ def format_digest_markdown(
     )
 
     # Header
-    header = f"\n# Daily Digest — {date.strftime('%B %d, %Y')}\n"
+    yield f"\n# Daily Digest — {date.strftime('%B %d, %Y')}\n"
 
     # Group by theme (inferred from tags)
     articles_by_theme = {}
@@ -103,40 +164,45 @@ def format_digest_markdown(
         articles_by_theme[theme].append((i + 1, summary))
 
     # Format articles grouped by theme
-    body = ""
     for theme, articles in sorted(articles_by_theme.items()):
-        body += f"\n## {theme.title()}\n"
+        yield f"\n## {theme.title()}\n"
         for article_num, summary in articles:
-            body += f"\n### Article {article_num}\n"
-
-            # Quote if available
-            quote = summary.get("notable_quote")
-            if quote:
-                body += f"\n> {quote}\n"
-
-            # Summary
-            body += f"\n**Summary:** {summary.get('summary', '')}\n"
-
-            # Bullets
-            bullets = summary.get("bullets", [])
-            if bullets:
-                body += "\n**Key takeaways:**\n"
-                for bullet in bullets:
-                    body += f"- {bullet}\n"
-
-            # Why it matters
-            why = summary.get("why_it_matters")
-            if why:
-                body += f"\n**Why it matters:** {why}\n"
-
-            # Tags
-            tags = summary.get("tags", [])
-            if tags:
-                tag_str = " ".join(f"#{tag}" for tag in tags)
-                body += f"\n**Tags:** {tag_str}\n"
+            yield _format_article(article_num, summary)
 
     # Top insights summary (if generated)
     if len(summaries) > 1:
-        body += "\n---\n\n## Top Insights\n\n_Cross-cutting themes across saved articles_\n"
+        yield "\n---\n\n## Top Insights\n\n_Cross-cutting themes across saved articles_\n"
+        if rollup:
+            yield f"\n{rollup.strip()}\n"
+
+
+def _format_article(article_num: int, summary: Dict) -> str:
+    """Format one article section of the digest."""
+    parts = [f"\n### Article {article_num}\n"]
+
+    # Quote if available
+    quote = summary.get("notable_quote")
+    if quote:
+        parts.append(f"\n> {quote}\n")
+
+    # Summary
+    parts.append(f"\n**Summary:** {summary.get('summary', '')}\n")
+
+    # Bullets
+    bullets = summary.get("bullets", [])
+    if bullets:
+        parts.append("\n**Key takeaways:**\n")
+        parts.extend(f"- {bullet}\n" for bullet in bullets)
+
+    # Why it matters
+    why = summary.get("why_it_matters")
+    if why:
+        parts.append(f"\n**Why it matters:** {why}\n")
+
+    # Tags
+    tags = summary.get("tags", [])
+    if tags:
+        tag_str = " ".join(f"#{tag}" for tag in tags)
+        parts.append(f"\n**Tags:** {tag_str}\n")
 
-    return frontmatter + header + body
+    return "".join(parts)
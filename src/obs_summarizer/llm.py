@@ -1,18 +1,169 @@
 """LLM backend abstraction and client factory."""
 
+import inspect
 import logging
+import os
 import time
-from dataclasses import dataclass
-from typing import Callable, Dict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, Type
+
+from obs_summarizer.ratelimit import RateLimiter, create_rate_limiter
+from obs_summarizer.retry import OnRetry, RetryPolicy, create_retry_policy
+from obs_summarizer.tokens import estimate_tokens_heuristic
 
 logger = logging.getLogger(__name__)
 
 
 @dataclass
 class LLMResponse:
-    """Unified response from any LLM backend."""
+    """Unified response from any LLM backend.
+
+    input_tokens counts only prompt tokens billed at the full input rate;
+    prompt tokens read from or written to the prompt cache are counted in
+    cache_read_tokens and cache_write_tokens instead.
+    """
 
     content: str
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    model: str = ""
+    # Wall time of the call including retries, and how many retries it took
+    latency_seconds: float = field(default=0.0, compare=False)
+    retries: int = 0
+    # Part of latency_seconds spent in API requests, excluding rate-limit
+    # waits and retry backoff (None if the client doesn't measure it)
+    network_seconds: Optional[float] = field(default=None, compare=False)
+
+
+def _usage_count(usage: Any, name: str) -> int:
+    """Read an integer token count from an SDK usage object (0 if absent)."""
+    value = getattr(usage, name, None)
+    return value if isinstance(value, int) else 0
+
+
+def _model_name(response: Any) -> str:
+    """Model name reported in an SDK response ("" if absent)."""
+    model = getattr(response, "model", None)
+    return model if isinstance(model, str) else ""
+
+
+def claude_response(response: Any) -> LLMResponse:
+    """Convert an Anthropic Message into an LLMResponse."""
+    usage = getattr(response, "usage", None)
+    return LLMResponse(
+        content=response.content[0].text,
+        cache_read_tokens=_usage_count(usage, "cache_read_input_tokens"),
+        cache_write_tokens=_usage_count(usage, "cache_creation_input_tokens"),
+        # Anthropic already excludes cached prompt tokens from input_tokens
+        input_tokens=_usage_count(usage, "input_tokens"),
+        output_tokens=_usage_count(usage, "output_tokens"),
+        model=_model_name(response),
+    )
+
+
+def _local_response(response: Any) -> LLMResponse:
+    """Convert an OpenAI-compatible chat completion into an LLMResponse."""
+    usage = getattr(response, "usage", None)
+    cached = _usage_count(getattr(usage, "prompt_tokens_details", None), "cached_tokens")
+    return LLMResponse(
+        content=response.choices[0].message.content,
+        cache_read_tokens=cached,
+        # prompt_tokens includes the cached ones
+        input_tokens=max(_usage_count(usage, "prompt_tokens") - cached, 0),
+        output_tokens=_usage_count(usage, "completion_tokens"),
+        model=_model_name(response),
+    )
+
+
+async def _parse_async(raw: Any) -> Any:
+    """Parse a raw response from an async client (anthropic's parse is a coroutine)."""
+    parsed = raw.parse()
+    if inspect.isawaitable(parsed):
+        parsed = await parsed
+    return parsed
+
+
+def _error_headers(error: BaseException) -> Any:
+    """HTTP headers of the response behind an SDK error, if any."""
+    return getattr(getattr(error, "response", None), "headers", None)
+
+
+def _rate_limit_hook(
+    limiter: RateLimiter, rate_limit_error: Type[Exception]
+) -> Callable[[BaseException], float]:
+    """RetryPolicy hook that tells the limiter about 429s.
+
+    Returns seconds the limiter now pauses every caller for, so the policy
+    doesn't add its own backoff on top of the server's retry-after.
+    """
+
+    def on_retry(error: BaseException) -> float:
+        if not isinstance(error, rate_limit_error) and getattr(error, "status_code", None) != 429:
+            return 0.0
+        pause = limiter.on_rate_limited(_error_headers(error))
+        if pause > 0:
+            logger.warning(f"Rate limited. All requests paused {pause:.1f}s by the server")
+        return pause
+
+    return on_retry
+
+
+class _CallTimer:
+    """Times one client call, and separately the API requests within it.
+
+    The rest of the call is waiting: for the rate limiter or between retries.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.network = 0.0
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Time the body of a with block as API request time."""
+        sent = time.monotonic()
+        try:
+            yield
+        finally:
+            self.network += time.monotonic() - sent
+
+    def _finish(self, response: LLMResponse, retries: int) -> LLMResponse:
+        response.latency_seconds = time.monotonic() - self.started
+        response.network_seconds = self.network
+        response.retries = retries
+        return response
+
+    def _annotate(self, error: Exception) -> None:
+        # Lets RunMetrics split a failed call's time like a successful one's
+        try:
+            error.network_seconds = self.network  # type: ignore[attr-defined]
+        except AttributeError:
+            pass
+
+    def run(
+        self, policy: RetryPolicy, attempt: Callable[[], LLMResponse], on_retry: OnRetry
+    ) -> LLMResponse:
+        """Run attempt under policy and fill in the response's call stats."""
+        try:
+            result, retries = policy.run(attempt, on_retry)
+        except Exception as e:
+            self._annotate(e)
+            raise
+        return self._finish(result, retries)
+
+    async def run_async(
+        self, policy: RetryPolicy, attempt: Callable[[], Awaitable[LLMResponse]], on_retry: OnRetry
+    ) -> LLMResponse:
+        """run for coroutine attempts."""
+        try:
+            result, retries = await policy.run_async(attempt, on_retry)
+        except Exception as e:
+            self._annotate(e)
+            raise
+        return self._finish(result, retries)
 
 
 def create_llm_client(config: Dict) -> Callable[[str, str], LLMResponse]:
@@ -34,11 +185,49 @@ def create_llm_client(config: Dict) -> Callable[[str, str], LLMResponse]:
         raise ValueError(f"Unknown llm_backend: {backend}")
 
 
-def _create_claude_client(config: Dict) -> Callable[[str, str], LLMResponse]:
-    """Create Claude API client with retry logic."""
-    import anthropic
-    import os
+def create_async_llm_client(config: Dict) -> Callable[[str, str], Awaitable[LLMResponse]]:
+    """Factory to create an asyncio LLM client based on configuration.
+
+    Same backends, retry and error semantics as create_llm_client, but the
+    callable is a coroutine function and backoff uses asyncio.sleep, so many
+    requests can be in flight on one event loop without a thread each.
+
+    Args:
+        config: Configuration dict with llm_backend, and backend-specific settings
+
+    Returns:
+        An async callable that takes (system: str, user: str) and returns LLMResponse
+    """
+    backend = config["llm_backend"]
+
+    if backend == "claude":
+        return _create_async_claude_client(config)
+    elif backend == "local":
+        return _create_async_local_client(config)
+    else:
+        raise ValueError(f"Unknown llm_backend: {backend}")
+
+
+def backend_failure_types(config: Dict) -> Tuple[Type[BaseException], ...]:
+    """The configured backend's connection/timeout error classes, for the circuit breaker."""
+    if config["llm_backend"] == "claude":
+        import anthropic
+
+        return (anthropic.APIConnectionError,)
+    import openai
+
+    return (openai.APIConnectionError,)
 
+
+def configured_model(config: Dict) -> str:
+    """Name of the model the configured backend will call."""
+    if config["llm_backend"] == "claude":
+        return config.get("claude_model", "claude-sonnet-4-6")
+    return config.get("local_model", "llama-3.2-3b-instruct")
+
+
+def get_claude_api_key() -> str:
+    """Read the Anthropic API key from the environment."""
     # SECURITY: API key must come from environment variable ONLY
     # Never allow storing secrets in config.yaml
     api_key = os.environ.get("ANTHROPIC_API_KEY")
@@ -47,42 +236,72 @@ def _create_claude_client(config: Dict) -> Callable[[str, str], LLMResponse]:
             "ANTHROPIC_API_KEY environment variable not set.\n"
             "Set it with: export ANTHROPIC_API_KEY=sk-ant-..."
         )
+    return api_key
+
+
+def claude_message_params(
+    model: str, system: str, user: str, cache_system: bool = True
+) -> Dict[str, Any]:
+    """Messages API parameters for one (system, user) call.
+
+    Shared by the sync and async clients and by Message Batches requests.
+    System prompts are fixed per task (summary, rollup), so they carry a
+    cache breakpoint and repeat calls read them from the prompt cache. The
+    API silently skips caching for prompts under the model's minimum
+    cacheable length; the cache token counts in LLMResponse show whether
+    it took effect.
+
+    Args:
+        model: Claude model name
+        system: System prompt
+        user: User message
+        cache_system: Mark the system prompt with cache_control
+
+    Returns:
+        Keyword arguments for messages.create
+    """
+    system_param: Any = system
+    if cache_system:
+        system_param = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    return {
+        "model": model,
+        "max_tokens": 1024,
+        "system": system_param,
+        "messages": [{"role": "user", "content": user}],
+    }
+
+
+def _create_claude_client(config: Dict) -> Callable[[str, str], LLMResponse]:
+    """Create Claude API client with retry logic."""
+    import anthropic
 
+    api_key = get_claude_api_key()
     model = config.get("claude_model", "claude-sonnet-4-6")
     timeout = config.get("llm_timeout", 60)
+    cache_system = config.get("prompt_caching", True)
 
     client = anthropic.Anthropic(api_key=api_key, timeout=timeout)
+    limiter = create_rate_limiter(config)
+    policy = create_retry_policy(config, (anthropic.RateLimitError, anthropic.APIConnectionError))
+    on_retry = _rate_limit_hook(limiter, anthropic.RateLimitError)
 
     def call_claude(system: str, user: str) -> LLMResponse:
-        """Call Claude API with exponential backoff retry."""
-        for attempt in range(3):
-            try:
-                response = client.messages.create(
-                    model=model,
-                    max_tokens=1024,
-                    system=system,
-                    messages=[{"role": "user", "content": user}],
+        """Call Claude API, retrying per the configured policy."""
+        timer = _CallTimer()
+        tokens = estimate_tokens_heuristic(system + user)
+
+        def attempt() -> LLMResponse:
+            limiter.acquire(tokens)
+            with timer.request():
+                raw = client.messages.with_raw_response.create(
+                    **claude_message_params(model, system, user, cache_system)
                 )
-                return LLMResponse(content=response.content[0].text)
-            except anthropic.RateLimitError as e:
-                if attempt < 2:
-                    wait_time = 2 ** (attempt + 1)
-                    logger.warning(
-                        f"Rate limited. Retrying in {wait_time}s (attempt {attempt + 1}/3)"
-                    )
-                    time.sleep(wait_time)
-                else:
-                    raise
-            except (anthropic.APIConnectionError, anthropic.APITimeoutError) as e:
-                if attempt < 2:
-                    wait_time = 2 ** (attempt + 1)
-                    logger.warning(
-                        f"API error: {e}. Retrying in {wait_time}s (attempt {attempt + 1}/3)"
-                    )
-                    time.sleep(wait_time)
-                else:
-                    raise
-        raise RuntimeError("call_claude: exhausted 3 attempts without returning or raising")
+            limiter.observe(raw.headers)
+            result = claude_response(raw.parse())
+            limiter.settle(tokens, result.input_tokens + result.cache_write_tokens)
+            return result
+
+        return timer.run(policy, attempt, on_retry)
 
     return call_claude
 
@@ -96,12 +315,19 @@ def _create_local_client(config: Dict) -> Callable[[str, str], LLMResponse]:
     timeout = config.get("llm_timeout", 60)
 
     client = openai.OpenAI(base_url=base_url, api_key="not-needed", timeout=timeout)
+    limiter = create_rate_limiter(config)
+    policy = create_retry_policy(config, (openai.RateLimitError, openai.APIConnectionError))
+    on_retry = _rate_limit_hook(limiter, openai.RateLimitError)
 
     def call_local(system: str, user: str) -> LLMResponse:
-        """Call local LLM with exponential backoff retry."""
-        for attempt in range(3):
-            try:
-                response = client.chat.completions.create(
+        """Call local LLM, retrying per the configured policy."""
+        timer = _CallTimer()
+        tokens = estimate_tokens_heuristic(system + user)
+
+        def attempt() -> LLMResponse:
+            limiter.acquire(tokens)
+            with timer.request():
+                raw = client.chat.completions.with_raw_response.create(
                     model=model,
                     messages=[
                         {"role": "system", "content": system},
@@ -109,25 +335,85 @@ def _create_local_client(config: Dict) -> Callable[[str, str], LLMResponse]:
                     ],
                     temperature=0.7,
                 )
-                return LLMResponse(content=response.choices[0].message.content)
-            except (openai.RateLimitError, openai.APIStatusError) as e:
-                if attempt < 2 and getattr(e, "status_code", None) in (429, 500, 503):
-                    wait_time = 2 ** (attempt + 1)
-                    logger.warning(
-                        f"LLM error ({e}). Retrying in {wait_time}s (attempt {attempt + 1}/3)"
-                    )
-                    time.sleep(wait_time)
-                else:
-                    raise
-            except (openai.APIConnectionError, openai.APITimeoutError) as e:
-                if attempt < 2:
-                    wait_time = 2 ** (attempt + 1)
-                    logger.warning(
-                        f"Connection error: {e}. Retrying in {wait_time}s (attempt {attempt + 1}/3)"
-                    )
-                    time.sleep(wait_time)
-                else:
-                    raise
-        raise RuntimeError("call_local: exhausted 3 attempts without returning or raising")
+            limiter.observe(raw.headers)
+            result = _local_response(raw.parse())
+            limiter.settle(tokens, result.input_tokens + result.cache_read_tokens)
+            return result
+
+        return timer.run(policy, attempt, on_retry)
 
     return call_local
+
+
+def _create_async_claude_client(config: Dict) -> Callable[[str, str], Awaitable[LLMResponse]]:
+    """Create asyncio Claude API client with retry logic."""
+    import anthropic
+
+    api_key = get_claude_api_key()
+    model = config.get("claude_model", "claude-sonnet-4-6")
+    timeout = config.get("llm_timeout", 60)
+    cache_system = config.get("prompt_caching", True)
+
+    client = anthropic.AsyncAnthropic(api_key=api_key, timeout=timeout)
+    limiter = create_rate_limiter(config)
+    policy = create_retry_policy(config, (anthropic.RateLimitError, anthropic.APIConnectionError))
+    on_retry = _rate_limit_hook(limiter, anthropic.RateLimitError)
+
+    async def call_claude_async(system: str, user: str) -> LLMResponse:
+        """Call Claude API, retrying per the configured policy."""
+        timer = _CallTimer()
+        tokens = estimate_tokens_heuristic(system + user)
+
+        async def attempt() -> LLMResponse:
+            await limiter.acquire_async(tokens)
+            with timer.request():
+                raw = await client.messages.with_raw_response.create(
+                    **claude_message_params(model, system, user, cache_system)
+                )
+            limiter.observe(raw.headers)
+            result = claude_response(await _parse_async(raw))
+            limiter.settle(tokens, result.input_tokens + result.cache_write_tokens)
+            return result
+
+        return await timer.run_async(policy, attempt, on_retry)
+
+    return call_claude_async
+
+
+def _create_async_local_client(config: Dict) -> Callable[[str, str], Awaitable[LLMResponse]]:
+    """Create asyncio local LLM client (LM Studio / Ollama) with retry logic."""
+    import openai
+
+    base_url = config["local_base_url"]
+    model = config.get("local_model", "llama-3.2-3b-instruct")
+    timeout = config.get("llm_timeout", 60)
+
+    client = openai.AsyncOpenAI(base_url=base_url, api_key="not-needed", timeout=timeout)
+    limiter = create_rate_limiter(config)
+    policy = create_retry_policy(config, (openai.RateLimitError, openai.APIConnectionError))
+    on_retry = _rate_limit_hook(limiter, openai.RateLimitError)
+
+    async def call_local_async(system: str, user: str) -> LLMResponse:
+        """Call local LLM, retrying per the configured policy."""
+        timer = _CallTimer()
+        tokens = estimate_tokens_heuristic(system + user)
+
+        async def attempt() -> LLMResponse:
+            await limiter.acquire_async(tokens)
+            with timer.request():
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": user},
+                    ],
+                    temperature=0.7,
+                )
+            limiter.observe(raw.headers)
+            result = _local_response(await _parse_async(raw))
+            limiter.settle(tokens, result.input_tokens + result.cache_read_tokens)
+            return result
+
+        return await timer.run_async(policy, attempt, on_retry)
+
+    return call_local_async
@@ -0,0 +1,91 @@
+"""Persistent vault manifest for incremental discovery."""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from obs_summarizer.state import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def new_manifest() -> Dict[str, Any]:
+    """Create an empty manifest.
+
+    Layout:
+        version: Manifest format version
+        scope: Hash of the vault path and discovery settings it was built with
+        dirs: {rel_dir: {"mtime_ns", "files", "subdirs"}} cached directory listings
+        files: {rel_path: {"size", "mtime_ns", "inode", "sha256"}} per-note stat + content hash
+    """
+    return {"version": MANIFEST_VERSION, "scope": None, "dirs": {}, "files": {}}
+
+
+def manifest_scope(
+    vault_path: str,
+    include_folders: Optional[List[str]],
+    exclude_globs: Optional[List[str]],
+) -> str:
+    """Fingerprint the settings a manifest is only valid for.
+
+    Cached directory listings are already pruned by the exclude globs, so a
+    manifest built with different settings must not be reused.
+    """
+    key_input = json.dumps(
+        [str(Path(vault_path).resolve()), include_folders or [], exclude_globs or []]
+    )
+    return hashlib.sha256(key_input.encode()).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """SHA256 of a file's bytes, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, Any]:
+    """Load the vault manifest from disk.
+
+    Unlike state, the manifest is a pure cache: a missing, corrupt or
+    outdated file just means the next scan starts from scratch.
+
+    Args:
+        manifest_path: Path to the manifest JSON file
+
+    Returns:
+        Manifest dict (empty manifest if missing/corrupt)
+    """
+    if not manifest_path.exists():
+        return new_manifest()
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"Failed to load manifest {manifest_path}: {e}. Rescanning vault.")
+        return new_manifest()
+
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        logger.info(f"Manifest {manifest_path} has an old format. Rescanning vault.")
+        return new_manifest()
+
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any], manifest_path: Path) -> None:
+    """Save the manifest atomically (compact JSON, it can hold 100k+ entries).
+
+    Args:
+        manifest: Manifest dict
+        manifest_path: Path to the manifest JSON file
+    """
+    write_json_atomic(manifest_path, manifest, separators=(",", ":"))
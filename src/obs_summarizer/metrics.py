@@ -0,0 +1,339 @@
+"""Per-run metrics collection."""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from obs_summarizer.llm import LLMResponse
+from obs_summarizer.state import write_json_atomic, write_text_atomic
+
+T = TypeVar("T")
+
+# Stages timed by run_pipeline, in run order. Reading, cache lookup and the
+# LLM stages have one sample per note or call; the rest run once per run.
+STAGES = (
+    "load_state",
+    "discovery",
+    "filter",
+    "read",
+    "cache_lookup",
+    "llm_queue",
+    "llm_network",
+    "llm_parse",
+    "rollup",
+    "format",
+    "write",
+)
+
+
+# USD per million tokens, by model name or model name prefix (longest
+# prefix wins). Prices as published when this was written; override or
+# extend them with the llm_pricing config setting.
+DEFAULT_LLM_PRICING: Dict[str, Dict[str, float]] = {
+    "claude-sonnet-4": {"input": 3.0, "output": 15.0, "cache_read": 0.30, "cache_write": 3.75},
+    "claude-haiku-4-5": {"input": 1.0, "output": 5.0, "cache_read": 0.10, "cache_write": 1.25},
+}
+PRICE_KINDS = ("input", "output", "cache_read", "cache_write")
+
+# Message Batches requests are billed at half the regular rates
+BATCH_PRICE_FACTOR = 0.5
+
+# Usage counters kept per run and per thread (per-note usage is a difference)
+_USAGE_COUNTERS = (
+    "llm_calls",
+    "input_tokens",
+    "output_tokens",
+    "cache_read_tokens",
+    "cache_write_tokens",
+    "retries",
+    "failed_calls",
+    "latency_seconds",
+    "cost_usd",
+    "unpriced_calls",
+)
+
+
+def llm_pricing(config: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Model prices: the built-in table overlaid with config llm_pricing."""
+    return {**DEFAULT_LLM_PRICING, **(config.get("llm_pricing") or {})}
+
+
+def model_price(model: str, pricing: Dict[str, Dict[str, float]]) -> Optional[Dict[str, float]]:
+    """Prices for a model: an exact entry, else the longest matching prefix."""
+    if model in pricing:
+        return pricing[model]
+    prefixes = [name for name in pricing if model.startswith(name)]
+    return pricing[max(prefixes, key=len)] if prefixes else None
+
+
+def response_cost(
+    response: LLMResponse, pricing: Dict[str, Dict[str, float]], fallback_model: str = ""
+) -> Optional[float]:
+    """USD cost of one response, or None if its model has no price."""
+    price = model_price(response.model or fallback_model, pricing)
+    if price is None:
+        return None
+    return (
+        response.input_tokens * price.get("input", 0)
+        + response.output_tokens * price.get("output", 0)
+        + response.cache_read_tokens * price.get("cache_read", 0)
+        + response.cache_write_tokens * price.get("cache_write", 0)
+    ) / 1_000_000
+
+
+def note_usage(before: Dict[str, Any], after: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Per-note usage record from two usage snapshots (see RunMetrics.usage).
+
+    cost_usd is None when any of the note's calls had no price.
+    """
+    delta = {name: after[name] - before[name] for name in _USAGE_COUNTERS}
+    return {
+        "model": model,
+        "calls": delta["llm_calls"],
+        "input_tokens": delta["input_tokens"],
+        "output_tokens": delta["output_tokens"],
+        "cached_tokens": delta["cache_read_tokens"],
+        "cache_write_tokens": delta["cache_write_tokens"],
+        "retries": delta["retries"],
+        "latency_seconds": round(delta["latency_seconds"], 3),
+        "cost_usd": None if delta["unpriced_calls"] else round(delta["cost_usd"], 6),
+    }
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending, non-empty list (q in 0-100)."""
+    rank = max(math.ceil(q / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+@dataclass
+class RunMetrics:
+    """Counters for one pipeline run, safe to update from worker threads."""
+
+    llm_calls: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    retries: int = 0
+    # Calls that raised after the retry policy gave up (their retries count above)
+    failed_calls: int = 0
+    latency_seconds: float = 0.0
+    cost_usd: float = 0.0
+    unpriced_calls: int = 0
+    notes_sent: int = 0
+    input_tokens_estimated: int = 0
+    notes_truncated: int = 0
+    # Model prices (see llm_pricing) and the model assumed when a response names none
+    pricing: Dict[str, Dict[str, float]] = field(default_factory=dict, repr=False, compare=False)
+    model: str = field(default="", repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    _timings: Dict[str, List[float]] = field(default_factory=dict, repr=False, compare=False)
+    _thread: threading.local = field(default_factory=threading.local, repr=False, compare=False)
+
+    def record_response(self, response: LLMResponse, price_factor: float = 1.0) -> None:
+        """Add one LLM response's usage to the run totals and this thread's.
+
+        Args:
+            response: LLM response
+            price_factor: Multiplier on list prices (BATCH_PRICE_FACTOR for batches)
+        """
+        cost = response_cost(response, self.pricing, self.model)
+        counts = {
+            "llm_calls": 1,
+            "input_tokens": response.input_tokens,
+            "output_tokens": response.output_tokens,
+            "cache_read_tokens": response.cache_read_tokens,
+            "cache_write_tokens": response.cache_write_tokens,
+            "retries": response.retries,
+            "latency_seconds": response.latency_seconds,
+            "cost_usd": 0.0 if cost is None else cost * price_factor,
+            "unpriced_calls": int(cost is None),
+        }
+        self._add_usage(counts)
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count a call that failed for good, with the retries it took first."""
+        retries = getattr(error, "retries", 0)
+        counts = {"failed_calls": 1, "retries": retries if isinstance(retries, int) else 0}
+        self._add_usage(counts)
+
+    def _add_usage(self, counts: Dict[str, Any]) -> None:
+        """Add usage counts to the run totals and this thread's."""
+        thread_usage = self.thread_usage()
+        for name, value in counts.items():
+            thread_usage[name] += value
+        self._thread.usage = thread_usage
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def usage(self) -> Dict[str, Any]:
+        """Snapshot of the run's usage counters."""
+        with self._lock:
+            return {name: getattr(self, name) for name in _USAGE_COUNTERS}
+
+    def thread_usage(self) -> Dict[str, Any]:
+        """Snapshot of the usage counters for responses recorded on this thread."""
+        return dict(getattr(self._thread, "usage", None) or dict.fromkeys(_USAGE_COUNTERS, 0))
+
+    def record_input(self, estimated_tokens: int, truncated: bool) -> None:
+        """Add one note's budgeted input (estimated tokens, whether it was cut)."""
+        with self._lock:
+            self.notes_sent += 1
+            self.input_tokens_estimated += estimated_tokens
+            self.notes_truncated += int(truncated)
+
+    def instrument(self, llm_call: Callable[[str, str], LLMResponse]) -> Callable[[str, str], LLMResponse]:
+        """Wrap an LLM client so every response is recorded here.
+
+        API request time is recorded as llm_network and the rest of the
+        call (rate-limit waits, retry backoff) as llm_queue, as far as the
+        client reports the split (LLMResponse.network_seconds, or the
+        network_seconds attribute of the error); otherwise the whole call
+        counts as network time.
+        """
+
+        def instrumented(system: str, user: str) -> LLMResponse:
+            start = time.perf_counter()
+            network = None
+            try:
+                response = llm_call(system, user)
+                network = response.network_seconds
+            except Exception as e:
+                network = getattr(e, "network_seconds", None)
+                self.record_failure(e)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                if isinstance(network, (int, float)) and not isinstance(network, bool):
+                    network = min(network, elapsed)
+                    if elapsed > network:
+                        self.record_time("llm_queue", elapsed - network)
+                else:
+                    network = elapsed
+                self.record_time("llm_network", network)
+                self._thread.network = self.thread_network_seconds() + elapsed
+            self.record_response(response)
+            return response
+
+        return instrumented
+
+    def thread_network_seconds(self) -> float:
+        """Seconds the current thread has spent in instrumented LLM calls (waits included)."""
+        return getattr(self._thread, "network", 0.0)
+
+    def record_time(self, stage: str, seconds: float) -> None:
+        """Add one timing sample for a stage."""
+        with self._lock:
+            self._timings.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        """Time the body of a with block as one sample of stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(stage, time.perf_counter() - start)
+
+    def timed_iter(self, stage: str, items: Iterable[T]) -> Iterator[T]:
+        """Yield from items, timing only the work of producing them.
+
+        Time the consumer spends between items is not counted, so a
+        generator streamed into a writer is timed apart from the writing.
+        """
+        iterator = iter(items)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.record_time(stage, elapsed)
+
+    def stage_total(self, stage: str) -> float:
+        """Total seconds recorded for a stage so far."""
+        with self._lock:
+            return sum(self._timings.get(stage, ()))
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage sample count, total, p50/p95/p99 and max, in seconds."""
+        with self._lock:
+            timings = {stage: sorted(samples) for stage, samples in self._timings.items()}
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        stats = {}
+        for stage in sorted(timings, key=lambda s: (order.get(s, len(order)), s)):
+            samples = timings[stage]
+            stats[stage] = {
+                "count": len(samples),
+                "total": round(sum(samples), 6),
+                "p50": round(percentile(samples, 50), 6),
+                "p95": round(percentile(samples, 95), 6),
+                "p99": round(percentile(samples, 99), 6),
+                "max": round(samples[-1], 6),
+            }
+        return stats
+
+    def write_report(self, path: Path, **run: Any) -> Dict[str, Any]:
+        """Write this run's counters and stage timings as a JSON report.
+
+        Args:
+            path: Report file, replaced atomically
+            **run: Run-level fields (times, note counts) to include
+
+        Returns:
+            The report as written
+        """
+        report = {
+            **run,
+            "written_iso": datetime.now(timezone.utc).isoformat(),
+            "notes_sent": self.notes_sent,
+            "input_tokens_estimated": self.input_tokens_estimated,
+            "notes_truncated": self.notes_truncated,
+            "usage": {
+                **self.usage(),
+                "cost_usd": None if self.unpriced_calls else round(self.cost_usd, 6),
+            },
+            "stages": self.stage_stats(),
+        }
+        write_json_atomic(path, report, indent=2)
+        return report
+
+
+def append_report_history(path: Path, report: Dict[str, Any], keep: int) -> None:
+    """Append a run report to a JSON Lines history of the last keep runs.
+
+    One compact line per run, oldest first, so runs can be compared over
+    time (e.g. stage p95s across daily runs). Once the history is full the
+    oldest runs are dropped in one atomic rewrite.
+
+    Args:
+        path: History file (.jsonl)
+        report: Report as returned by RunMetrics.write_report
+        keep: Runs to keep, including this one
+    """
+    line = json.dumps(report, separators=(",", ":")) + "\n"
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        lines = []
+    if len(lines) < keep:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    else:
+        write_text_atomic(path, "".join(lines[len(lines) - keep + 1 :] + [line]))
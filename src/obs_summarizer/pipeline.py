@@ -1,26 +1,591 @@
 """Main ETL pipeline orchestration."""
 
 import logging
+import sqlite3
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 
-from obs_summarizer.cache import load_cache, make_cache_key, save_cache
-from obs_summarizer.digest_writer import format_digest_markdown, write_digest_note
-from obs_summarizer.llm import create_llm_client
-from obs_summarizer.scanner import filter_files_since, list_markdown_files
-from obs_summarizer.state import get_since_datetime, load_state, save_state
-from obs_summarizer.summarizer import create_rollup, summarize_note
+from obs_summarizer.batch import run_summary_batch
+from obs_summarizer.cache import (
+    SummaryCache,
+    cache_limits,
+    legacy_cache_key,
+    load_key_index,
+    make_cache_key,
+    open_cache,
+    prune_cache,
+    save_key_index,
+)
+from obs_summarizer.circuit import (
+    CLOSED,
+    BackendFailure,
+    CircuitBreaker,
+    CircuitOpenError,
+    create_circuit_breaker,
+)
+from obs_summarizer.digest_writer import iter_digest_markdown, write_digest_note
+from obs_summarizer.llm import backend_failure_types, configured_model, create_llm_client
+from obs_summarizer.manifest import load_manifest, save_manifest
+from obs_summarizer.metrics import RunMetrics, append_report_history, llm_pricing, note_usage
+from obs_summarizer.reader import read_note, read_note_head
+from obs_summarizer.rollup import build_rollup
+from obs_summarizer.scanner import FileRecord, filter_files_since, list_markdown_files
+from obs_summarizer.state import get_since_datetime, load_state, save_state, sidecar_path
+from obs_summarizer.summarizer import (
+    LONG_NOTE_PROMPT_VERSION,
+    PROMPT_VERSION,
+    TRUNCATION_MARKER,
+    finish_truncation,
+    merge_summaries,
+    split_note,
+    summarize_text,
+)
+from obs_summarizer.tokens import (
+    InputBudget,
+    TokenEstimator,
+    create_input_budget,
+    estimate_tokens_heuristic,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _read_maybe_long(
+    record: FileRecord, max_input_chars: int, budget: InputBudget, long_max_chars: int
+) -> Tuple[str, bool]:
+    """Read a note for long-note mode.
+
+    Returns:
+        (text, is_long). Notes within max_input_chars and the token budget
+        come back exactly as read_note reads them; longer notes come back
+        whole, up to long_max_chars.
+    """
+    head = read_note_head(record.path, max(long_max_chars, max_input_chars))
+    if (
+        not head.truncated
+        and len(head.text) <= max_input_chars
+        and budget.estimate(head.text) <= budget.max_tokens
+    ):
+        return head.text, False
+    return finish_truncation(head.text, head.truncated), True
+
+
+def _with_metadata(summary: Dict, record: FileRecord) -> Dict:
+    """Copy of summary with path/mtime metadata for this note.
+
+    Cache entries are shared by every note with the same content, so the
+    metadata always comes from the current record.
+    """
+    summary = dict(summary)
+    summary["path"] = str(record.path)
+    summary["mtime_utc"] = record.mtime.isoformat()
+    return summary
+
+
+def _summarize_file(
+    llm_client: Callable,
+    record: FileRecord,
+    text: Optional[str],
+    max_input_chars: int,
+    budget: InputBudget,
+    metrics: RunMetrics,
+    n: int,
+    total: int,
+    queued_at: float,
+) -> Dict:
+    """Summarize one note, reading it first if its text isn't in hand.
+
+    Runs on a worker thread; the caller handles caching and error policy.
+    Time spent waiting for a worker is recorded as llm_queue, and time in
+    summarize_text outside the LLM calls themselves as llm_parse.
+    """
+    metrics.record_time("llm_queue", time.perf_counter() - queued_at)
+    logger.info(f"Summarizing {n}/{total}: {record.path.name}")
+    if text is None:
+        with metrics.time_stage("read"):
+            text = read_note(record.path, max_input_chars, budget)
+    metrics.record_input(budget.estimate(text), text.endswith(TRUNCATION_MARKER))
+    start = time.perf_counter()
+    network_before = metrics.thread_network_seconds()
+    usage_before = metrics.thread_usage()
+    summary = summarize_text(llm_client, text, record.path.stem)
+    network = metrics.thread_network_seconds() - network_before
+    metrics.record_time("llm_parse", time.perf_counter() - start - network)
+    summary["usage"] = note_usage(usage_before, metrics.thread_usage(), metrics.model)
+    return _with_metadata(summary, record)
+
+
+def summarize_long_text(
+    llm_call: Callable,
+    text: str,
+    title: str,
+    cache: SummaryCache,
+    model: str,
+    max_tokens: int,
+    estimate: TokenEstimator = estimate_tokens_heuristic,
+    concurrency: int = 1,
+    no_cache: bool = False,
+) -> Dict[str, Any]:
+    """Summarize a note too long for one call as chunks, then merge them.
+
+    Chunks (from split_note) are summarized in parallel with the normal
+    summary prompt and cached by their own text, so a chunk that didn't
+    change since the last run is never sent again. The cache is only
+    touched from the calling thread.
+
+    Args:
+        llm_call: LLM client callable (thread-safe)
+        text: Normalized note content, untruncated
+        title: Note title/filename
+        cache: Open summary cache for the chunk summaries
+        model: Model name, part of each chunk's cache key
+        max_tokens: Estimated token budget per chunk
+        estimate: Token estimator
+        concurrency: Parallel LLM calls for the chunks
+        no_cache: If True, re-summarize every chunk (results are still cached)
+
+    Returns:
+        Summary dict with fields: summary, bullets, why_it_matters, tags, notable_quote
+    """
+    chunks = split_note(text, max_tokens, estimate)
+    if len(chunks) <= 1:
+        return summarize_text(llm_call, text, title)
+
+    keys = [make_cache_key(chunk, model, PROMPT_VERSION) for chunk in chunks]
+    hits = {} if no_cache else cache.get_many(keys)
+    partials: Dict[str, Dict[str, Any]] = {k: hits[k] for k in keys if hits.get(k)}
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = {
+            key: executor.submit(summarize_text, llm_call, chunk, title)
+            for key, chunk in zip(keys, chunks)
+            if key not in partials
+        }
+        for key, future in futures.items():
+            partials[key] = future.result()
+            cache.put(key, partials[key])
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    logger.info(
+        f"Long note {title}: {len(chunks)} chunks, {len(chunks) - len(futures)} from cache"
+    )
+    return merge_summaries(llm_call, [partials[key] for key in keys], title)
+
+
+def _summarize_long_file(
+    llm_client: Callable,
+    record: FileRecord,
+    config: Dict,
+    budget: InputBudget,
+    cache: SummaryCache,
+    metrics: RunMetrics,
+    no_cache: bool,
+) -> Dict:
+    """Summarize one long note in chunks (long_note_mode)."""
+    logger.info(f"Summarizing long note: {record.path.name}")
+    with metrics.time_stage("read"):
+        text, _ = _read_maybe_long(
+            record, config["max_input_chars"], budget, config.get("long_note_max_chars", 1_000_000)
+        )
+    metrics.record_input(budget.estimate(text), text.endswith(TRUNCATION_MARKER))
+    # Chunks are summarized on pool threads, so usage is measured on the run
+    # totals; long notes run one at a time with nothing else in flight
+    usage_before = metrics.usage()
+    summary = summarize_long_text(
+        llm_client,
+        text,
+        record.path.stem,
+        cache,
+        configured_model(config),
+        budget.max_tokens,
+        estimate=budget.estimate,
+        concurrency=config.get("llm_concurrency", 1),
+        no_cache=no_cache,
+    )
+    summary["usage"] = note_usage(usage_before, metrics.usage(), metrics.model)
+    return _with_metadata(summary, record)
+
+
+def create_run_metrics(config: Dict) -> RunMetrics:
+    """RunMetrics priced for the configured model."""
+    return RunMetrics(pricing=llm_pricing(config), model=configured_model(config))
+
+
+def _note_tokens(usage: Dict) -> int:
+    """All tokens a note's calls sent and received."""
+    return (
+        usage["input_tokens"]
+        + usage["cached_tokens"]
+        + usage["cache_write_tokens"]
+        + usage["output_tokens"]
+    )
+
+
+def _warn_usage_outliers(summaries: List[Dict], factor: float) -> None:
+    """Warn about notes that used over factor times the median tokens of their run."""
+    usages = [(s["path"], s["usage"]) for s in summaries if s.get("usage")]
+    if len(usages) < 4:
+        return
+    tokens = sorted(_note_tokens(usage) for _, usage in usages)
+    median = tokens[len(tokens) // 2]
+    for path, usage in usages:
+        used = _note_tokens(usage)
+        if median and used > factor * median:
+            cost = f", ${usage['cost_usd']:.4f}" if usage["cost_usd"] is not None else ""
+            logger.warning(
+                f"{Path(path).name} used {used} tokens{cost} in {usage['calls']} calls, "
+                f"{used / median:.1f}x the median of {median}"
+            )
+
+
+def _write_run_report(
+    config: Dict, metrics: RunMetrics, run_info: Dict[str, Any], wall_seconds: float
+) -> None:
+    """Write the run's timing report next to the state file.
+
+    state.report.json holds the latest run; it is also appended to the
+    state.reports.jsonl history of the last report_history_runs runs.
+    Written for failed runs too (without digest_path). A report that
+    can't be written only logs a warning.
+    """
+    report_path = sidecar_path(config["state_path"], "report")
+    history_path = sidecar_path(config["state_path"], "reports").with_suffix(".jsonl")
+    keep = config.get("report_history_runs", 365)
+    try:
+        report = metrics.write_report(report_path, **run_info, wall_seconds=round(wall_seconds, 6))
+        if keep:
+            append_report_history(history_path, report, keep)
+    except OSError as e:
+        logger.warning(f"Failed to write run report {report_path}: {e}")
+
+
+def _defer(record: FileRecord, error: BackendFailure) -> None:
+    """Log a note skipped for a backend failure (quietly once the circuit is open)."""
+    if isinstance(error, CircuitOpenError):
+        logger.debug(f"Skipping {record.path.name}: {error}")
+    else:
+        logger.warning(f"Failed to summarize {record.path.name}: {error}. Skipping.")
+
+
+class SummarizeOutcome(NamedTuple):
+    """Result of summarize_records."""
+
+    summaries: List[Optional[Dict]]
+    cached: int
+    summarized: int
+    # Notes skipped because the LLM backend failed (see circuit.BackendFailure)
+    deferred: List[FileRecord]
+    # Whether any of them were skipped because the circuit was already open
+    circuit_open: bool
+
+
+def _migrate_legacy_entries(
+    cache: SummaryCache, keyed: List[Tuple[int, FileRecord, str, Optional[str], bool]], hits: Dict
+) -> Dict[str, Dict]:
+    """Move misses' summaries from their old path+mtime keys to their content keys.
+
+    Summaries cached before keys followed note content are still valid
+    for notes unchanged since (same path and mtime), so they are re-keyed
+    rather than re-summarized and re-billed. Long notes are left out:
+    their old summary was of truncated text.
+
+    Returns:
+        {content key: summary} for every entry migrated
+    """
+    old_keys = {
+        legacy_cache_key(str(record.path), record.mtime_ns): cache_key
+        for _, record, cache_key, _, is_long in keyed
+        if cache_key not in hits and not is_long
+    }
+    if not old_keys:
+        return {}
+    found = cache.get_many(old_keys)
+    if not found:
+        return {}
+    migrated = {old_keys[old]: summary for old, summary in found.items()}
+    cache.put_many(migrated)
+    cache.delete_many(found)
+    logger.info(f"Re-keyed {len(migrated)} summaries cached under path+mtime keys")
+    return migrated
+
+
+def summarize_records(
+    config: Dict,
+    records: List[FileRecord],
+    llm_client: Callable,
+    cache: SummaryCache,
+    metrics: RunMetrics,
+    state: Optional[Dict] = None,
+    all_files: Optional[List[FileRecord]] = None,
+    no_cache: bool = False,
+    batch: bool = False,
+) -> SummarizeOutcome:
+    """Summarize notes through the cache, filling it with new summaries.
+
+    Args:
+        config: Configuration dictionary
+        records: Notes to summarize, in digest order
+        llm_client: LLM client callable (thread-safe)
+        cache: Open summary cache
+        metrics: Run metrics to record input and responses in
+        state: Pipeline state dict (required for batch mode)
+        all_files: Every note in the vault; key index entries for other
+            paths are dropped. None keeps the index as is
+        no_cache: If True, ignore cached summaries
+        batch: If True, summarize cache misses as Message Batches jobs
+
+    Returns:
+        SummarizeOutcome with one summary per record (None where it failed)
+
+    Raises:
+        ValueError: If batch is set without state
+    """
+    if batch and state is None:
+        raise ValueError("Batch mode requires the pipeline state")
+    cache_dir = config["cache_dir"]
+    max_input_chars = config["max_input_chars"]
+    budget = create_input_budget(config)
+    concurrency = config.get("llm_concurrency", 1)
+    long_mode = config.get("long_note_mode", False)
+    long_max_chars = config.get("long_note_max_chars", 1_000_000)
+    cached_count = 0
+    summarized_count = 0
+    deferred: List[FileRecord] = []
+    circuit_open = False
+
+    # Cache keys hash the normalized note text plus model and prompt
+    # version. The key index maps path+size+mtime to the last key, so
+    # unchanged notes are neither read nor re-hashed.
+    model = configured_model(config)
+    key_salt = (
+        f"{model}:{PROMPT_VERSION}:{max_input_chars}:{budget.max_tokens}:{budget.estimator}"
+    )
+    if long_mode:
+        key_salt += f":long-{LONG_NOTE_PROMPT_VERSION}:{long_max_chars}"
+    key_index = load_key_index(cache_dir)
+
+    # Keys first, then one batched cache lookup, so only misses occupy
+    # LLM workers. Results are slotted by position to keep the digest
+    # order deterministic.
+    # Long notes (long_note_mode) are keyed on their whole text and
+    # flagged in the index; their text is re-read when summarized so
+    # it isn't held for the whole run.
+    keyed = []
+    for i, record in enumerate(records):
+        path_key = str(record.path)
+        text = None
+        entry = key_index.get(path_key)
+        if entry and entry[:3] == [record.size, record.mtime_ns, key_salt]:
+            cache_key = entry[3]
+            is_long = len(entry) > 4 and entry[4]
+        else:
+            try:
+                with metrics.time_stage("read"):
+                    if long_mode:
+                        text, is_long = _read_maybe_long(
+                            record, max_input_chars, budget, long_max_chars
+                        )
+                    else:
+                        text, is_long = read_note(record.path, max_input_chars, budget), False
+            except OSError as e:
+                logger.warning(f"Failed to read {record.path.name}: {e}. Skipping.")
+                continue
+            if is_long:
+                version = f"long-{LONG_NOTE_PROMPT_VERSION}:{budget.max_tokens}"
+                cache_key = make_cache_key(text, model, version)
+                text = None
+            else:
+                cache_key = make_cache_key(text, model, PROMPT_VERSION)
+            key_index[path_key] = [record.size, record.mtime_ns, key_salt, cache_key, is_long]
+        keyed.append((i, record, cache_key, text, is_long))
+
+    # Drop index entries for notes that no longer exist
+    if all_files is not None:
+        live_paths = {str(r.path) for r in all_files}
+        key_index = {p: e for p, e in key_index.items() if p in live_paths}
+    save_key_index(cache_dir, key_index)
+
+    # Check cache unless no_cache is set
+    hits = {}
+    if not no_cache:
+        with metrics.time_stage("cache_lookup"):
+            hits = cache.get_many(key for _, _, key, _, _ in keyed)
+            hits.update(_migrate_legacy_entries(cache, keyed, hits))
+
+    results: List[Optional[Dict]] = [None] * len(records)
+    cached_slots = set()
+    pending = []
+    long_pending = []
+    for i, record, cache_key, text, is_long in keyed:
+        cached = hits.get(cache_key)
+        if cached:
+            logger.debug(f"Cache hit: {record.path.name}")
+            results[i] = _with_metadata(cached, record)
+            cached_slots.add(i)
+            cached_count += 1
+        elif is_long:
+            long_pending.append((i, record, cache_key))
+        else:
+            pending.append((i, record, cache_key, text))
+
+    # Batch mode: Message Batches jobs fill the cache; anything they
+    # couldn't summarize falls through to the per-note workers below
+    if batch and state is not None and (pending or state.get("batch")):
+        batch_summaries = run_summary_batch(
+            config,
+            [(cache_key, record, text) for _, record, cache_key, text in pending],
+            state,
+            metrics,
+        )
+        cache.put_many(batch_summaries)
+
+        remaining = []
+        for i, record, cache_key, text in pending:
+            if cache_key in batch_summaries:
+                results[i] = _with_metadata(batch_summaries[cache_key], record)
+                summarized_count += 1
+            else:
+                remaining.append((i, record, cache_key, text))
+        pending = remaining
+
+    if pending or long_pending:
+        logger.info(
+            f"Summarizing {len(pending) + len(long_pending)} files with {concurrency} "
+            f"worker(s) ({cached_count} cached, {len(long_pending)} long)"
+        )
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [
+            (
+                i,
+                record,
+                cache_key,
+                executor.submit(
+                    _summarize_file,
+                    llm_client,
+                    record,
+                    text,
+                    max_input_chars,
+                    budget,
+                    metrics,
+                    n,
+                    len(pending),
+                    time.perf_counter(),
+                ),
+            )
+            for n, (i, record, cache_key, text) in enumerate(pending, 1)
+        ]
+
+        for i, record, cache_key, future in futures:
+            try:
+                summary = future.result()
+            except BackendFailure as e:
+                _defer(record, e)
+                deferred.append(record)
+                circuit_open = circuit_open or isinstance(e, CircuitOpenError)
+                continue
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                # Expected errors: LLM response format, file I/O, config issues
+                logger.warning(f"Failed to summarize {record.path.name}: {e}. Skipping.")
+                continue
+            except Exception as e:
+                # Unexpected errors should fail the pipeline, not silently skip
+                logger.error(
+                    f"Unexpected error processing {record.path.name}: {e}", exc_info=True
+                )
+                raise
+
+            # Cache it
+            cache.put(cache_key, summary)
+            results[i] = summary
+            summarized_count += 1
+    finally:
+        # Don't start queued notes once the run is failing or interrupted
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # Long notes one at a time, each with its chunks in parallel
+    for i, record, cache_key in long_pending:
+        try:
+            summary = _summarize_long_file(
+                llm_client, record, config, budget, cache, metrics, no_cache
+            )
+        except BackendFailure as e:
+            _defer(record, e)
+            deferred.append(record)
+            circuit_open = circuit_open or isinstance(e, CircuitOpenError)
+            continue
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            logger.warning(f"Failed to summarize {record.path.name}: {e}. Skipping.")
+            continue
+        cache.put(cache_key, summary)
+        results[i] = summary
+        summarized_count += 1
+
+    if deferred:
+        logger.warning(f"{len(deferred)} notes not summarized: LLM backend unavailable")
+    fresh = [s for i, s in enumerate(results) if s is not None and i not in cached_slots]
+    _warn_usage_outliers(fresh, config.get("usage_outlier_factor", 5))
+    return SummarizeOutcome(results, cached_count, summarized_count, deferred, circuit_open)
+
+
+def prefetch_summaries(
+    config: Dict,
+    paths: List[Path],
+    llm_client: Optional[Callable] = None,
+    breaker: Optional[CircuitBreaker] = None,
+) -> int:
+    """Summarize changed notes into the cache ahead of the next digest.
+
+    Only notes the next run_pipeline would include (modified since the
+    checkpoint) are summarized, so the digest run finds them cached. No
+    digest is written and the checkpoint is not moved.
+
+    Args:
+        config: Configuration dictionary
+        paths: Notes that were added or changed
+        llm_client: Optional LLM client to reuse; created from config if not given
+        breaker: Optional circuit breaker to reuse; created from config if not given
+
+    Returns:
+        Number of notes newly summarized
+    """
+    since_dt = get_since_datetime(config, state=load_state(config["state_path"]))
+    records = []
+    for path in dict.fromkeys(paths):
+        try:
+            record = FileRecord.from_path(path)
+        except OSError:
+            # Deleted or renamed again before the debounce expired
+            continue
+        if record.size > 0:
+            records.append(record)
+    records = filter_files_since(records, since_dt)
+    if not records:
+        return 0
+
+    metrics = create_run_metrics(config)
+    breaker = breaker or create_circuit_breaker(config, backend_failure_types(config))
+    llm_client = breaker.wrap(metrics.instrument(llm_client or create_llm_client(config)))
+    with open_cache(config) as cache:
+        outcome = summarize_records(config, records, llm_client, cache, metrics)
+    return outcome.summarized
+
+
 def run_pipeline(
     config: Dict,
     since: Optional[str] = None,
     dry_run: bool = False,
     no_cache: bool = False,
+    batch: bool = False,
+    llm_client: Optional[Callable] = None,
+    breaker: Optional[CircuitBreaker] = None,
 ) -> int:
     """Execute the ETL pipeline.
 
@@ -29,25 +594,51 @@ def run_pipeline(
         since: Optional ISO date to override checkpoint
         dry_run: If True, discover files but don't summarize/write
         no_cache: If True, ignore cache and re-summarize everything
+        batch: If True, summarize cache misses as Message Batches jobs (claude only)
+        llm_client: Optional LLM client to reuse (long-running callers keep
+            one warm); created from config if not given
+        breaker: Optional circuit breaker to reuse, likewise. If it trips or
+            is already open and notes are left unsummarized, no digest is
+            written and the checkpoint stays put, so the next run resumes:
+            finished notes are cache hits and only the rest are summarized.
+            A resume marker in the state records how many were done and left
 
     Returns:
         Exit code (0 = success, 1 = error, 2 = no files found)
     """
+    if batch and config["llm_backend"] != "claude":
+        logger.error("Batch mode requires llm_backend: claude")
+        return 1
+
+    cache = None
+    metrics = create_run_metrics(config)
+    # Run-level fields for the timing report, filled in as steps complete
+    run_info: Dict[str, Any] = {"started_iso": datetime.now(timezone.utc).isoformat()}
+    started = time.perf_counter()
     try:
         # Step 1: Load state
-        state = load_state(config["state_path"])
+        with metrics.time_stage("load_state"):
+            state = load_state(config["state_path"])
 
         # Step 2: Determine since_dt
         since_dt = get_since_datetime(config, since_iso=since, state=state)
         logger.info(f"Processing files modified since: {since_dt.isoformat()}")
 
-        # Step 3: Discover files
-        all_files = list_markdown_files(
-            config["vault_path"],
-            include_folders=config.get("include_folders"),
-            exclude_globs=config.get("exclude_globs"),
-        )
-        target_files = filter_files_since(all_files, since_dt)
+        # Step 3: Discover files (incrementally, against the vault manifest)
+        with metrics.time_stage("discovery"):
+            manifest_path = sidecar_path(config["state_path"], "manifest")
+            manifest = load_manifest(manifest_path)
+            all_files = list_markdown_files(
+                config["vault_path"],
+                include_folders=config.get("include_folders"),
+                exclude_globs=config.get("exclude_globs"),
+                manifest=manifest,
+            )
+            if not dry_run:
+                save_manifest(manifest, manifest_path)
+        with metrics.time_stage("filter"):
+            target_files = filter_files_since(all_files, since_dt)
+        run_info.update(vault_notes=len(all_files), target_notes=len(target_files))
 
         if not target_files:
             logger.info("No new files found.")
@@ -57,61 +648,66 @@ def run_pipeline(
 
         # Step 4: Dry run mode
         if dry_run:
-            for f in target_files:
-                mtime = datetime.fromtimestamp(f.stat().st_mtime, tz=timezone.utc)
-                print(f"{f.relative_to(config['vault_path'])}\t{mtime.isoformat()}")
+            for record in target_files:
+                print(f"{record.path.relative_to(config['vault_path'])}\t{record.mtime.isoformat()}")
             return 0
 
-        # Step 5: Create LLM client
-        llm_client = create_llm_client(config)
+        # Step 5: Create LLM client (unless the caller passed a warm one),
+        # behind a circuit breaker that stops a run against a dead backend
+        breaker = breaker or create_circuit_breaker(config, backend_failure_types(config))
+        trips_before = breaker.trips
+        llm_client = breaker.wrap(metrics.instrument(llm_client or create_llm_client(config)))
+        if state.get("resume"):
+            logger.info(
+                f"Resuming run interrupted at {state['resume']['interrupted_iso']} "
+                f"({state['resume']['pending']} notes were left)"
+            )
 
         # Step 6: Summarize each file
-        per_note_summaries = []
-        cache_dir = config["cache_dir"]
-        max_input_chars = config["max_input_chars"]
-        cached_count = 0
-        summarized_count = 0
-
-        for i, file_path in enumerate(target_files, 1):
-            try:
-                # Check cache unless no_cache is set
-                mtime_ns = int(file_path.stat().st_mtime_ns)
-                cache_key = make_cache_key(str(file_path), mtime_ns)
-
-                if not no_cache:
-                    cached = load_cache(cache_dir, cache_key)
-                    if cached:
-                        logger.debug(f"Cache hit: {file_path.name}")
-                        per_note_summaries.append(cached)
-                        cached_count += 1
-                        continue
-
-                # Summarize this file
-                logger.info(f"Summarizing {i}/{len(target_files)}: {file_path.name}")
-                content = file_path.read_text(encoding="utf-8", errors="ignore")
-                summary = summarize_note(
-                    llm_client, content, file_path.stem, max_chars=max_input_chars
-                )
-
-                # Add metadata
-                summary["path"] = str(file_path)
-                summary["mtime_utc"] = datetime.fromtimestamp(
-                    file_path.stat().st_mtime, tz=timezone.utc
-                ).isoformat()
-
-                # Cache it
-                save_cache(cache_dir, cache_key, summary)
-                per_note_summaries.append(summary)
-                summarized_count += 1
+        budget = create_input_budget(config)
+        concurrency = config.get("llm_concurrency", 1)
+        model = configured_model(config)
+        cache = open_cache(config)
+        outcome = summarize_records(
+            config,
+            target_files,
+            llm_client,
+            cache,
+            metrics,
+            state=state,
+            all_files=all_files,
+            no_cache=no_cache,
+            batch=batch,
+        )
+        cached_count = outcome.cached
+        summarized_count = outcome.summarized
+        per_note_summaries = [s for s in outcome.summaries if s is not None]
+        run_info.update(
+            cached=cached_count,
+            summarized=summarized_count,
+            failed=len(target_files) - len(per_note_summaries),
+            deferred=len(outcome.deferred),
+        )
 
-            except (ValueError, KeyError, TypeError, OSError) as e:
-                # Expected errors: LLM response format, file I/O, config issues
-                logger.warning(f"Failed to summarize {file_path.name}: {e}. Skipping.")
-                continue
-            except Exception as e:
-                # Unexpected errors should fail the pipeline, not silently skip
-                logger.error(f"Unexpected error processing {file_path.name}: {e}", exc_info=True)
-                raise
+        # Step 6b: Backend went down, mid-run or before it (a shared breaker
+        # may have opened during a watch prefetch): checkpoint progress
+        # instead of writing a partial digest, and leave last_run_iso for
+        # the next run
+        backend_down = (
+            breaker.trips > trips_before or outcome.circuit_open or breaker.state != CLOSED
+        )
+        if outcome.deferred and backend_down:
+            state["resume"] = {
+                "interrupted_iso": datetime.now(timezone.utc).isoformat(),
+                "done": cached_count + summarized_count,
+                "pending": len(outcome.deferred),
+            }
+            save_state(state, config["state_path"])
+            logger.error(
+                f"LLM backend unavailable: {len(outcome.deferred)} of {len(target_files)} notes "
+                f"left unsummarized. Finished notes are cached; the next run resumes from here."
+            )
+            return 1
 
         if not per_note_summaries:
             logger.error("No summaries generated (all files failed)")
@@ -119,30 +715,107 @@ def run_pipeline(
 
         logger.info(f"Generated {len(per_note_summaries)} summaries")
 
-        # Step 7: Create rollup digest
-        logger.info("Creating rollup digest...")
-        rollup = create_rollup(llm_client, per_note_summaries)
+        # Step 7: Top Insights rollup, a tree of calls cached per node
+        rollup = None
+        if config.get("rollup", True) and len(per_note_summaries) > 1:
+            logger.info("Creating rollup digest...")
+            try:
+                with metrics.time_stage("rollup"):
+                    rollup = build_rollup(
+                        llm_client,
+                        per_note_summaries,
+                        cache,
+                        model,
+                        max_tokens=config.get("rollup_chunk_tokens", 8000),
+                        concurrency=concurrency,
+                        no_cache=no_cache,
+                        estimate=budget.estimate,
+                    )
+            except BackendFailure as e:
+                # Every note made it; a digest without Top Insights beats none
+                logger.warning(f"Rollup skipped, LLM backend unavailable: {e}")
 
-        # Step 8: Format and write digest
-        digest_md = format_digest_markdown(per_note_summaries)
+        # Step 8: Format and write digest, streamed section by section;
+        # formatting and writing interleave, so writing is the remainder
+        write_started = time.perf_counter()
+        digest_md = metrics.timed_iter(
+            "format", iter_digest_markdown(per_note_summaries, rollup=rollup)
+        )
         digest_path = write_digest_note(
             config["vault_path"], config["digest_folder"], digest_md
         )
+        metrics.record_time(
+            "write", time.perf_counter() - write_started - metrics.stage_total("format")
+        )
+        run_info["digest_path"] = str(digest_path)
 
         # Step 9: Update checkpoint (only after successful write)
         state["last_run_iso"] = datetime.now(timezone.utc).isoformat()
+        state.pop("resume", None)
         save_state(state, config["state_path"])
 
-        # Step 10: Report
+        # Step 10: Keep the cache within its size/age budget
+        if config.get("cache_auto_prune"):
+            try:
+                pruned = prune_cache(cache, **cache_limits(config))
+                logger.info(
+                    f"Cache GC: removed {pruned.removed} entries ({pruned.freed_bytes} bytes), "
+                    f"{pruned.remaining} remaining"
+                )
+            except (OSError, sqlite3.Error) as e:
+                # The digest is already written; a failed prune is retried next run
+                logger.warning(f"Cache GC failed: {e}")
+
+        # Step 11: Report
         print(
             f"✓ Digest written: {len(per_note_summaries)} articles "
             f"({cached_count} from cache, {summarized_count} summarized)",
             file=sys.stderr,
         )
         print(f"✓ Saved to: {digest_path}", file=sys.stderr)
+        if metrics.notes_sent:
+            print(
+                f"✓ Input budget: ~{metrics.input_tokens_estimated} tokens in {metrics.notes_sent} notes, "
+                f"{metrics.notes_truncated} truncated to max_input_tokens={budget.max_tokens} "
+                f"({budget.estimator} estimate)",
+                file=sys.stderr,
+            )
+        if metrics.llm_calls:
+            print(
+                f"✓ Prompt cache: {metrics.cache_read_tokens} input tokens read, "
+                f"{metrics.cache_write_tokens} written ({metrics.llm_calls} LLM calls)",
+                file=sys.stderr,
+            )
+            if metrics.unpriced_calls:
+                cost = f"cost unknown (no llm_pricing entry for {metrics.model})"
+            else:
+                cost = f"${metrics.cost_usd:.4f}"
+            failed = f", {metrics.failed_calls} failed calls" if metrics.failed_calls else ""
+            print(
+                f"✓ LLM usage: {metrics.input_tokens} input + {metrics.cache_read_tokens} cached "
+                f"+ {metrics.output_tokens} output tokens, {metrics.retries} retries{failed}, {cost}",
+                file=sys.stderr,
+            )
+        if cache.memory is not None:
+            stats = cache.memory.stats()
+            logger.info(
+                f"Memory cache (this process): {stats.hits} hits, {stats.misses} misses, "
+                f"{stats.entries}/{stats.max_entries} entries"
+            )
+        stages = metrics.stage_stats()
+        logger.info(
+            "Stage totals: "
+            + ", ".join(f"{stage} {stat['total']:.2f}s" for stage, stat in stages.items())
+        )
 
         return 0
 
     except Exception as e:
         logger.error(f"Pipeline failed: {e}", exc_info=True)
         return 1
+
+    finally:
+        if cache is not None:
+            cache.close()
+        if not dry_run:
+            _write_run_report(config, metrics, run_info, time.perf_counter() - started)
@@ -0,0 +1,281 @@
+"""Client-side rate limiting shared by every caller of an LLM client."""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Buckets hold this many seconds' worth of quota, so an idle client can
+# burst a little without sending a whole minute's quota at once
+BURST_SECONDS = 10
+
+# Rate limit headers, Anthropic first, then OpenAI-compatible servers
+_REQUEST_LIMIT_HEADERS = ("anthropic-ratelimit-requests-limit", "x-ratelimit-limit-requests")
+_REQUEST_REMAINING_HEADERS = (
+    "anthropic-ratelimit-requests-remaining",
+    "x-ratelimit-remaining-requests",
+)
+_REQUEST_RESET_HEADERS = ("anthropic-ratelimit-requests-reset", "x-ratelimit-reset-requests")
+# Input tokens are what the limiter meters; Anthropic reports them separately
+_TOKEN_LIMIT_HEADERS = (
+    "anthropic-ratelimit-input-tokens-limit",
+    "anthropic-ratelimit-tokens-limit",
+    "x-ratelimit-limit-tokens",
+)
+_TOKEN_REMAINING_HEADERS = (
+    "anthropic-ratelimit-input-tokens-remaining",
+    "anthropic-ratelimit-tokens-remaining",
+    "x-ratelimit-remaining-tokens",
+)
+_TOKEN_RESET_HEADERS = (
+    "anthropic-ratelimit-input-tokens-reset",
+    "anthropic-ratelimit-tokens-reset",
+    "x-ratelimit-reset-tokens",
+)
+
+# OpenAI-style reset durations such as "1s", "6m0s" or "20ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second, up to BURST_SECONDS of quota.
+
+    Not thread-safe on its own; RateLimiter serializes access.
+    """
+
+    def __init__(self, per_minute: float, now: float):
+        self.per_minute = per_minute
+        self.level = self.capacity
+        self.updated = now
+
+    @property
+    def capacity(self) -> float:
+        return max(self.per_minute * BURST_SECONDS / 60, 1.0)
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.level + (now - self.updated) * self.per_minute / 60, self.capacity)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (amounts over capacity need a full bucket)."""
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) * 60 / self.per_minute
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests/minute and input tokens/minute.
+
+    One limiter is shared by every thread or task calling a client, so
+    concurrent workers take turns instead of all hitting the API's limit
+    at once. A 429 pauses every caller for the server's retry-after and
+    lowers the local limits to the server's when those are lower (or
+    learns them, if none were configured).
+
+    Args:
+        requests_per_minute: Request quota, or None for no request limit
+        tokens_per_minute: Input token quota, or None for no token limit
+        clock: Monotonic clock, in seconds
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, now) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self._paused_until = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and tokens if available now, else return the wait."""
+        with self._lock:
+            now = self._clock()
+            wait = max(self._paused_until - now, 0.0)
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                # May go negative for a request over capacity; later callers wait it off
+                self.tokens.level -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request with this many input tokens may be sent."""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        """acquire for asyncio callers."""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once a response reports the real input size."""
+        if self.tokens is None or actual_tokens <= 0:
+            return
+        with self._lock:
+            self.tokens.level = min(
+                self.tokens.level + estimated_tokens - actual_tokens, self.tokens.capacity
+            )
+
+    def observe(self, headers: Any) -> float:
+        """Adapt to the rate limit headers of any response, successful or not.
+
+        Limits lower than the local ones (or any, if none were configured)
+        are adopted, buckets are drawn down to the server's remaining
+        quota, and an exhausted quota pauses every caller until it resets,
+        so the limiter learns the quota before the API starts rejecting
+        requests.
+
+        Args:
+            headers: Response headers (any mapping with .get), or None
+
+        Returns:
+            Seconds every caller now waits before its next request
+        """
+        with self._lock:
+            return self._adapt(headers, None)
+
+    def on_rate_limited(self, headers: Any) -> float:
+        """Adapt to a 429 response's headers and pause every caller.
+
+        Like observe, but the server's retry-after takes precedence.
+
+        Args:
+            headers: Response headers (any mapping with .get), or None
+
+        Returns:
+            Seconds every caller now waits before its next request (0 if the
+            server gave no retry-after or reset time)
+        """
+        with self._lock:
+            return self._adapt(headers, _retry_after(headers))
+
+    def _adapt(self, headers: Any, pause: Optional[float]) -> float:
+        """Apply rate limit headers; caller holds the lock."""
+        now = self._clock()
+        for limit_names, remaining_names, reset_names, attr in (
+            (_REQUEST_LIMIT_HEADERS, _REQUEST_REMAINING_HEADERS, _REQUEST_RESET_HEADERS, "requests"),
+            (_TOKEN_LIMIT_HEADERS, _TOKEN_REMAINING_HEADERS, _TOKEN_RESET_HEADERS, "tokens"),
+        ):
+            bucket = getattr(self, attr)
+            limit = _first_number(headers, limit_names)
+            if limit and (bucket is None or limit < bucket.per_minute):
+                logger.info(f"Server {attr} limit is {limit:g}/min; limiting to it")
+                if bucket is None:
+                    bucket = TokenBucket(limit, now)
+                    setattr(self, attr, bucket)
+                bucket.per_minute = limit
+            remaining = _first_number(headers, remaining_names)
+            if bucket is not None:
+                bucket.refill(now)
+                if remaining is not None:
+                    bucket.level = min(bucket.level, remaining)
+            if pause is None and remaining == 0:
+                pause = _reset_seconds(headers, reset_names)
+        pause = pause or 0.0
+        self._paused_until = max(self._paused_until, now + pause)
+        return max(self._paused_until - now, 0.0)
+
+
+def create_rate_limiter(config: dict) -> RateLimiter:
+    """Build the limiter for one LLM client from configuration.
+
+    Args:
+        config: Configuration dict (llm_requests_per_minute, llm_tokens_per_minute)
+
+    Returns:
+        RateLimiter (without configured limits it still honors retry-after)
+    """
+    return RateLimiter(
+        config.get("llm_requests_per_minute"), config.get("llm_tokens_per_minute")
+    )
+
+
+def _header(headers: Any, name: str) -> Optional[str]:
+    """A header value as a string, or None (also for header-less error stand-ins)."""
+    try:
+        value = headers.get(name)
+    except AttributeError:
+        return None
+    return value.strip() if isinstance(value, str) else None
+
+
+def _first_number(headers: Any, names: tuple) -> Optional[float]:
+    for name in names:
+        value = _header(headers, name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    """Seconds from retry-after-ms or retry-after (delta-seconds or HTTP date)."""
+    value = _header(headers, "retry-after-ms")
+    if value is not None:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = _header(headers, "retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        # "-0000" or no zone: RFC 5322 leaves the zone unknown; HTTP dates are UTC
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _reset_seconds(headers: Any, names: tuple) -> Optional[float]:
+    """Seconds until a quota resets, from an RFC 3339 time or a duration like "6m0s"."""
+    for name in names:
+        value = _header(headers, name)
+        if value is None:
+            continue
+        parts = _DURATION_PART.findall(value)
+        if parts and "".join(n + u for n, u in parts) == value:
+            return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+        try:
+            when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    return None
@@ -0,0 +1,128 @@
+"""Streaming, bounded reading of note content."""
+
+import itertools
+from pathlib import Path
+from typing import IO, Iterator, List, NamedTuple, Optional
+
+from obs_summarizer.summarizer import finish_truncation
+from obs_summarizer.tokens import InputBudget
+
+_READ_CHUNK = 64 * 1024
+
+_FRONTMATTER_DELIMITER = "---"
+
+
+class NoteHead(NamedTuple):
+    """The first max_chars of a note's stripped, frontmatter-free content."""
+
+    text: str
+    truncated: bool
+
+
+def _chunks(f: IO[str]) -> Iterator[str]:
+    """Yield decoded text from f in fixed-size reads."""
+    while True:
+        chunk = f.read(_READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+class _Head:
+    """Collects the first max_chars of a stream and whether non-whitespace follows."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.overflow = False
+
+    def feed(self, chunk: str) -> None:
+        if self.size < self.max_chars:
+            take = chunk[: self.max_chars - self.size]
+            self.parts.append(take)
+            self.size += len(take)
+            chunk = chunk[len(take) :]
+        if chunk and not chunk.isspace():
+            self.overflow = True
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_chars
+
+    def result(self) -> NoteHead:
+        text = "".join(self.parts)
+        # Past max_chars the text is cut, so only a complete note loses trailing space
+        return NoteHead(text, True) if self.overflow else NoteHead(text.rstrip(), False)
+
+
+def _read_body(chunks: Iterator[str], max_chars: int) -> NoteHead:
+    """Skip leading whitespace, then keep max_chars and look for more content."""
+    head = _Head(max_chars)
+    started = False
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        head.feed(chunk)
+        if head.overflow:
+            break
+    return head.result()
+
+
+def read_note_head(path: Path, max_chars: int) -> NoteHead:
+    """Read a note's content without frontmatter, stopping after max_chars.
+
+    Equivalent to ``strip_frontmatter(path.read_text(...)).strip()`` cut to
+    max_chars, but frontmatter is skipped while streaming and the rest of
+    the file is only read as far as needed to tell whether more content
+    follows. Memory stays bounded by max_chars plus one read chunk,
+    whatever the file size.
+
+    Args:
+        path: Note file
+        max_chars: Max characters of content to keep
+
+    Returns:
+        NoteHead with the kept text and whether the content continued
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        opening = f.read(len(_FRONTMATTER_DELIMITER))
+        chunks = _chunks(f)
+        if opening != _FRONTMATTER_DELIMITER:
+            return _read_body(itertools.chain([opening], chunks), max_chars)
+
+        # Look for the closing delimiter, keeping the start of the file in
+        # case there is none and the whole note is content
+        whole = _Head(max_chars)
+        whole.feed(opening)
+        carry = ""
+        for chunk in chunks:
+            window = carry + chunk
+            end = window.find(_FRONTMATTER_DELIMITER)
+            if end >= 0:
+                rest = window[end + len(_FRONTMATTER_DELIMITER) :]
+                return _read_body(itertools.chain([rest], chunks), max_chars)
+            whole.feed(chunk)
+            carry = window[-(len(_FRONTMATTER_DELIMITER) - 1) :]
+        return whole.result()
+
+
+def read_note(path: Path, max_chars: int, budget: Optional[InputBudget] = None) -> str:
+    """Read a note as exactly the text sent to the LLM.
+
+    Byte-identical to ``normalize_note(path.read_text(encoding="utf-8",
+    errors="ignore"), max_chars, budget)`` with bounded memory.
+
+    Args:
+        path: Note file
+        max_chars: Max input chars before truncation
+        budget: Optional token budget
+
+    Returns:
+        Content without frontmatter, stripped and truncated
+    """
+    head = read_note_head(path, max_chars)
+    return finish_truncation(head.text, head.truncated, budget)
@@ -0,0 +1,170 @@
+"""Versioned binary encoding of cache records."""
+
+import json
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Union
+
+CACHE_SERIALIZERS = ("json", "msgpack")
+CACHE_COMPRESSIONS = ("none", "zlib", "zstd")
+
+# Record layout: magic, format version, serializer id, compression id, payload
+RECORD_MAGIC = b"OSR"
+RECORD_VERSION = 1
+
+_SERIALIZER_IDS = {"json": 1, "msgpack": 2}
+_COMPRESSION_IDS = {"none": 0, "zlib": 1, "zstd": 2}
+_HEADER_SIZE = len(RECORD_MAGIC) + 3
+
+
+def _missing(feature: str, package: str, extra: str) -> ValueError:
+    return ValueError(
+        f"{feature} requires the {package} package (pip install 'obs-summarizer[{extra}]')"
+    )
+
+
+def _json_codec() -> tuple:
+    """Compact JSON, through orjson when it is installed."""
+    try:
+        import orjson
+    except ImportError:
+        return (
+            lambda data: json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+            json.loads,
+        )
+    return orjson.dumps, orjson.loads
+
+
+def _msgpack_codec() -> tuple:
+    try:
+        import msgpack
+    except ImportError as e:
+        raise _missing("cache_serializer: msgpack", "msgpack", "msgpack") from e
+    return msgpack.packb, lambda raw: msgpack.unpackb(raw, raw=False)
+
+
+def _zstd_codec() -> tuple:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise _missing("cache_compression: zstd", "zstandard", "zstd") from e
+    return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+
+def _serializer(name: str) -> tuple:
+    if name == "json":
+        return _json_codec()
+    if name == "msgpack":
+        return _msgpack_codec()
+    raise ValueError(f"Unknown cache_serializer: {name}. Must be one of {CACHE_SERIALIZERS}.")
+
+
+def _compressor(name: str) -> tuple:
+    if name == "none":
+        return (lambda raw: raw), (lambda raw: raw)
+    if name == "zlib":
+        return (lambda raw: zlib.compress(raw, 6)), zlib.decompress
+    if name == "zstd":
+        return _zstd_codec()
+    raise ValueError(f"Unknown cache_compression: {name}. Must be one of {CACHE_COMPRESSIONS}.")
+
+
+@dataclass(frozen=True)
+class RecordFormat:
+    """How new cache records are encoded.
+
+    Any record can be decoded whatever the current format, since each one
+    names its serializer and compression in its header. Plain JSON (the
+    layout before records existed) decodes as well.
+    """
+
+    serializer: str = "json"
+    compression: str = "none"
+    _dump: Callable[[Any], bytes] = field(init=False, repr=False, compare=False)
+    _compress: Callable[[bytes], bytes] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Fails on unknown names and missing packages when the format is chosen
+        object.__setattr__(self, "_dump", _serializer(self.serializer)[0])
+        object.__setattr__(self, "_compress", _compressor(self.compression)[0])
+
+    @property
+    def header(self) -> bytes:
+        """Header every record in this format starts with."""
+        return RECORD_MAGIC + bytes(
+            [RECORD_VERSION, _SERIALIZER_IDS[self.serializer], _COMPRESSION_IDS[self.compression]]
+        )
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        """Encode one summary as a record."""
+        return self.header + self._compress(self._dump(data))
+
+    def matches(self, raw: Union[bytes, str]) -> bool:
+        """Whether a stored entry is already a record in this format."""
+        return isinstance(raw, bytes) and raw.startswith(self.header)
+
+
+_DECODERS: Dict[bytes, Callable[[bytes], Any]] = {}
+
+
+def decode_record(raw: Union[bytes, str]) -> Dict[str, Any]:
+    """Decode a record, or a legacy plain-JSON entry.
+
+    Raises:
+        ValueError: If the record is corrupt, from a newer format version,
+            or needs a package that isn't installed
+    """
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not raw.startswith(RECORD_MAGIC):
+        return json.loads(raw)
+
+    header = bytes(raw[:_HEADER_SIZE])
+    decode = _DECODERS.get(header)
+    if decode is None:
+        decode = _decoder(header)
+        _DECODERS[header] = decode
+    try:
+        data = decode(raw[_HEADER_SIZE:])
+    except Exception as e:
+        # zlib, zstandard and msgpack raise their own error types
+        if isinstance(e, ValueError):
+            raise
+        raise ValueError(f"Corrupt cache record: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError(f"Cache record holds {type(data).__name__}, not an object")
+    return data
+
+
+def _decoder(header: bytes) -> Callable[[bytes], Any]:
+    """Build the decode function for one record header."""
+    if len(header) < _HEADER_SIZE:
+        raise ValueError("Truncated cache record header")
+    version, serializer_id, compression_id = header[len(RECORD_MAGIC) :]
+    if version != RECORD_VERSION:
+        raise ValueError(f"Unsupported cache record version {version}")
+    serializers = {v: k for k, v in _SERIALIZER_IDS.items()}
+    compressions = {v: k for k, v in _COMPRESSION_IDS.items()}
+    if serializer_id not in serializers or compression_id not in compressions:
+        raise ValueError(f"Unknown cache record encoding {serializer_id}/{compression_id}")
+
+    _, load = _serializer(serializers[serializer_id])
+    _, decompress = _compressor(compressions[compression_id])
+    return lambda payload: load(decompress(payload))
+
+
+def create_record_format(config: Dict[str, Any]) -> RecordFormat:
+    """Build the cache record format from configuration.
+
+    Args:
+        config: Configuration dict (cache_serializer, cache_compression)
+
+    Returns:
+        RecordFormat for new cache writes
+
+    Raises:
+        ValueError: If a name is unknown or its package is missing
+    """
+    return RecordFormat(
+        config.get("cache_serializer", "json"), config.get("cache_compression", "none")
+    )
@@ -0,0 +1,153 @@
+"""Retry policy shared by the LLM clients."""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 429, server errors, and Anthropic's 529 "overloaded"
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504, 529)
+
+# Called with each retryable error before backing off; returns seconds the
+# caller is already made to wait (e.g. a rate limiter paused by retry-after)
+OnRetry = Callable[[BaseException], float]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and how long to retry a failed call.
+
+    Delays use full jitter: a uniform draw between 0 and
+    min(max_delay, base_delay * 2**retry), so parallel workers that failed
+    together don't retry together.
+
+    Args:
+        max_attempts: Total attempts, including the first
+        base_delay: Cap of the first backoff, in seconds
+        max_delay: Cap of any one backoff, in seconds
+        deadline: Give up once this many seconds have passed since the
+            first attempt, or would have by the end of the next backoff
+            (None = no deadline)
+        retryable: Error classes always retried (connection errors, timeouts)
+        retry_statuses: HTTP statuses retried, for errors with a status_code
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 2.0
+    max_delay: float = 30.0
+    deadline: Optional[float] = None
+    retryable: Tuple[Type[BaseException], ...] = ()
+    retry_statuses: FrozenSet[int] = frozenset(DEFAULT_RETRY_STATUSES)
+    rng: random.Random = field(default_factory=random.Random, repr=False, compare=False)
+    clock: Callable[[], float] = field(default=time.monotonic, repr=False, compare=False)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Whether error is worth another attempt."""
+        if isinstance(error, self.retryable):
+            return True
+        status = getattr(error, "status_code", None)
+        return isinstance(status, int) and status in self.retry_statuses
+
+    def backoff(self, retry: int) -> float:
+        """Jittered delay before retry number retry (0-based)."""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+    def _next_delay(
+        self, error: BaseException, attempt: int, started: float, on_retry: Optional[OnRetry]
+    ) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up."""
+        if not self.is_retryable(error):
+            return None
+        # Tell the hook even on the last attempt, so it can hold back other callers
+        waited = on_retry(error) if on_retry is not None else 0.0
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = 0.0 if waited > 0 else self.backoff(attempt)
+        if self.deadline is not None:
+            if self.clock() - started + max(delay, waited) > self.deadline:
+                logger.warning(f"Retry deadline of {self.deadline}s reached; giving up: {error}")
+                return None
+        logger.warning(
+            f"{type(error).__name__}: {error}. Retrying in {max(delay, waited):.1f}s "
+            f"(attempt {attempt + 1}/{self.max_attempts})"
+        )
+        return delay
+
+    def run(self, call: Callable[[], T], on_retry: Optional[OnRetry] = None) -> Tuple[T, int]:
+        """Call until it succeeds or the policy gives up.
+
+        Args:
+            call: Makes one attempt
+            on_retry: Optional hook for each retryable error
+
+        Returns:
+            (result, number of retries it took)
+
+        Raises:
+            The last error, with a retries attribute, once the policy gives up
+        """
+        started = self.clock()
+        for attempt in range(self.max_attempts):
+            try:
+                return call(), attempt
+            except Exception as e:
+                delay = self._next_delay(e, attempt, started, on_retry)
+                if delay is None:
+                    _set_retries(e, attempt)
+                    raise
+            if delay:
+                time.sleep(delay)
+        raise RuntimeError("RetryPolicy.run: no attempts made (max_attempts < 1)")
+
+    async def run_async(
+        self, call: Callable[[], Awaitable[T]], on_retry: Optional[OnRetry] = None
+    ) -> Tuple[T, int]:
+        """run for coroutine calls; backs off with asyncio.sleep."""
+        started = self.clock()
+        for attempt in range(self.max_attempts):
+            try:
+                return await call(), attempt
+            except Exception as e:
+                delay = self._next_delay(e, attempt, started, on_retry)
+                if delay is None:
+                    _set_retries(e, attempt)
+                    raise
+            if delay:
+                await asyncio.sleep(delay)
+        raise RuntimeError("RetryPolicy.run_async: no attempts made (max_attempts < 1)")
+
+
+def _set_retries(error: BaseException, retries: int) -> None:
+    """Record on a final error how many retries preceded it."""
+    try:
+        error.retries = retries  # type: ignore[attr-defined]
+    except AttributeError:
+        pass
+
+
+def create_retry_policy(
+    config: Dict[str, Any], retryable: Tuple[Type[BaseException], ...] = ()
+) -> RetryPolicy:
+    """Build the retry policy from configuration.
+
+    Args:
+        config: Configuration dict (llm_retry_* settings)
+        retryable: The backend's connection/timeout error classes
+
+    Returns:
+        RetryPolicy
+    """
+    return RetryPolicy(
+        max_attempts=config.get("llm_retry_attempts", 3),
+        base_delay=config.get("llm_retry_base_delay", 2.0),
+        max_delay=config.get("llm_retry_max_delay", 30.0),
+        deadline=config.get("llm_retry_deadline"),
+        retryable=retryable,
+        retry_statuses=frozenset(config.get("llm_retry_statuses", DEFAULT_RETRY_STATUSES)),
+    )
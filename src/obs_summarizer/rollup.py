@@ -0,0 +1,179 @@
+"""Hierarchical map-reduce rollup for large digests."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from obs_summarizer.cache import SummaryCache, make_cache_key
+from obs_summarizer.summarizer import (
+    ROLLUP_PROMPT_VERSION,
+    create_rollup,
+    format_rollup_article,
+    merge_rollups,
+    rollup_cache_key,
+    summary_hash,
+)
+from obs_summarizer.tokens import TokenEstimator, estimate_tokens_heuristic
+
+logger = logging.getLogger(__name__)
+
+# On average one chunk boundary every this many items, chosen by content
+_BOUNDARY_DIVISOR = 16
+
+
+def chunk_items(
+    items: List[Tuple[str, str]],
+    max_tokens: int,
+    min_items: int = 1,
+    estimate: TokenEstimator = estimate_tokens_heuristic,
+) -> List[List[Tuple[str, str]]]:
+    """Split (key, text) items into token-bounded chunks.
+
+    If everything fits in max_tokens it stays one chunk. Otherwise chunks
+    end at content-defined boundaries (items whose key hashes to a
+    boundary), so inserting or changing one item only moves the chunk it
+    lands in, instead of shifting every later boundary; the token budget
+    is a hard cap on top of that.
+
+    Args:
+        items: (hex key, prompt text) pairs in a stable order
+        max_tokens: Estimated token budget per chunk
+        min_items: Never end a chunk with fewer items than this, even over budget
+        estimate: Token estimator
+
+    Returns:
+        Chunks of items, in order
+    """
+    if sum(estimate(text) for _, text in items) <= max_tokens:
+        return [items] if items else []
+
+    chunks = []
+    current: List[Tuple[str, str]] = []
+    current_tokens = 0
+    for key, text in items:
+        tokens = estimate(text)
+        if len(current) >= min_items and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append((key, text))
+        current_tokens += tokens
+        if len(current) >= min_items and int(key[:8], 16) % _BOUNDARY_DIVISOR == 0:
+            chunks.append(current)
+            current, current_tokens = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _run_level(
+    nodes: List[Tuple[str, Callable[[], str]]],
+    cache: SummaryCache,
+    executor: ThreadPoolExecutor,
+    no_cache: bool,
+) -> Tuple[Dict[str, str], int]:
+    """Produce every node of one tree level, from cache or in parallel.
+
+    The cache is only touched from the calling thread.
+
+    Returns:
+        ({node key: rollup text}, number of nodes served from cache)
+    """
+    hits = {} if no_cache else cache.get_many(key for key, _ in nodes)
+    texts = {key: hits[key]["rollup"] for key, _ in nodes if hits.get(key, {}).get("rollup")}
+
+    futures = [
+        (key, executor.submit(produce)) for key, produce in nodes if key not in texts
+    ]
+    for key, future in futures:
+        texts[key] = future.result()
+        cache.put(key, {"rollup": texts[key]})
+    return texts, len(nodes) - len(futures)
+
+
+def build_rollup(
+    llm_call: Callable,
+    summaries: List[Dict[str, Any]],
+    cache: SummaryCache,
+    model: str,
+    max_tokens: int = 8000,
+    concurrency: int = 1,
+    no_cache: bool = False,
+    estimate: TokenEstimator = estimate_tokens_heuristic,
+) -> str:
+    """Roll up any number of summaries as a tree of cached LLM calls.
+
+    Summaries are ordered by content hash and split into token-bounded
+    chunks. Each chunk gets its own rollup (the map step, run in parallel),
+    then the partial rollups are merged chunk by chunk until one remains
+    (the reduce steps). Every node is cached by the keys of its inputs, so
+    adding a note recomputes only the chunk it falls in and the path from
+    there to the root. A digest that fits in one chunk is a single call,
+    cached exactly like a plain create_rollup.
+
+    Args:
+        llm_call: LLM client callable (thread-safe)
+        summaries: Per-note summary dicts
+        cache: Open summary cache, used for every node
+        model: Model name, part of each node's cache key
+        max_tokens: Estimated token budget per rollup prompt
+        concurrency: Parallel LLM calls per tree level
+        no_cache: If True, recompute every node (results are still cached)
+        estimate: Token estimator for chunk budgets
+
+    Returns:
+        Markdown bullet list of cross-cutting insights
+    """
+    if not summaries:
+        return create_rollup(llm_call, summaries)
+
+    by_hash = sorted(((summary_hash(s), s) for s in summaries), key=lambda item: item[0])
+    summary_of = dict(by_hash)
+
+    # Map: one rollup per chunk of summaries
+    chunks = chunk_items(
+        [(h, format_rollup_article(i, s)) for i, (h, s) in enumerate(by_hash, 1)],
+        max_tokens,
+        estimate=estimate,
+    )
+    nodes: List[Tuple[str, Callable[[], str]]] = []
+    for chunk in chunks:
+        members = [summary_of[h] for h, _ in chunk]
+        nodes.append((rollup_cache_key(members, model), partial(create_rollup, llm_call, members)))
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        texts, cached = _run_level(nodes, cache, executor, no_cache)
+        total_nodes = len(nodes)
+        level = [key for key, _ in nodes]
+
+        # Reduce: merge partial rollups until one is left
+        while len(level) > 1:
+            chunks = chunk_items(
+                [(key, texts[key]) for key in level], max_tokens, min_items=2, estimate=estimate
+            )
+            # (key, producer), with no producer for a node carried up as is
+            next_level: List[Tuple[str, Optional[Callable[[], str]]]] = []
+            for chunk in chunks:
+                if len(chunk) == 1:
+                    # Nothing to merge; carry the node up unchanged
+                    next_level.append((chunk[0][0], None))
+                    continue
+                keys = [key for key, _ in chunk]
+                partials = [text for _, text in chunk]
+                merge_key = make_cache_key(
+                    "\n".join(keys), model, f"rollup-merge-{ROLLUP_PROMPT_VERSION}"
+                )
+                next_level.append((merge_key, partial(merge_rollups, llm_call, partials)))
+
+            merges = [(key, produce) for key, produce in next_level if produce is not None]
+            merged, merged_cached = _run_level(merges, cache, executor, no_cache)
+            texts.update(merged)
+            cached += merged_cached
+            total_nodes += len(merges)
+            level = [key for key, _ in next_level]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    logger.info(f"Rollup: {len(summaries)} summaries, {total_nodes} node(s), {cached} from cache")
+    return texts[level[0]]
@@ -1,86 +1,388 @@
 """Vault file scanning and filtering."""
 
+import logging
+import os
+import re
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Pattern, Tuple
 
+from obs_summarizer.manifest import hash_file, manifest_scope
 
-def list_markdown_files(
+logger = logging.getLogger(__name__)
+
+# Directory mtimes this close to "now" are not trusted on the next scan
+_RACY_WINDOW_NS = 2 * 10**9
+
+
+class FileRecord(NamedTuple):
+    """A discovered note with the stat fields captured once at scan time."""
+
+    path: Path
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def from_path(cls, path: Path) -> "FileRecord":
+        """Build a record for a single path with one lstat call."""
+        st = os.lstat(path)
+        return cls(Path(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+    @property
+    def mtime(self) -> datetime:
+        """Modification time as an aware UTC datetime."""
+        return datetime.fromtimestamp(self.mtime_ns / 1e9, tz=timezone.utc)
+
+
+class VaultChanges(NamedTuple):
+    """Notes added, changed or removed since the previous manifest scan."""
+
+    new: List[Path]
+    changed: List[Path]
+    deleted: List[Path]
+
+
+def _translate_glob(pattern: str) -> Pattern[str]:
+    """Compile a vault-relative glob pattern into a regex.
+
+    Mirrors ``Path.glob`` semantics: ``**`` matches zero or more path
+    segments, ``*`` and ``?`` never cross a ``/``, and hidden names are not
+    special. The regex is matched against a relative path with a trailing
+    slash, so each segment consumes ``name/``.
+
+    Args:
+        pattern: Glob pattern relative to the vault root
+
+    Returns:
+        Compiled regex for ``re.fullmatch``
+    """
+    parts = []
+    for segment in pattern.strip("/").split("/"):
+        if segment in ("", "."):
+            continue
+        if segment == "**":
+            parts.append("(?:[^/]+/)*")
+            continue
+
+        regex = ""
+        i = 0
+        while i < len(segment):
+            char = segment[i]
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[":
+                end = segment.find("]", i + 2)
+                if end < 0:
+                    regex += re.escape(char)
+                else:
+                    body = segment[i + 1 : end]
+                    if body.startswith("!"):
+                        body = "^" + body[1:]
+                    regex += "[" + body.replace("\\", "\\\\") + "]"
+                    i = end
+            else:
+                regex += re.escape(char)
+            i += 1
+        parts.append(regex + "/")
+
+    return re.compile("".join(parts))
+
+
+def _is_excluded(rel_path: str, patterns: List[Pattern[str]]) -> bool:
+    """Check a vault-relative path (POSIX separators) against exclude patterns."""
+    candidate = rel_path + "/"
+    return any(p.fullmatch(candidate) for p in patterns)
+
+
+def _join(rel_dir: str, name: str) -> str:
+    """Join a vault-relative directory and an entry name."""
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def _walk_markdown(
+    root: Path,
+    rel_root: str,
+    patterns: List[Pattern[str]],
+    old_dirs: Optional[Dict[str, Any]] = None,
+    new_dirs: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[Path, str, os.stat_result]]:
+    """Yield markdown files under root in a single pass.
+
+    Directories matching an exclude pattern are pruned before descending.
+    Symlinked directories are not followed and symlinked files are skipped.
+
+    When manifest listings are passed, a directory whose mtime matches its
+    cached listing is not re-read: adding, removing or renaming an entry
+    always bumps the directory mtime, so only the known files are lstat'ed.
+    Directories modified within the last few seconds are stored as racy and
+    re-read next time, since coarse mtime clocks can hide a same-tick change.
+
+    Args:
+        root: Resolved or vault-joined directory to walk
+        rel_root: Path of root relative to the vault ("" for the vault itself)
+        patterns: Compiled exclude patterns
+        old_dirs: Cached directory listings from the previous manifest
+        new_dirs: Receives the directory listings for the next manifest
+
+    Yields:
+        (path, vault-relative path, lstat result) for each non-excluded regular ``*.md`` file
+    """
+    racy_ns = time.time_ns() - _RACY_WINDOW_NS
+    stack = [(root, rel_root)]
+    while stack:
+        directory, rel_dir = stack.pop()
+
+        dir_mtime_ns = -1
+        if new_dirs is not None:
+            try:
+                dir_mtime_ns = os.lstat(directory).st_mtime_ns
+            except OSError:
+                continue
+            cached = (old_dirs or {}).get(rel_dir)
+            if cached and cached["mtime_ns"] == dir_mtime_ns:
+                new_dirs[rel_dir] = cached
+                for name in cached["subdirs"]:
+                    stack.append((directory / name, _join(rel_dir, name)))
+                prefix = os.path.join(directory, "")
+                for name in cached["files"]:
+                    try:
+                        st = os.lstat(prefix + name)
+                    except OSError:
+                        continue
+                    yield directory / name, _join(rel_dir, name), st
+                continue
+
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        files = []
+        for entry in entries:
+            rel_path = _join(rel_dir, entry.name)
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not _is_excluded(rel_path, patterns):
+                        subdirs.append(entry.name)
+                        stack.append((directory / entry.name, rel_path))
+                    continue
+                if not entry.name.endswith(".md") or not entry.is_file(follow_symlinks=False):
+                    continue
+                if _is_excluded(rel_path, patterns):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            files.append(entry.name)
+            yield directory / entry.name, rel_path, st
+
+        if new_dirs is not None:
+            new_dirs[rel_dir] = {
+                "mtime_ns": dir_mtime_ns if dir_mtime_ns < racy_ns else -1,
+                "files": files,
+                "subdirs": subdirs,
+            }
+
+
+def scan_vault(
     vault_path: str,
     include_folders: Optional[List[str]] = None,
     exclude_globs: Optional[List[str]] = None,
-) -> List[Path]:
-    """Discover markdown files in vault.
+    manifest: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[FileRecord], VaultChanges]:
+    """Discover markdown files in vault, optionally against a manifest.
+
+    Each file is stat'ed exactly once (lstat via the directory entry) and the
+    result is carried in a FileRecord, so callers never need to stat again.
+
+    With a manifest (see obs_summarizer.manifest), unchanged directories are
+    not re-listed and notes are compared with their previous size, mtime and
+    inode. Notes whose stat changed are re-hashed, so a touch that leaves the
+    content alone is not reported as changed. The manifest is updated in
+    place; the caller saves it. The first scan only records stats: hashing a
+    whole vault up front would cost a full read of every note.
 
     Args:
         vault_path: Path to Obsidian vault
         include_folders: If provided, restrict search to these folders (relative to vault)
         exclude_globs: Glob patterns to exclude
+        manifest: Manifest dict from load_manifest, or None for a plain scan
 
     Returns:
-        Sorted list of Path objects (oldest mtime first)
+        (FileRecords sorted oldest mtime first, VaultChanges since the previous manifest)
     """
     vault = Path(vault_path)
+    resolved_vault = vault.resolve()
 
-    # Determine search roots
+    # Determine search roots as (walk path, vault-relative path)
     if include_folders:
         roots = []
         for folder in include_folders:
             resolved = (vault / folder).resolve()
             try:
-                resolved.relative_to(vault.resolve())
+                rel = resolved.relative_to(resolved_vault)
             except ValueError:
                 raise ValueError(
                     f"include_folders entry '{folder}' resolves outside vault boundary.\n"
                     f"Vault: {vault}\nResolved: {resolved}"
                 )
-            roots.append(resolved)
+            roots.append((resolved, rel.as_posix() if rel.parts else ""))
     else:
-        roots = [vault]
+        roots = [(vault, "")]
+
+    patterns = [_translate_glob(p) for p in exclude_globs or []]
+
+    old_dirs: Dict[str, Any] = {}
+    old_files: Dict[str, Any] = {}
+    new_dirs: Optional[Dict[str, Any]] = None
+    new_files: Dict[str, Any] = {}
+    if manifest is not None:
+        scope = manifest_scope(vault_path, include_folders, exclude_globs)
+        if manifest.get("scope") == scope:
+            old_dirs = manifest["dirs"]
+            old_files = manifest["files"]
+        new_dirs = {}
+    # Without an earlier manifest there is nothing to compare hashes against
+    bootstrap = not old_files
 
-    # Collect markdown files
-    files = []
-    for root in roots:
-        if not root.exists():
+    # Single pass over each root, pruning excluded directories
+    records = []
+    changes = VaultChanges([], [], [])
+    for root, rel_root in roots:
+        if not root.is_dir():
             continue
-        files.extend(root.glob("**/*.md"))
-
-    # Build exclusion set - expand globs to actual files
-    excluded_paths = set()
-    if exclude_globs:
-        for pattern in exclude_globs:
-            matches = list(vault.glob(pattern))
-            for match in matches:
-                if match.is_file():
-                    excluded_paths.add(match)
-                elif match.is_dir():
-                    # Also exclude all files within this directory
-                    excluded_paths.update(match.glob("**/*.md"))
-
-    # Filter: exclude, skip symlinks, skip empty files
-    filtered = [
-        f
-        for f in files
-        if f not in excluded_paths and not f.is_symlink() and f.stat().st_size > 0
-    ]
+        # An include root nested inside an excluded directory yields nothing
+        rel_parts = rel_root.split("/") if rel_root else []
+        if any(
+            _is_excluded("/".join(rel_parts[: i + 1]), patterns) for i in range(len(rel_parts))
+        ):
+            continue
+
+        for path, rel_path, st in _walk_markdown(root, rel_root, patterns, old_dirs, new_dirs):
+            if rel_path in new_files:
+                continue
+
+            old = old_files.get(rel_path)
+            if (
+                old is not None
+                and old["mtime_ns"] == st.st_mtime_ns
+                and old["size"] == st.st_size
+                and old["inode"] == st.st_ino
+            ):
+                new_files[rel_path] = old
+            else:
+                sha256 = None
+                if not bootstrap and st.st_size > 0:
+                    try:
+                        sha256 = hash_file(path)
+                    except OSError:
+                        pass
+                if old is None:
+                    changes.new.append(vault / rel_path)
+                elif sha256 is None or sha256 != old["sha256"]:
+                    changes.changed.append(vault / rel_path)
+                new_files[rel_path] = {
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "inode": st.st_ino,
+                    "sha256": sha256,
+                }
+
+            # Skip empty files
+            if st.st_size > 0:
+                records.append(FileRecord(path, st.st_size, st.st_mtime_ns, st.st_ino))
+
+    if manifest is not None and new_dirs is not None:
+        changes.deleted.extend(vault / rel for rel in old_files if rel not in new_files)
+        reused = sum(1 for rel, listing in new_dirs.items() if old_dirs.get(rel) is listing)
+        logger.info(
+            f"Vault manifest: {len(changes.new)} new, {len(changes.changed)} changed, "
+            f"{len(changes.deleted)} deleted ({reused}/{len(new_dirs)} directories unchanged)"
+        )
+        manifest.update(scope=scope, dirs=new_dirs, files=new_files)
 
     # Sort by mtime (oldest first)
-    return sorted(filtered, key=lambda p: p.stat().st_mtime)
+    records.sort(key=lambda r: r.mtime_ns)
+    return records, changes
+
+
+def list_markdown_files(
+    vault_path: str,
+    include_folders: Optional[List[str]] = None,
+    exclude_globs: Optional[List[str]] = None,
+    manifest: Optional[Dict[str, Any]] = None,
+) -> List[FileRecord]:
+    """Discover markdown files in vault.
+
+    Args:
+        vault_path: Path to Obsidian vault
+        include_folders: If provided, restrict search to these folders (relative to vault)
+        exclude_globs: Glob patterns to exclude
+        manifest: Optional manifest dict, used and updated for incremental discovery
+
+    Returns:
+        Sorted list of FileRecords (oldest mtime first)
+    """
+    records, _ = scan_vault(vault_path, include_folders, exclude_globs, manifest)
+    return records
+
+
+def note_matcher(
+    vault_path: str,
+    include_folders: Optional[List[str]] = None,
+    exclude_globs: Optional[List[str]] = None,
+) -> Callable[[Path], bool]:
+    """Build a predicate for whether a path is a note scan_vault would discover.
+
+    For checking single paths reported by a file watcher, without a scan.
+    Only the path is checked; the file may no longer exist.
+
+    Args:
+        vault_path: Path to Obsidian vault
+        include_folders: If provided, only notes under these folders (relative to vault)
+        exclude_globs: Glob patterns to exclude
+
+    Returns:
+        Callable taking an absolute path
+    """
+    vault = Path(vault_path).resolve()
+    patterns = [_translate_glob(p) for p in exclude_globs or []]
+    roots = [(vault / folder).resolve() for folder in include_folders or []]
+
+    def matches(path: Path) -> bool:
+        path = Path(path)
+        if path.suffix != ".md":
+            return False
+        full = path.parent.resolve() / path.name
+        try:
+            rel = full.relative_to(vault)
+        except ValueError:
+            return False
+        if roots and not any(root in full.parents for root in roots):
+            return False
+        parts = rel.parts
+        return not any(
+            _is_excluded("/".join(parts[: i + 1]), patterns) for i in range(len(parts))
+        )
+
+    return matches
 
 
-def filter_files_since(files: List[Path], since_dt: datetime) -> List[Path]:
+def filter_files_since(files: List[FileRecord], since_dt: datetime) -> List[FileRecord]:
     """Filter files by modification time.
 
     Args:
-        files: List of file paths
+        files: File records from list_markdown_files
         since_dt: Minimum modification time (UTC)
 
     Returns:
         Files modified after since_dt, sorted by mtime (oldest first)
     """
-    result = []
-    for f in files:
-        mtime = datetime.fromtimestamp(f.stat().st_mtime, tz=timezone.utc)
-        if mtime > since_dt:
-            result.append(f)
-    return sorted(result, key=lambda p: p.stat().st_mtime)
+    result = [f for f in files if f.mtime > since_dt]
+    return sorted(result, key=lambda r: r.mtime_ns)
@@ -5,7 +5,7 @@ import logging
 import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -47,28 +47,59 @@ def load_state(state_path: str) -> dict:
         ) from e
 
 
-def save_state(state: dict, state_path: str) -> None:
-    """Save state atomically to disk.
-
-    Writes to temp file first, then renames to avoid partial writes.
+def write_json_atomic(path: Path, data: Any, **dump_kwargs: Any) -> None:
+    """Write JSON to path via a temp file in the same directory plus rename.
 
     Args:
-        state: State dictionary
-        state_path: Path to state.json
+        path: Destination file
+        data: JSON-serializable data
+        **dump_kwargs: Passed through to json.dumps
     """
-    path = Path(state_path)
+    write_text_atomic(path, json.dumps(data, **dump_kwargs))
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    """Write text to path via a temp file in the same directory plus rename."""
     path.parent.mkdir(parents=True, exist_ok=True)
 
     # Write to temp file, then rename atomically
     with tempfile.NamedTemporaryFile(
         mode="w", encoding="utf-8", dir=path.parent, delete=False, suffix=".tmp"
     ) as tmp:
-        json.dump(state, tmp, indent=2)
+        tmp.write(text)
         tmp_path = tmp.name
 
     Path(tmp_path).replace(path)
 
 
+def save_state(state: dict, state_path: str) -> None:
+    """Save state atomically to disk.
+
+    Writes to temp file first, then renames to avoid partial writes.
+
+    Args:
+        state: State dictionary
+        state_path: Path to state.json
+    """
+    write_json_atomic(Path(state_path), state, indent=2)
+
+
+def sidecar_path(state_path: str, name: str) -> Path:
+    """Path for a file stored next to the state file.
+
+    Example: sidecar_path("data/state.json", "manifest") -> data/state.manifest.json
+
+    Args:
+        state_path: Path to state.json
+        name: Sidecar name
+
+    Returns:
+        Path in the same directory as the state file
+    """
+    path = Path(state_path)
+    return path.with_name(f"{path.stem}.{name}.json")
+
+
 def get_since_datetime(
     config: dict, since_iso: Optional[str] = None, state: Optional[dict] = None
 ) -> datetime:
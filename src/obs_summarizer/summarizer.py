@@ -1,13 +1,50 @@
 """Note summarization and rollup logic."""
 
+import hashlib
 import json
 import logging
-from typing import Any, Callable, Dict, List, Optional
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from obs_summarizer.cache import make_cache_key
 from obs_summarizer.llm import LLMResponse
+from obs_summarizer.tokens import InputBudget, TokenEstimator, estimate_tokens_heuristic
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the summary prompts change, so cached summaries are regenerated
+PROMPT_VERSION = "1"
+
+TRUNCATION_MARKER = "\n[... truncated]"
+
+# Bump whenever the rollup prompt changes, so cached rollups are regenerated
+ROLLUP_PROMPT_VERSION = "1"
+
+# Bump whenever the long-note merge prompt changes, so merged summaries are regenerated
+LONG_NOTE_PROMPT_VERSION = "1"
+
+_HEADING = re.compile(r"#{1,6}(?:[ \t]|$)")
+_FENCE = re.compile(r"(```|~~~)")
+
+ROLLUP_SYSTEM_PROMPT = (
+    "You are a curator writing the Top Insights section of a daily reading digest. "
+    "From the article summaries, identify 3-5 cross-cutting insights that span "
+    "multiple articles.\n\n"
+    "Return only a markdown bullet list, one insight per bullet, 1-2 sentences each. "
+    "No headings and no preamble."
+)
+
+MERGE_ROLLUP_SYSTEM_PROMPT = (
+    "You are a curator writing the Top Insights section of a daily reading digest. "
+    "You are given partial insight lists, each drawn from a different group of "
+    "articles. Merge them into the 3-5 most important insights across all groups.\n\n"
+    "Return only a markdown bullet list, one insight per bullet, 1-2 sentences each. "
+    "No headings and no preamble."
+)
+
+# Summary fields the rollup prompt is built from
+_ROLLUP_FIELDS = ("summary", "bullets", "why_it_matters", "tags")
+
 
 def _parse_json(text: str) -> dict:
     """Extract JSON object from LLM response text.
@@ -66,12 +103,182 @@ def truncate_to_chars(text: str, max_chars: int) -> str:
         Truncated content (or original if under limit)
     """
     if len(text) > max_chars:
-        return text[:max_chars] + "\n[... truncated]"
+        return text[:max_chars] + TRUNCATION_MARKER
     return text
 
 
+def truncate_to_tokens(text: str, budget: InputBudget, max_chars: Optional[int] = None) -> str:
+    """Truncate text to the budget's token count (marker included) with marker.
+
+    max_chars stays a hard ceiling, so huge notes are never estimated whole.
+
+    Args:
+        text: Content to truncate
+        budget: Token budget and estimator
+        max_chars: Optional character ceiling applied first
+
+    Returns:
+        Truncated content (or original if within both limits)
+    """
+    head = text if max_chars is None else text[:max_chars]
+    return finish_truncation(head, len(head) < len(text), budget)
+
+
+def finish_truncation(head: str, truncated: bool, budget: Optional[InputBudget] = None) -> str:
+    """Turn the first max_chars of a note into the text sent to the LLM.
+
+    Adds the truncation marker when the note continued past head and, with
+    a budget, cuts head further to fit the token count. The cut is found by
+    binary search over the estimated token count of each prefix, then moved
+    back to a whitespace boundary if one is close.
+
+    Args:
+        head: Stripped note content, at most max_chars long
+        truncated: Whether the content continued past head
+        budget: Optional token budget and estimator
+
+    Returns:
+        Content with marker if anything was cut
+    """
+    if budget is None:
+        return head + TRUNCATION_MARKER if truncated else head
+    if not truncated and budget.estimate(head) <= budget.max_tokens:
+        return head
+
+    limit = budget.max_tokens - budget.estimate(TRUNCATION_MARKER)
+    if budget.estimate(head) <= limit:
+        return head + TRUNCATION_MARKER
+
+    # Longest prefix within the limit
+    lo, hi = 0, len(head)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if budget.estimate(head[:mid]) <= limit:
+            lo = mid
+        else:
+            hi = mid - 1
+
+    cut = max(head.rfind(" ", 0, lo), head.rfind("\n", 0, lo))
+    if cut < lo * 0.9:
+        cut = lo
+    return head[:cut] + TRUNCATION_MARKER
+
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You are a knowledge summarizer. Your task is to extract key insights from the given text and return ONLY a JSON object.\n\n"
+    "CRITICAL RULES:\n"
+    "1. Return ONLY valid JSON - no markdown, no explanation, no preamble\n"
+    "2. The response must start with { and end with }\n"
+    "3. All strings must be properly escaped\n"
+    "4. Arrays must be valid JSON arrays\n\n"
+    "Required fields in the JSON object:\n"
+    '- "summary": string (1-2 sentences summarizing the main point)\n'
+    '- "bullets": array of 5 strings (key takeaways)\n'
+    '- "why_it_matters": string (1 sentence on relevance)\n'
+    '- "tags": array of 1-3 strings (topic tags)\n'
+    '- "notable_quote": string or null (the most insightful quote from the text)\n\n'
+    "COMPLETE EXAMPLE:\n"
+    "{\n"
+    '  "summary": "This article discusses privacy in the digital age and advocates for journaling.",\n'
+    '  "bullets": ["Social media inverted privacy norms", "Constant sharing is now the default", "Privacy requires active effort", "Journaling offers a private alternative", "Personal reflection is valuable"],\n'
+    '  "why_it_matters": "Understanding privacy tradeoffs helps readers make informed choices.",\n'
+    '  "tags": ["privacy", "technology", "reflection"],\n'
+    '  "notable_quote": "Sharing has become the default; not sharing is the exception."\n'
+    "}\n\n"
+    "Return ONLY the JSON object, starting with { and ending with }. No other text."
+)
+
+STRICT_SUMMARY_SYSTEM_PROMPT = (
+    "STRICT JSON OUTPUT ONLY.\n\n"
+    "Return a valid JSON object with these exact fields:\n"
+    '- "summary": 1-2 sentences\n'
+    '- "bullets": array of 5 strings\n'
+    '- "why_it_matters": 1 sentence\n'
+    '- "tags": array of 1-3 strings\n'
+    '- "notable_quote": string or null\n\n'
+    "DO NOT include markdown code blocks (no ```).\n"
+    "DO NOT include any text before or after the JSON object.\n"
+    "Response must start with { and end with }.\n\n"
+    "Example:\n"
+    '{"summary":"...", "bullets":["..."], "why_it_matters":"...", "tags":["..."], "notable_quote":null}'
+)
+
+
+MERGE_SUMMARY_SYSTEM_PROMPT = (
+    "You are a knowledge summarizer. You are given summaries of consecutive parts of "
+    "one long note. Combine them into a single summary of the whole note and return "
+    "ONLY a JSON object.\n\n"
+    "CRITICAL RULES:\n"
+    "1. Return ONLY valid JSON - no markdown, no explanation, no preamble\n"
+    "2. The response must start with { and end with }\n"
+    "3. Cover the note as a whole, not part by part\n\n"
+    "Required fields in the JSON object:\n"
+    '- "summary": string (1-2 sentences summarizing the main point)\n'
+    '- "bullets": array of 5 strings (key takeaways)\n'
+    '- "why_it_matters": string (1 sentence on relevance)\n'
+    '- "tags": array of 1-3 strings (topic tags)\n'
+    '- "notable_quote": string or null (the most insightful quote among the parts)\n\n'
+    "Return ONLY the JSON object, starting with { and ending with }. No other text."
+)
+
+
+def normalize_note(
+    content: str, max_chars: int = 16000, budget: Optional[InputBudget] = None
+) -> str:
+    """Reduce raw note markdown to exactly the text sent to the LLM.
+
+    Args:
+        content: Note markdown content
+        max_chars: Max input chars before truncation
+        budget: Optional token budget; the text is cut to fit it as well
+
+    Returns:
+        Content without frontmatter, stripped and truncated
+    """
+    content = strip_frontmatter(content).strip()
+    if budget is None:
+        return truncate_to_chars(content, max_chars)
+    return truncate_to_tokens(content, budget, max_chars)
+
+
+def build_summary_prompt(text: str, title: str) -> Tuple[str, str]:
+    """Build the (system, user) prompt pair for summarizing one note.
+
+    Args:
+        text: Normalized note content (from normalize_note)
+        title: Note title/filename
+
+    Returns:
+        (system, user) messages
+    """
+    user = f"Title: {title}\n\nContent:\n{text}"
+    return SUMMARY_SYSTEM_PROMPT, user
+
+
+def parse_summary(text: str) -> Dict[str, Any]:
+    """Parse an LLM summary response and fill defaults for missing fields.
+
+    Raises:
+        ValueError: If no valid JSON object can be extracted
+    """
+    summary = _parse_json(text)
+
+    # Fill in defaults for missing fields (but only if JSON was successfully parsed)
+    summary.setdefault("summary", "")
+    summary.setdefault("bullets", [])
+    summary.setdefault("why_it_matters", "")
+    summary.setdefault("tags", [])
+    summary.setdefault("notable_quote", None)
+
+    return summary
+
+
 def summarize_note(
-    llm_call: Callable, content: str, title: str, max_chars: int = 16000
+    llm_call: Callable,
+    content: str,
+    title: str,
+    max_chars: int = 16000,
+    budget: Optional[InputBudget] = None,
 ) -> Dict[str, Any]:
     """Summarize a single note.
 
@@ -80,65 +287,42 @@ def summarize_note(
         content: Note markdown content
         title: Note title/filename
         max_chars: Max input chars before truncation
+        budget: Optional token budget for the note text
 
     Returns:
         Summary dict with fields: summary, bullets, why_it_matters, tags, notable_quote
     """
-    # Clean content
-    content = strip_frontmatter(content).strip()
-    content = truncate_to_chars(content, max_chars)
-
-    system = (
-        "You are a knowledge summarizer. Your task is to extract key insights from the given text and return ONLY a JSON object.\n\n"
-        "CRITICAL RULES:\n"
-        "1. Return ONLY valid JSON - no markdown, no explanation, no preamble\n"
-        "2. The response must start with { and end with }\n"
-        "3. All strings must be properly escaped\n"
-        "4. Arrays must be valid JSON arrays\n\n"
-        "Required fields in the JSON object:\n"
-        '- "summary": string (1-2 sentences summarizing the main point)\n'
-        '- "bullets": array of 5 strings (key takeaways)\n'
-        '- "why_it_matters": string (1 sentence on relevance)\n'
-        '- "tags": array of 1-3 strings (topic tags)\n'
-        '- "notable_quote": string or null (the most insightful quote from the text)\n\n'
-        "COMPLETE EXAMPLE:\n"
-        "{\n"
-        '  "summary": "This article discusses privacy in the digital age and advocates for journaling.",\n'
-        '  "bullets": ["Social media inverted privacy norms", "Constant sharing is now the default", "Privacy requires active effort", "Journaling offers a private alternative", "Personal reflection is valuable"],\n'
-        '  "why_it_matters": "Understanding privacy tradeoffs helps readers make informed choices.",\n'
-        '  "tags": ["privacy", "technology", "reflection"],\n'
-        '  "notable_quote": "Sharing has become the default; not sharing is the exception."\n'
-        "}\n\n"
-        "Return ONLY the JSON object, starting with { and ending with }. No other text."
-    )
+    return summarize_text(llm_call, normalize_note(content, max_chars, budget), title)
+
 
-    user = f"Title: {title}\n\nContent:\n{content}"
+def summarize_text(llm_call: Callable, text: str, title: str) -> Dict[str, Any]:
+    """Summarize already-normalized note content.
+
+    Args:
+        llm_call: LLM client callable (system, user) -> LLMResponse
+        text: Normalized note content (from normalize_note)
+        title: Note title/filename
 
+    Returns:
+        Summary dict with fields: summary, bullets, why_it_matters, tags, notable_quote
+    """
+    system, user = build_summary_prompt(text, title)
+    return _complete_summary(llm_call, system, user, title)
+
+
+def _complete_summary(llm_call: Callable, system: str, user: str, title: str) -> Dict[str, Any]:
+    """Call the LLM for a summary, retrying once with the strict prompt if it isn't JSON."""
     response = llm_call(system, user)
 
     try:
-        summary = _parse_json(response.content)
+        return parse_summary(response.content)
     except ValueError:
         logger.debug(f"First JSON parse failed for {title}. Response length: {len(response.content)}")
         logger.debug(f"First 500 chars: {response.content[:500]}")
         logger.warning(f"Failed to parse JSON for {title}. Retrying with stricter prompt.")
-        strict_system = (
-            "STRICT JSON OUTPUT ONLY.\n\n"
-            "Return a valid JSON object with these exact fields:\n"
-            '- "summary": 1-2 sentences\n'
-            '- "bullets": array of 5 strings\n'
-            '- "why_it_matters": 1 sentence\n'
-            '- "tags": array of 1-3 strings\n'
-            '- "notable_quote": string or null\n\n'
-            "DO NOT include markdown code blocks (no ```).\n"
-            "DO NOT include any text before or after the JSON object.\n"
-            "Response must start with { and end with }.\n\n"
-            "Example:\n"
-            '{"summary":"...", "bullets":["..."], "why_it_matters":"...", "tags":["..."], "notable_quote":null}'
-        )
-        response = llm_call(strict_system, user)
+        response = llm_call(STRICT_SUMMARY_SYSTEM_PROMPT, user)
         try:
-            summary = _parse_json(response.content)
+            return parse_summary(response.content)
         except ValueError as e:
             raise ValueError(
                 f"Failed to parse JSON response for {title} after retry.\n"
@@ -146,50 +330,183 @@ def summarize_note(
                 f"Error: {e}"
             ) from e
 
-    # Fill in defaults for missing fields (but only if JSON was successfully parsed)
-    summary.setdefault("summary", "")
-    summary.setdefault("bullets", [])
-    summary.setdefault("why_it_matters", "")
-    summary.setdefault("tags", [])
-    summary.setdefault("notable_quote", None)
 
-    return summary
+def summary_hash(summary: Dict[str, Any]) -> str:
+    """SHA256 of the summary fields a rollup is built from (not path/mtime)."""
+    fields = {field: summary.get(field) for field in _ROLLUP_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+def rollup_cache_key(summaries: List[Dict[str, Any]], model: str) -> str:
+    """Cache key for the rollup of a set of summaries.
+
+    Order-independent, so the same notes in a different order reuse the
+    cached rollup.
+
+    Args:
+        summaries: Per-note summary dicts
+        model: Model name the rollup is produced with
+
+    Returns:
+        SHA256 hex digest
+    """
+    hashes = sorted(summary_hash(s) for s in summaries)
+    return make_cache_key("\n".join(hashes), model, f"rollup-{ROLLUP_PROMPT_VERSION}")
 
 
 def create_rollup(llm_call: Callable, summaries: List[Dict[str, Any]]) -> str:
-    """Create a rollup digest from per-note summaries.
+    """Create the Top Insights rollup from per-note summaries.
 
     Args:
         llm_call: LLM client callable
         summaries: List of summary dicts (from summarize_note)
 
     Returns:
-        Markdown digest content
+        Markdown bullet list of cross-cutting insights
     """
     if not summaries:
         return "# Daily Digest\n\nNo notes to summarize today."
 
-    # Format summaries for the rollup prompt
-    summaries_text = ""
-    for i, summary in enumerate(summaries, 1):
-        summaries_text += f"\n---\n**Article {i}**\n"
-        summaries_text += f"- Summary: {summary.get('summary', '')}\n"
-        summaries_text += (
-            f"- Key points: {', '.join(summary.get('bullets', [])[:3])}\n"
-        )
-        summaries_text += f"- Why it matters: {summary.get('why_it_matters', '')}\n"
-        summaries_text += f"- Tags: {', '.join(summary.get('tags', []))}\n"
-
-    system = (
-        "You are a curator creating a daily reading digest. "
-        "Your job is to:\n"
-        "1. Group the article summaries by theme or topic\n"
-        "2. For each group, write a brief 1-2 sentence overview\n"
-        "3. At the end, list 3-5 cross-cutting insights that span multiple articles\n\n"
-        "Return markdown formatted output with clear headings and organization."
+    articles = "".join(format_rollup_article(i, s) for i, s in enumerate(summaries, 1))
+    user = f"Please write the top insights across these summaries:\n{articles}"
+
+    response = llm_call(ROLLUP_SYSTEM_PROMPT, user)
+    return response.content
+
+
+def format_rollup_article(number: int, summary: Dict[str, Any]) -> str:
+    """Format one summary as an article block of the rollup prompt."""
+    return (
+        f"\n---\n**Article {number}**\n"
+        f"- Summary: {summary.get('summary', '')}\n"
+        f"- Key points: {', '.join(summary.get('bullets', [])[:3])}\n"
+        f"- Why it matters: {summary.get('why_it_matters', '')}\n"
+        f"- Tags: {', '.join(summary.get('tags', []))}\n"
     )
 
-    user = f"Please create a reading digest from these summaries:\n{summaries_text}"
 
-    response = llm_call(system, user)
+def merge_rollups(llm_call: Callable, partials: List[str]) -> str:
+    """Merge partial rollups (from create_rollup over groups of notes) into one.
+
+    Args:
+        llm_call: LLM client callable
+        partials: Insight lists, one per group of notes
+
+    Returns:
+        Markdown bullet list of cross-cutting insights
+    """
+    groups = "".join(
+        f"\n---\n**Group {i}**\n{partial.strip()}\n" for i, partial in enumerate(partials, 1)
+    )
+    user = f"Please merge these partial insight lists:\n{groups}"
+
+    response = llm_call(MERGE_ROLLUP_SYSTEM_PROMPT, user)
     return response.content
+
+
+def split_note(
+    text: str, max_tokens: int, estimate: TokenEstimator = estimate_tokens_heuristic
+) -> List[str]:
+    """Split note content into chunks of at most max_tokens, preferring headings.
+
+    The note is cut into sections at markdown headings (ignoring lines
+    inside code fences) and sections are packed greedily from the start.
+    A section over budget is split at blank lines, and a paragraph still
+    over budget at whitespace. Packing from the start keeps every chunk
+    before a change identical, so appending to a note only changes the
+    last chunks.
+
+    Args:
+        text: Normalized note content
+        max_tokens: Estimated token budget per chunk
+        estimate: Token estimator
+
+    Returns:
+        Non-empty chunks, in order
+    """
+    sections: List[str] = []
+    current: List[str] = []
+    fence = None
+    for line in text.splitlines(keepends=True):
+        stripped = line.lstrip()
+        opening = _FENCE.match(stripped)
+        if fence is None and current and _HEADING.match(stripped):
+            sections.append("".join(current))
+            current = []
+        if opening and fence is None:
+            fence = opening.group(1)
+        elif fence is not None and stripped.startswith(fence):
+            fence = None
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+
+    pieces = []
+    for section in sections:
+        if estimate(section) <= max_tokens:
+            pieces.append(section)
+            continue
+        for paragraph in re.split(r"(?<=\n)(?=\s*\n)", section):
+            if estimate(paragraph) <= max_tokens:
+                pieces.append(paragraph)
+            else:
+                pieces.extend(_split_at_whitespace(paragraph, max_tokens, estimate))
+
+    chunks = []
+    chunk = ""
+    for piece in pieces:
+        if chunk and estimate(chunk + piece) > max_tokens:
+            chunks.append(chunk)
+            chunk = ""
+        chunk += piece
+    if chunk:
+        chunks.append(chunk)
+    return [c.strip() for c in chunks if c.strip()]
+
+
+def _split_at_whitespace(text: str, max_tokens: int, estimate: TokenEstimator) -> List[str]:
+    """Cut text into prefixes within max_tokens, backing off to whitespace."""
+    pieces = []
+    while text:
+        if estimate(text) <= max_tokens:
+            pieces.append(text)
+            break
+        lo, hi = 1, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if estimate(text[:mid]) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = max(text.rfind(" ", 0, lo), text.rfind("\n", 0, lo))
+        if cut < lo * 0.9:
+            cut = lo
+        pieces.append(text[:cut])
+        text = text[cut:]
+    return pieces
+
+
+def merge_summaries(
+    llm_call: Callable, partials: List[Dict[str, Any]], title: str
+) -> Dict[str, Any]:
+    """Merge summaries of consecutive parts of one note into one summary.
+
+    Args:
+        llm_call: LLM client callable
+        partials: Part summaries, in note order
+        title: Note title/filename
+
+    Returns:
+        Summary dict with fields: summary, bullets, why_it_matters, tags, notable_quote
+    """
+    parts = "".join(
+        f"\n---\n**Part {i}**\n"
+        f"- Summary: {partial.get('summary', '')}\n"
+        f"- Key points: {'; '.join(partial.get('bullets', []))}\n"
+        f"- Why it matters: {partial.get('why_it_matters', '')}\n"
+        f"- Tags: {', '.join(partial.get('tags', []))}\n"
+        f"- Notable quote: {partial.get('notable_quote') or 'none'}\n"
+        for i, partial in enumerate(partials, 1)
+    )
+    user = f"Title: {title}\n\nPart summaries:\n{parts}"
+    return _complete_summary(llm_call, MERGE_SUMMARY_SYSTEM_PROMPT, user, title)
@@ -0,0 +1,118 @@
+"""Offline token estimation and per-call input budgets."""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+TokenEstimator = Callable[[str], int]
+
+TOKEN_ESTIMATORS = ("auto", "heuristic", "tiktoken")
+
+# Pieces a BPE tokenizer roughly maps to whole tokens: one CJK/kana/hangul
+# character, a run of letters, up to three digits, or one other symbol
+_TOKEN_PIECE = re.compile(
+    "[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"
+    r"|[^\W\d_]+"
+    r"|\d{1,3}"
+    r"|[^\w\s]|_"
+)
+
+
+def estimate_tokens_heuristic(text: str) -> int:
+    """Estimate tokens without a tokenizer.
+
+    Each CJK character and each symbol counts as a token, which matches
+    BPE tokenizers far better than a fixed chars-per-token ratio on CJK text
+    and on punctuation-dense markdown or code. Letter runs cost one token
+    per ~6 ASCII or ~3 non-ASCII characters.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count
+    """
+    tokens = 0
+    for match in _TOKEN_PIECE.finditer(text):
+        piece = match.group()
+        if len(piece) == 1:
+            tokens += 1
+        else:
+            tokens += 1 + (len(piece) - 1) // (6 if piece.isascii() else 3)
+    return tokens
+
+
+def _create_tiktoken_estimator() -> TokenEstimator:
+    """Count with tiktoken's cl100k_base encoding (optional dependency)."""
+    try:
+        import tiktoken
+    except ImportError as e:
+        raise ValueError(
+            "token_estimator: tiktoken requires the tiktoken package "
+            "(pip install 'obs-summarizer[tiktoken]')"
+        ) from e
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def resolve_estimator_name(name: str, llm_backend: str) -> str:
+    """Pick the concrete estimator for "auto".
+
+    Anthropic's tokenizer is not available offline, so claude uses the
+    heuristic. OpenAI-compatible local servers use tiktoken when installed.
+    """
+    if name != "auto":
+        return name
+    if llm_backend == "local":
+        try:
+            import tiktoken  # noqa: F401
+        except ImportError:
+            return "heuristic"
+        return "tiktoken"
+    return "heuristic"
+
+
+def create_token_estimator(name: str) -> TokenEstimator:
+    """Create a token estimator by name.
+
+    Raises:
+        ValueError: If the estimator is unknown or its dependency is missing
+    """
+    if name == "heuristic":
+        return estimate_tokens_heuristic
+    if name == "tiktoken":
+        return _create_tiktoken_estimator()
+    raise ValueError(f"Unknown token_estimator: {name}. Must be one of {TOKEN_ESTIMATORS}.")
+
+
+@dataclass(frozen=True)
+class InputBudget:
+    """Token budget for the note text sent with one LLM call."""
+
+    max_tokens: int
+    estimator: str = "heuristic"
+    _estimate: TokenEstimator = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_estimate", create_token_estimator(self.estimator))
+
+    def estimate(self, text: str) -> int:
+        """Estimated token count of text."""
+        return self._estimate(text)
+
+
+def create_input_budget(config: Dict) -> InputBudget:
+    """Build the per-call input budget from configuration.
+
+    Args:
+        config: Configuration dict (max_input_tokens, token_estimator, llm_backend)
+
+    Returns:
+        InputBudget for note text
+    """
+    name = resolve_estimator_name(config.get("token_estimator", "auto"), config["llm_backend"])
+    return InputBudget(config.get("max_input_tokens", 4000), name)
@@ -0,0 +1,246 @@
+"""Watch mode: summarize notes as they change, write the digest on a schedule."""
+
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from obs_summarizer.circuit import create_circuit_breaker
+from obs_summarizer.config import WATCH_BACKENDS
+from obs_summarizer.llm import backend_failure_types, create_llm_client
+from obs_summarizer.manifest import load_manifest, save_manifest
+from obs_summarizer.pipeline import prefetch_summaries, run_pipeline
+from obs_summarizer.scanner import note_matcher, scan_vault
+from obs_summarizer.state import load_state, save_state, sidecar_path
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeSource(ABC):
+    """Reports paths of notes that were added or changed."""
+
+    @abstractmethod
+    def changes(self, timeout: float) -> List[Path]:
+        """Wait up to timeout seconds and return the paths changed meanwhile."""
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+class PollingSource(ChangeSource):
+    """Rescans the vault every interval, incrementally against the manifest.
+
+    Unchanged directories are not re-listed, so a poll costs one lstat per
+    note. Used where inotify (through watchdog) is unavailable.
+    """
+
+    def __init__(self, config: Dict, interval: float):
+        self.config = config
+        self.interval = interval
+        self.manifest_path = sidecar_path(config["state_path"], "manifest")
+        self._next_poll = time.monotonic()
+        self._stop = threading.Event()
+
+    def changes(self, timeout: float) -> List[Path]:
+        wait = self._next_poll - time.monotonic()
+        if wait > timeout:
+            self._stop.wait(timeout)
+            return []
+        if wait > 0:
+            self._stop.wait(wait)
+        self._next_poll = time.monotonic() + self.interval
+
+        manifest = load_manifest(self.manifest_path)
+        _, changes = scan_vault(
+            self.config["vault_path"],
+            include_folders=self.config.get("include_folders"),
+            exclude_globs=self.config.get("exclude_globs"),
+            manifest=manifest,
+        )
+        save_manifest(manifest, self.manifest_path)
+        return changes.new + changes.changed
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+class WatchdogSource(ChangeSource):
+    """Receives file events from watchdog (inotify on Linux, FSEvents on macOS)."""
+
+    def __init__(self, config: Dict):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        events: "queue.Queue[Path]" = queue.Queue()
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):  # type: ignore[no-untyped-def]
+                if event.is_directory or event.event_type not in ("created", "modified", "moved"):
+                    return
+                events.put(Path(getattr(event, "dest_path", "") or event.src_path))
+
+        self._events = events
+        self._observer = Observer()
+        vault = Path(config["vault_path"])
+        roots = [vault / f for f in config.get("include_folders") or []] or [vault]
+        for root in roots:
+            if root.is_dir():
+                self._observer.schedule(_Handler(), str(root), recursive=True)
+        self._observer.start()
+
+    def changes(self, timeout: float) -> List[Path]:
+        try:
+            paths = [self._events.get(timeout=max(timeout, 0))]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                paths.append(self._events.get_nowait())
+            except queue.Empty:
+                return paths
+
+    def close(self) -> None:
+        self._observer.stop()
+        self._observer.join()
+
+
+def create_change_source(config: Dict) -> ChangeSource:
+    """Create the configured change source.
+
+    "auto" uses watchdog when it is installed and falls back to polling.
+
+    Raises:
+        ValueError: If watch_backend is unknown, or inotify and watchdog is missing
+    """
+    backend = config.get("watch_backend", "auto")
+    interval = config.get("watch_poll_seconds", 60)
+    if backend not in WATCH_BACKENDS:
+        raise ValueError(f"Unknown watch_backend: {backend}. Must be one of {WATCH_BACKENDS}.")
+    if backend == "poll":
+        return PollingSource(config, interval)
+    try:
+        return WatchdogSource(config)
+    except ImportError as e:
+        if backend == "inotify":
+            raise ValueError(
+                "watch_backend: inotify requires the watchdog package "
+                "(pip install 'obs-summarizer[watch]')"
+            ) from e
+        logger.info(f"watchdog is not installed; polling the vault every {interval}s")
+        return PollingSource(config, interval)
+
+
+class Debouncer:
+    """Holds paths until they have been quiet for delay seconds."""
+
+    def __init__(self, delay: float, clock: Optional[Callable[[], float]] = None):
+        self.delay = delay
+        self.clock = clock or time.monotonic
+        self._last_seen: Dict[Path, float] = {}
+
+    def add(self, paths: Iterable[Path]) -> None:
+        now = self.clock()
+        for path in paths:
+            self._last_seen[path] = now
+
+    def due(self) -> List[Path]:
+        """Pop the paths whose last change is at least delay seconds old."""
+        cutoff = self.clock() - self.delay
+        ready = [p for p, seen in self._last_seen.items() if seen <= cutoff]
+        for path in ready:
+            del self._last_seen[path]
+        return ready
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next path is due, or None if nothing is held."""
+        if not self._last_seen:
+            return None
+        return max(min(self._last_seen.values()) + self.delay - self.clock(), 0.0)
+
+
+def next_digest_time(now: datetime, digest_at: str) -> datetime:
+    """The next time after now (local) that the clock reads digest_at ("HH:MM")."""
+    hour, minute = (int(part) for part in digest_at.split(":"))
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def run_watch(
+    config: Dict,
+    stop: Optional[threading.Event] = None,
+    source: Optional[ChangeSource] = None,
+    now: Callable[[], datetime] = lambda: datetime.now().astimezone(),
+) -> int:
+    """Summarize notes as they change and write the digest daily at watch_digest_at.
+
+    One LLM client is created up front and reused for every call. Changed
+    notes are summarized into the cache once they have been quiet for
+    watch_debounce_seconds, so a burst of edits costs one summary; the
+    scheduled digest run then finds them cached. Failures are logged and
+    the watch keeps going.
+
+    Args:
+        config: Configuration dictionary
+        stop: Optional event that ends the watch when set
+        source: Optional change source (defaults to create_change_source)
+        now: Current local time, for the digest schedule
+
+    Returns:
+        Exit code (0 once stopped or interrupted)
+    """
+    stop = stop or threading.Event()
+    state = load_state(config["state_path"])
+    if not config.get("since_iso") and not state.get("last_run_iso"):
+        # A first run finds nothing, so start the checkpoint at the watch start
+        state["last_run_iso"] = now().astimezone(timezone.utc).isoformat()
+        save_state(state, config["state_path"])
+        logger.info(f"No checkpoint yet; including notes modified from {state['last_run_iso']}")
+
+    llm_client = create_llm_client(config)
+    # One breaker for the whole watch, so a dead backend is probed rather
+    # than retried in full by every prefetch
+    breaker = create_circuit_breaker(config, backend_failure_types(config))
+    source = source or create_change_source(config)
+    is_note = note_matcher(
+        config["vault_path"], config.get("include_folders"), config.get("exclude_globs")
+    )
+    digest_dir = (Path(config["vault_path"]) / config["digest_folder"]).resolve()
+    debouncer = Debouncer(config.get("watch_debounce_seconds", 5))
+    digest_at = config.get("watch_digest_at", "07:00")
+    next_digest = next_digest_time(now(), digest_at)
+    logger.info(f"Watching {config['vault_path']}; next digest at {next_digest.isoformat()}")
+
+    try:
+        while not stop.is_set():
+            waits = [(next_digest - now()).total_seconds(), 1.0]
+            due_in = debouncer.next_due_in()
+            if due_in is not None:
+                waits.append(due_in)
+            changed = source.changes(max(min(waits), 0.0))
+            debouncer.add(
+                p for p in changed if is_note(p) and digest_dir not in p.resolve().parents
+            )
+
+            due = debouncer.due()
+            if due:
+                try:
+                    summarized = prefetch_summaries(config, due, llm_client, breaker)
+                    logger.info(f"Summarized {summarized} of {len(due)} changed notes")
+                except Exception as e:
+                    logger.error(f"Failed to summarize changed notes: {e}", exc_info=True)
+
+            if now() >= next_digest:
+                result = run_pipeline(config, llm_client=llm_client, breaker=breaker)
+                logger.info(f"Scheduled digest finished with exit code {result}")
+                next_digest = next_digest_time(now(), digest_at)
+    except KeyboardInterrupt:
+        logger.info("Watch interrupted")
+    finally:
+        source.close()
+    return 0
@@ -65,8 +65,8 @@ def sample_config(tmp_vault):
         "exclude_globs": ["**/.obsidian/**", "**/templates/**"],
         "digest_folder": "Daily Digests",
         "max_input_chars": 16000,
-        "cache_dir": ".cache/summaries",
-        "state_path": "state.json",
+        "cache_dir": str(tmp_vault.parent / "cache"),
+        "state_path": str(tmp_vault.parent / "state.json"),
     }
 
 
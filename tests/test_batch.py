@@ -0,0 +1,213 @@
+"""Tests for batch module."""
+
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from obs_summarizer.batch import run_summary_batch
+from obs_summarizer.scanner import FileRecord
+from obs_summarizer.state import load_state
+
+
+def _entry(custom_id, text=None, result_type="succeeded"):
+    entry = MagicMock(custom_id=custom_id)
+    entry.result.type = result_type
+    entry.result.message.content = [MagicMock(text=text)]
+    return entry
+
+
+@pytest.fixture
+def batch_config(sample_config):
+    return {**sample_config, "batch_poll_interval": 0}
+
+
+@pytest.fixture
+def mock_anthropic():
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "sk-ant-test"}), \
+         patch("anthropic.Anthropic") as mock_cls, \
+         patch("obs_summarizer.batch.time.sleep"):
+        client = MagicMock()
+        mock_cls.return_value = client
+        yield client
+
+
+def test_run_summary_batch_submits_and_parses(batch_config, tmp_vault, mock_anthropic):
+    """Cache misses are sent as one batch and parsed into summaries."""
+    note_a = FileRecord.from_path(tmp_vault / "Clippings" / "article1.md")
+    note_b = FileRecord.from_path(tmp_vault / "Clippings" / "article2.md")
+
+    mock_anthropic.messages.batches.create.return_value = MagicMock(id="msgbatch_1")
+    mock_anthropic.messages.batches.retrieve.side_effect = [
+        MagicMock(processing_status="in_progress"),
+        MagicMock(processing_status="ended"),
+    ]
+    mock_anthropic.messages.batches.results.return_value = [
+        _entry("key_a", json.dumps({"summary": "A"})),
+        _entry("key_b", "not json"),
+    ]
+
+    state = {"last_run_iso": None}
+    result = run_summary_batch(batch_config, [("key_a", note_a, None), ("key_b", note_b, None)], state)
+
+    requests = mock_anthropic.messages.batches.create.call_args.kwargs["requests"]
+    assert [r["custom_id"] for r in requests] == ["key_a", "key_b"]
+    assert "Content here." in requests[0]["params"]["messages"][0]["content"]
+
+    # Unparseable result is left for the per-note fallback
+    assert list(result) == ["key_a"]
+    assert result["key_a"]["summary"] == "A"
+    assert result["key_a"]["bullets"] == []
+    assert result["key_a"]["path"] == str(note_a.path)
+    assert "batch" not in state
+    assert "batch" not in load_state(batch_config["state_path"])
+
+
+def test_run_summary_batch_resumes_stored_batch(batch_config, mock_anthropic):
+    """A single batch recorded in state is polled again instead of resubmitted."""
+    state = {
+        "last_run_iso": None,
+        "batch": {
+            "id": "msgbatch_old",
+            "created_iso": "2026-02-25T00:00:00+00:00",
+            "notes": {"key_a": ["/vault/a.md", "2026-02-24T00:00:00+00:00"]},
+        },
+    }
+    mock_anthropic.messages.batches.retrieve.return_value = MagicMock(processing_status="ended")
+    mock_anthropic.messages.batches.results.return_value = [
+        _entry("key_a", json.dumps({"summary": "A"})),
+    ]
+
+    result = run_summary_batch(batch_config, [], state)
+
+    mock_anthropic.messages.batches.create.assert_not_called()
+    mock_anthropic.messages.batches.retrieve.assert_called_with("msgbatch_old")
+    assert result["key_a"]["path"] == "/vault/a.md"
+    assert "batch" not in state
+
+
+def test_run_summary_batch_splits_by_size_and_count(batch_config, tmp_vault, mock_anthropic):
+    """Notes over a batch's size or count limit go in further batches, all checkpointed."""
+    notes = [FileRecord.from_path(tmp_vault / "Clippings" / f"article{n}.md") for n in (1, 2)]
+    mock_anthropic.messages.batches.create.side_effect = [MagicMock(id="msgbatch_1"), MagicMock(id="msgbatch_2")]
+    mock_anthropic.messages.batches.retrieve.return_value = MagicMock(processing_status="ended")
+    mock_anthropic.messages.batches.results.side_effect = [
+        [_entry("key_a", json.dumps({"summary": "A"}))],
+        [_entry("key_b", json.dumps({"summary": "B"}))],
+    ]
+    saved = []
+
+    with patch("obs_summarizer.batch.MAX_BATCH_BYTES", 100), \
+         patch("obs_summarizer.batch.save_state", side_effect=lambda state, path: saved.append(
+             [batch["id"] for batch in state.get("batch", [])])):
+        result = run_summary_batch(batch_config, [("key_a", notes[0], None), ("key_b", notes[1], None)], {})
+
+    created = mock_anthropic.messages.batches.create.call_args_list
+    assert [[r["custom_id"] for r in call.kwargs["requests"]] for call in created] == [["key_a"], ["key_b"]]
+    assert saved == [["msgbatch_1"], ["msgbatch_1", "msgbatch_2"], []]
+    assert sorted(result) == ["key_a", "key_b"]
+
+    # Under both limits, one batch
+    mock_anthropic.messages.batches.create.reset_mock(side_effect=True)
+    mock_anthropic.messages.batches.create.return_value = MagicMock(id="msgbatch_3")
+    mock_anthropic.messages.batches.results.side_effect = None
+    mock_anthropic.messages.batches.results.return_value = []
+    with patch("obs_summarizer.batch.MAX_BATCH_REQUESTS", 2):
+        run_summary_batch(batch_config, [("key_a", notes[0], None), ("key_b", notes[1], None)], {})
+    mock_anthropic.messages.batches.create.assert_called_once()
+
+    # Over the request count, one batch each
+    mock_anthropic.messages.batches.create.reset_mock()
+    with patch("obs_summarizer.batch.MAX_BATCH_REQUESTS", 1):
+        run_summary_batch(batch_config, [("key_a", notes[0], None), ("key_b", notes[1], None)], {})
+    assert mock_anthropic.messages.batches.create.call_count == 2
+
+
+def test_run_summary_batch_resumes_every_stored_batch(batch_config, mock_anthropic):
+    """All batches of an interrupted run are resumed, none resubmitted."""
+    state = {
+        "last_run_iso": None,
+        "batch": [
+            {"id": f"msgbatch_{n}", "created_iso": "2026-02-25T00:00:00+00:00",
+             "notes": {f"key_{n}": [f"/vault/{n}.md", "2026-02-24T00:00:00+00:00"]}}
+            for n in (1, 2)
+        ],
+    }
+    mock_anthropic.messages.batches.retrieve.return_value = MagicMock(processing_status="ended")
+    mock_anthropic.messages.batches.results.side_effect = [
+        [_entry("key_1", json.dumps({"summary": "1"}))],
+        [_entry("key_2", json.dumps({"summary": "2"}))],
+    ]
+
+    result = run_summary_batch(batch_config, [], state)
+
+    mock_anthropic.messages.batches.create.assert_not_called()
+    assert [c.args for c in mock_anthropic.messages.batches.retrieve.call_args_list] == [
+        ("msgbatch_1",), ("msgbatch_2",)
+    ]
+    assert sorted(result) == ["key_1", "key_2"]
+    assert "batch" not in state
+
+
+def test_run_summary_batch_saves_id_before_polling(batch_config, tmp_vault, mock_anthropic):
+    """The batch ID is checkpointed before polling so an interrupt can resume it."""
+    note = FileRecord.from_path(tmp_vault / "Clippings" / "article1.md")
+    mock_anthropic.messages.batches.create.return_value = MagicMock(id="msgbatch_1")
+    mock_anthropic.messages.batches.retrieve.side_effect = KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run_summary_batch(batch_config, [("key_a", note, None)], {"last_run_iso": None})
+
+    assert load_state(batch_config["state_path"])["batch"][0]["id"] == "msgbatch_1"
+
+
+def test_run_summary_batch_retries_transient_poll_errors(batch_config, mock_anthropic):
+    """A 503 while polling is retried under the retry policy, not fatal to the run."""
+
+    class Overloaded(Exception):
+        status_code = 503
+
+    state = {
+        "batch": [{"id": "msgbatch_1", "created_iso": "2026-02-25T00:00:00+00:00", "notes": {}}],
+    }
+    mock_anthropic.messages.batches.retrieve.side_effect = [
+        Overloaded("overloaded"),
+        MagicMock(processing_status="ended"),
+    ]
+    mock_anthropic.messages.batches.results.return_value = []
+
+    with patch("obs_summarizer.retry.time.sleep"):
+        assert run_summary_batch(batch_config, [], state) == {}
+    assert mock_anthropic.messages.batches.retrieve.call_count == 2
+    assert "batch" not in state
+
+
+def test_run_summary_batch_requires_claude(batch_config):
+    """Batch mode is only available on the claude backend."""
+    batch_config["llm_backend"] = "local"
+    with pytest.raises(ValueError, match="requires llm_backend: claude"):
+        run_summary_batch(batch_config, [], {})
+
+
+def test_run_summary_batch_records_usage_at_batch_prices(batch_config, tmp_vault, mock_anthropic):
+    """Batch results carry per-note usage, costed at the batch discount."""
+    from obs_summarizer.metrics import DEFAULT_LLM_PRICING, RunMetrics
+
+    note = FileRecord.from_path(tmp_vault / "Clippings" / "article1.md")
+    entry = _entry("key_a", json.dumps({"summary": "A"}))
+    entry.result.message.model = "claude-sonnet-4-6"
+    entry.result.message.usage.input_tokens = 1_000_000
+    entry.result.message.usage.output_tokens = 0
+    entry.result.message.usage.cache_read_input_tokens = 0
+    entry.result.message.usage.cache_creation_input_tokens = 0
+    mock_anthropic.messages.batches.create.return_value = MagicMock(id="msgbatch_1")
+    mock_anthropic.messages.batches.retrieve.return_value = MagicMock(processing_status="ended")
+    mock_anthropic.messages.batches.results.return_value = [entry]
+
+    metrics = RunMetrics(pricing=DEFAULT_LLM_PRICING, model="claude-sonnet-4-6")
+    result = run_summary_batch(batch_config, [("key_a", note, None)], {}, metrics)
+
+    assert result["key_a"]["usage"]["input_tokens"] == 1_000_000
+    assert result["key_a"]["usage"]["cost_usd"] == pytest.approx(1.5)
+    assert metrics.cost_usd == pytest.approx(1.5)
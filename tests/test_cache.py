@@ -1,79 +1,430 @@
 """Tests for cache module."""
 
 import json
+import os
+import sqlite3
+import time
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
 
-from obs_summarizer.cache import load_cache, make_cache_key, save_cache
+from obs_summarizer.cache import (
+    CacheEntry,
+    JsonDirCache,
+    MemoryCache,
+    SqliteCache,
+    SummaryCache,
+    load_key_index,
+    make_cache_key,
+    memory_cache,
+    open_cache,
+    prune_cache,
+    save_key_index,
+)
+from obs_summarizer.records import decode_record
 
 
 def test_make_cache_key_consistent():
     """Cache key is deterministic."""
-    key1 = make_cache_key("/vault/article.md", 12345)
-    key2 = make_cache_key("/vault/article.md", 12345)
+    key1 = make_cache_key("Note body", "claude-sonnet-4-6", "1")
+    key2 = make_cache_key("Note body", "claude-sonnet-4-6", "1")
     assert key1 == key2
 
 
 def test_make_cache_key_different_for_different_inputs():
     """Different inputs produce different keys."""
-    key1 = make_cache_key("/vault/article1.md", 12345)
-    key2 = make_cache_key("/vault/article2.md", 12345)
-    key3 = make_cache_key("/vault/article1.md", 54321)
+    key1 = make_cache_key("Note body", "claude-sonnet-4-6", "1")
+    key2 = make_cache_key("Other body", "claude-sonnet-4-6", "1")
+    key3 = make_cache_key("Note body", "llama3", "1")
+    key4 = make_cache_key("Note body", "claude-sonnet-4-6", "2")
 
-    assert key1 != key2
-    assert key1 != key3
-    assert key2 != key3
+    assert len({key1, key2, key3, key4}) == 4
 
 
-def test_save_cache_creates_directory(tmp_cache, sample_summary):
-    """Save cache creates directory if needed."""
-    key = make_cache_key("/vault/article.md", 12345)
-    save_cache(tmp_cache, key, sample_summary)
+def _write_legacy(cache_dir, key, data):
+    """A <key>.json entry as written before records existed."""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    (Path(cache_dir) / f"{key}.json").write_text(json.dumps(data, indent=2))
 
-    assert Path(tmp_cache).exists()
-    assert (Path(tmp_cache) / f"{key}.json").exists()
 
+def test_json_dir_cache_creates_directory(tmp_cache, sample_summary):
+    """Writing an entry creates the cache directory if needed."""
+    cache_dir = Path(tmp_cache) / "new"
+    key = make_cache_key("Note body", "claude-sonnet-4-6", "1")
+    JsonDirCache(str(cache_dir)).put(key, sample_summary)
 
-def test_save_cache_stores_data(tmp_cache, sample_summary):
-    """Save cache stores data correctly."""
-    key = make_cache_key("/vault/article.md", 12345)
-    save_cache(tmp_cache, key, sample_summary)
+    assert (cache_dir / f"{key}.rec").exists()
 
-    # Read back and verify
-    cache_file = Path(tmp_cache) / f"{key}.json"
-    loaded = json.loads(cache_file.read_text())
-    assert loaded == sample_summary
 
+def test_json_dir_cache_stores_records(tmp_cache, sample_summary):
+    """Entries are stored as binary records that decode to the summary."""
+    key = make_cache_key("Note body", "claude-sonnet-4-6", "1")
+    JsonDirCache(tmp_cache).put(key, sample_summary)
 
-def test_load_cache_missing():
-    """Load missing cache returns None."""
-    result = load_cache("/nonexistent/cache", "nonexistent_key")
-    assert result is None
+    assert decode_record((Path(tmp_cache) / f"{key}.rec").read_bytes()) == sample_summary
 
 
-def test_load_cache_valid(tmp_cache, sample_summary):
-    """Load valid cache returns data."""
-    key = make_cache_key("/vault/article.md", 12345)
-    save_cache(tmp_cache, key, sample_summary)
+def test_json_dir_cache_missing():
+    """A missing entry (or directory) is a miss."""
+    assert JsonDirCache("/nonexistent/cache").get("nonexistent_key") is None
 
-    loaded = load_cache(tmp_cache, key)
-    assert loaded == sample_summary
 
+def test_json_dir_cache_corrupt_entry(tmp_cache):
+    """A corrupt entry is a miss, not an error."""
+    key = make_cache_key("Note body", "claude-sonnet-4-6", "1")
+    (Path(tmp_cache) / f"{key}.json").write_text("invalid json {")
+    (Path(tmp_cache) / "other.rec").write_bytes(b"OSR\x01\x01\x01garbage")
 
-def test_load_cache_corrupt_json(tmp_cache):
-    """Load corrupt cache returns None and logs warning."""
-    key = make_cache_key("/vault/article.md", 12345)
-    cache_file = Path(tmp_cache) / f"{key}.json"
-    cache_file.parent.mkdir(parents=True, exist_ok=True)
-    cache_file.write_text("invalid json {")
-
-    result = load_cache(tmp_cache, key)
-    assert result is None
+    assert JsonDirCache(tmp_cache).get_many([key, "other"]) == {}
 
 
 def test_cache_key_hex_format():
     """Cache key is hex digest."""
-    key = make_cache_key("/vault/article.md", 12345)
+    key = make_cache_key("Note body", "claude-sonnet-4-6", "1")
     assert len(key) == 64  # SHA256 hex is 64 chars
     assert all(c in "0123456789abcdef" for c in key)
+
+
+def test_key_index_roundtrip(tmp_cache):
+    """Key index saves and loads entries unchanged."""
+    index = {"/vault/a.md": [10, 12345, "salt", "abc"]}
+    save_key_index(tmp_cache, index)
+    assert load_key_index(tmp_cache) == index
+
+
+def test_key_index_missing_or_corrupt(tmp_cache):
+    """Missing or corrupt index loads as empty."""
+    assert load_key_index(tmp_cache) == {}
+    (Path(tmp_cache) / "index.json").write_text("{broken")
+    assert load_key_index(tmp_cache) == {}
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_backend_roundtrip(tmp_cache, sample_summary, backend):
+    """Both backends store and batch-load summaries."""
+    with open_cache({"cache_dir": tmp_cache, "cache_backend": backend}) as cache:
+        cache.put_many({"a": sample_summary, "b": {"summary": "B"}})
+        cache.put("c", {"summary": "C"})
+
+        assert cache.get_many(["a", "b", "c", "missing"]) == {
+            "a": sample_summary,
+            "b": {"summary": "B"},
+            "c": {"summary": "C"},
+        }
+        assert cache.get("missing") is None
+
+
+def test_open_cache_backend_types(tmp_cache):
+    """cache_backend selects the implementation; sqlite uses a single file."""
+    with open_cache({"cache_dir": tmp_cache, "cache_backend": "json"}) as cache:
+        assert isinstance(cache, JsonDirCache)
+    with open_cache({"cache_dir": tmp_cache}) as cache:
+        assert isinstance(cache, SqliteCache)
+    assert (Path(tmp_cache) / "summaries.sqlite3").exists()
+
+    with pytest.raises(ValueError):
+        open_cache({"cache_dir": tmp_cache, "cache_backend": "lmdb"})
+
+
+def test_sqlite_get_many_large_batch(tmp_cache):
+    """Lookups beyond the per-query chunk size return every hit."""
+    items = {f"key{i}": {"summary": str(i)} for i in range(1200)}
+    with SqliteCache(Path(tmp_cache) / "db.sqlite3") as cache:
+        cache.put_many(items)
+        assert cache.get_many(list(items) + ["missing"]) == items
+
+
+def test_sqlite_persists_across_connections(tmp_cache, sample_summary):
+    """Committed writes are visible after reopening."""
+    db_path = Path(tmp_cache) / "db.sqlite3"
+    with SqliteCache(db_path) as cache:
+        cache.put("a", sample_summary)
+    with SqliteCache(db_path) as cache:
+        assert cache.get("a") == sample_summary
+
+
+def test_sqlite_imports_json_entries_on_creation(tmp_cache, sample_summary):
+    """A new SQLite cache picks up existing JSON-directory entries."""
+    _write_legacy(tmp_cache, "legacy", sample_summary)
+    save_key_index(tmp_cache, {"/vault/a.md": [1, 2, "salt", "legacy"]})
+
+    with open_cache({"cache_dir": tmp_cache, "cache_backend": "sqlite"}) as cache:
+        assert cache.get_many(["legacy", "index"]) == {"legacy": sample_summary}
+
+
+def test_sqlite_corrupt_database_starts_fresh(tmp_cache, sample_summary):
+    """An unreadable database is moved aside instead of failing the run."""
+    db_path = Path(tmp_cache) / "db.sqlite3"
+    db_path.write_bytes(b"not a database" * 100)
+
+    with SqliteCache(db_path) as cache:
+        cache.put("a", sample_summary)
+        assert cache.get("a") == sample_summary
+    assert (Path(tmp_cache) / "db.sqlite3.corrupt").exists()
+
+
+def _filled_cache(tmp_cache, backend):
+    """Cache with entries k0..k4 of 10 bytes each, k0 least recently used."""
+    cache = open_cache({"cache_dir": tmp_cache, "cache_backend": backend})
+    cache.entries = lambda: [CacheEntry(f"k{i}", 10, 1000.0 + i) for i in range(5)]
+    cache.delete_many = MagicMock()
+    return cache
+
+
+@pytest.mark.parametrize(
+    "limits, evicted",
+    [
+        ({"max_entries": 3}, ["k1", "k0"]),
+        ({"max_bytes": 25}, ["k2", "k1", "k0"]),
+        ({"max_age_days": 1}, ["k0"]),
+        ({"max_entries": 10, "max_bytes": 100}, []),
+    ],
+)
+def test_prune_cache_policies(tmp_cache, limits, evicted):
+    """Limits evict least recently used entries first; age evicts stale ones."""
+    cache = _filled_cache(tmp_cache, "sqlite")
+
+    result = prune_cache(cache, now=1000.5 + 86400, **limits)
+
+    assert result.removed == len(evicted)
+    assert result.freed_bytes == 10 * len(evicted)
+    assert result.remaining == 5 - len(evicted)
+    if evicted:
+        assert list(cache.delete_many.call_args[0][0]) == evicted
+    else:
+        cache.delete_many.assert_not_called()
+    cache.close()
+
+
+def test_prune_cache_dry_run(tmp_cache):
+    """Dry run reports without deleting."""
+    cache = _filled_cache(tmp_cache, "json")
+    result = prune_cache(cache, max_entries=1, dry_run=True)
+    assert result.removed == 4
+    cache.delete_many.assert_not_called()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_prune_cache_keeps_recently_read_entries(tmp_cache, backend):
+    """Reads refresh access time, so read entries survive LRU eviction."""
+    with open_cache({"cache_dir": tmp_cache, "cache_backend": backend}) as cache:
+        cache.put_many({"old": {"summary": "old"}, "new": {"summary": "new"}})
+        # Age everything, then read only "old"
+        past = time.time() - 100
+        if backend == "json":
+            for name in ("old", "new"):
+                os.utime(Path(tmp_cache) / f"{name}.rec", (past, past))
+        else:
+            with cache._conn:
+                cache._conn.execute("UPDATE summaries SET accessed_at = ?", (past,))
+        cache.get_many(["old"])
+
+        result = prune_cache(cache, max_entries=1)
+
+        assert result.removed == 1
+        assert [e.key for e in cache.entries()] == ["old"]
+        assert cache.get("new") is None
+
+
+def test_sqlite_migrates_database_without_gc_columns(tmp_cache, sample_summary):
+    """A database created before size/access tracking gains the columns."""
+    db_path = Path(tmp_cache) / "db.sqlite3"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("CREATE TABLE summaries (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO summaries VALUES (?, ?)", ("a", json.dumps(sample_summary)))
+    conn.commit()
+    conn.close()
+
+    with SqliteCache(db_path) as cache:
+        [entry] = cache.entries()
+        assert entry.key == "a"
+        assert entry.size == len(json.dumps(sample_summary).encode())
+        assert entry.accessed_at > 0
+        assert cache.get("a") == sample_summary
+
+
+def test_json_dir_cache_write_is_atomic(tmp_cache, sample_summary):
+    """A failed write leaves the previous entry intact and no temp files."""
+    cache = JsonDirCache(tmp_cache)
+    cache.put("a", sample_summary)
+
+    with pytest.raises(TypeError):
+        cache.put("a", {"summary": object()})
+
+    assert JsonDirCache(tmp_cache).get("a") == sample_summary
+    assert os.listdir(tmp_cache) == ["a.rec"]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_group_commit_every_n_writes(tmp_cache, backend):
+    """Writes are held until fsync_every are pending, but stay readable meanwhile."""
+    config = {"cache_dir": tmp_cache, "cache_backend": backend, "cache_fsync_every": 3}
+    disk_only = {"cache_dir": tmp_cache, "cache_backend": backend, "cache_memory_entries": 0}
+
+    cache = open_cache(config)
+    for i in range(4):
+        cache.put(f"k{i}", {"summary": str(i)})
+
+    assert cache.get("k3") == {"summary": "3"}
+    with open_cache(disk_only) as other:
+        assert set(other.get_many(["k0", "k1", "k2", "k3"])) == {"k0", "k1", "k2"}
+
+    cache.close()
+    with open_cache(disk_only) as other:
+        assert len(other.get_many(["k0", "k1", "k2", "k3"])) == 4
+
+
+def test_json_group_commit_fsyncs_per_group(tmp_cache, monkeypatch):
+    """Each group fsyncs its entries plus the directory once; nothing syncs between groups."""
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(fd) or real_fsync(fd))
+
+    cache = JsonDirCache(tmp_cache, fsync_every=3)
+    for i in range(4):
+        cache.put(f"k{i}", {"summary": str(i)})
+    assert len(fsyncs) == 3 + 1
+
+    cache.close()
+    assert len(fsyncs) == 3 + 1 + 1 + 1
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_group_commit_once_per_run(tmp_cache, backend):
+    """cache_fsync_every: 0 commits everything on close, and GC sees held writes."""
+    config = {"cache_dir": tmp_cache, "cache_backend": backend, "cache_fsync_every": 0}
+    disk_only = {"cache_dir": tmp_cache, "cache_backend": backend, "cache_memory_entries": 0}
+
+    with open_cache(config) as cache:
+        cache.put_many({f"k{i}": {"summary": str(i)} for i in range(5)})
+        with open_cache(disk_only) as other:
+            assert other.get_many([f"k{i}" for i in range(5)]) == {}
+        assert len(cache.entries()) == 5
+
+    with open_cache(disk_only) as cache:
+        assert len(cache.get_many([f"k{i}" for i in range(5)])) == 5
+
+
+def test_json_cache_reads_legacy_entries_and_replaces_them(tmp_cache, sample_summary):
+    """Old <key>.json entries are served, and rewritten as records on the next put."""
+    _write_legacy(tmp_cache, "a", sample_summary)
+
+    with JsonDirCache(tmp_cache) as cache:
+        assert cache.get("a") == sample_summary
+        assert [e.key for e in cache.entries()] == ["a"]
+        cache.put("a", sample_summary)
+
+    assert os.listdir(tmp_cache) == ["a.rec"]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_migrate_converts_entries_in_place(tmp_cache, sample_summary, backend):
+    """migrate re-encodes every entry, keeps access times and is idempotent."""
+    with open_cache({"cache_dir": tmp_cache, "cache_backend": backend}) as cache:
+        cache.put_many({f"k{i}": {**sample_summary, "summary": str(i)} for i in range(3)})
+        before = {e.key: e.accessed_at for e in cache.entries()}
+
+    config = {"cache_dir": tmp_cache, "cache_backend": backend, "cache_compression": "zlib"}
+    with open_cache(config) as cache:
+        result = cache.migrate()
+        assert result.converted == 3
+        assert result.unreadable == 0
+        assert cache.migrate().converted == 0
+        assert {e.key: e.accessed_at for e in cache.entries()} == pytest.approx(before)
+
+    with open_cache({"cache_dir": tmp_cache, "cache_backend": backend}) as cache:
+        assert cache.get("k1") == {**sample_summary, "summary": "1"}
+
+
+def test_sqlite_migrate_converts_legacy_text_rows(tmp_cache, sample_summary):
+    """Rows stored as JSON text before records existed are converted too."""
+    db_path = Path(tmp_cache) / "db.sqlite3"
+    with SqliteCache(db_path) as cache:
+        with cache._conn:
+            cache._conn.execute(
+                "INSERT INTO summaries (key, data, size, accessed_at) VALUES ('a', ?, 1, 1)",
+                (json.dumps(sample_summary),),
+            )
+            cache._conn.execute(
+                "INSERT INTO summaries (key, data, size, accessed_at) VALUES ('bad', '{x', 1, 1)"
+            )
+        assert cache.get("a") == sample_summary
+
+        result = cache.migrate()
+
+    assert (result.converted, result.unreadable) == (1, 1)
+    with SqliteCache(db_path) as cache:
+        assert cache.get("a") == sample_summary
+
+
+def test_memory_cache_evicts_least_recently_used():
+    """The LRU keeps max_entries, refreshing entries on hits, and counts lookups."""
+    memory = MemoryCache(2)
+    memory.put_many({"a": {"summary": "A"}, "b": {"summary": "B"}})
+    assert memory.get_many(["a", "missing"]) == {"a": {"summary": "A"}}
+
+    memory.put_many({"c": {"summary": "C"}})
+
+    assert set(memory.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert memory.stats() == (3, 2, 2, 2)
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_memory_cache_serves_repeat_lookups_across_opens(tmp_cache, sample_summary, backend):
+    """Entries read or written once in the process are served without disk reads."""
+    config = {"cache_dir": tmp_cache, "cache_backend": backend}
+    with open_cache(config) as cache:
+        cache.put("a", sample_summary)
+
+    with open_cache(config) as cache:
+        cache._load_many = MagicMock(side_effect=AssertionError("disk read"))
+        assert cache.get("a") == sample_summary
+        assert cache.memory is memory_cache(tmp_cache, 10000)
+        assert cache.memory.stats().hits == 1
+
+        cache.delete_many(["a"])
+        cache._load_many = MagicMock(return_value={})
+        assert cache.get("a") is None
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_memory_hits_count_as_access_for_gc(tmp_cache, sample_summary, backend):
+    """Entries served from memory aren't evicted by age GC as if unused."""
+    config = {"cache_dir": tmp_cache, "cache_backend": backend}
+    with open_cache(config) as cache:
+        cache.put_many({"hot": sample_summary, "cold": sample_summary})
+        # Both last touched long ago
+        if backend == "sqlite":
+            with cache._conn:
+                cache._conn.execute("UPDATE summaries SET accessed_at = 0")
+        else:
+            for path in Path(tmp_cache).iterdir():
+                os.utime(path, (0, 0))
+
+        cache._load_many = MagicMock(side_effect=AssertionError("disk read"))
+        assert cache.get("hot") == sample_summary
+
+        result = prune_cache(cache, max_age_days=1)
+
+    assert result.removed == 1
+    with open_cache({**config, "cache_memory_entries": 0}) as cache:
+        assert cache.get("hot") == sample_summary
+        assert cache.get("cold") is None
+
+
+def test_memory_cache_disabled(tmp_cache):
+    """cache_memory_entries: 0 reads straight from disk."""
+    with open_cache({"cache_dir": tmp_cache, "cache_memory_entries": 0}) as cache:
+        assert cache.memory is None
+
+
+def test_backend_missing_methods_fails_at_construction():
+    """A backend that doesn't implement the storage methods can't be created."""
+
+    class Incomplete(SummaryCache):
+        def _load_many(self, keys):
+            return {}
+
+    with pytest.raises(TypeError, match="abstract"):
+        Incomplete()
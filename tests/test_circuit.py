@@ -0,0 +1,171 @@
+"""Tests for circuit module."""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from obs_summarizer.circuit import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    BackendFailure,
+    CircuitBreaker,
+    CircuitOpenError,
+    create_circuit_breaker,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_trips_after_consecutive_failures_and_fails_fast():
+    """threshold failures in a row open the circuit; later calls skip the backend."""
+    breaker = CircuitBreaker(failure_threshold=2, probe_seconds=30, clock=FakeClock())
+    llm = MagicMock(side_effect=ConnectionError("refused"))
+    client = breaker.wrap(llm)
+
+    for _ in range(2):
+        with pytest.raises(BackendFailure) as excinfo:
+            client("sys", "user")
+        assert isinstance(excinfo.value.__cause__, ConnectionError)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+    with pytest.raises(CircuitOpenError):
+        client("sys", "user")
+    assert llm.call_count == 2
+
+
+def test_success_resets_the_failure_count():
+    """Only consecutive failures count."""
+    breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+    llm = MagicMock(side_effect=[ConnectionError(), "ok", ConnectionError()])
+    client = breaker.wrap(llm)
+
+    with pytest.raises(BackendFailure):
+        client("sys", "user")
+    assert client("sys", "user") == "ok"
+    with pytest.raises(BackendFailure):
+        client("sys", "user")
+    assert breaker.state == CLOSED
+
+
+def test_client_errors_pass_through_without_counting():
+    """A 400 is the request's fault: it propagates as is and keeps the circuit closed."""
+    breaker = CircuitBreaker(failure_threshold=1, clock=FakeClock())
+    client = breaker.wrap(MagicMock(side_effect=StatusError(400)))
+
+    with pytest.raises(StatusError):
+        client("sys", "user")
+    assert breaker.state == CLOSED
+
+
+def test_only_backend_errors_count():
+    """Connection errors, timeouts, 429 and 5xx count; bugs propagate unchanged."""
+    breaker = CircuitBreaker(failure_threshold=10, clock=FakeClock())
+    for error in (ConnectionError(), TimeoutError(), StatusError(429), StatusError(503), StatusError(529)):
+        with pytest.raises(BackendFailure):
+            breaker.call(MagicMock(side_effect=error))
+    assert breaker.failures == 5
+
+    for error in (TypeError("bad"), KeyError("content"), AttributeError("usage")):
+        with pytest.raises(type(error)) as excinfo:
+            breaker.call(MagicMock(side_effect=error))
+        assert excinfo.value is error
+    assert breaker.failures == 5
+
+
+def test_half_open_probe_closes_or_reopens():
+    """After probe_seconds one probe goes through; its outcome decides the state."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, probe_seconds=30, clock=clock)
+    llm = MagicMock(side_effect=[ConnectionError(), ConnectionError(), "ok"])
+    client = breaker.wrap(llm)
+
+    with pytest.raises(BackendFailure):
+        client("sys", "user")
+    clock.now = 29
+    with pytest.raises(CircuitOpenError):
+        client("sys", "user")
+
+    # Failed probe: open for another probe_seconds
+    clock.now = 30
+    with pytest.raises(BackendFailure):
+        client("sys", "user")
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+    clock.now = 60
+    assert client("sys", "user") == "ok"
+    assert breaker.state == CLOSED
+    assert llm.call_count == 3
+
+
+def test_only_one_probe_at_a_time():
+    """While a probe is in flight, other callers still fail fast."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, probe_seconds=0, clock=clock)
+    with pytest.raises(BackendFailure):
+        breaker.call(MagicMock(side_effect=ConnectionError()))
+
+    probing = threading.Event()
+    release = threading.Event()
+
+    def slow_probe():
+        probing.set()
+        release.wait(5)
+        return "ok"
+
+    worker = threading.Thread(target=breaker.call, args=(slow_probe,))
+    worker.start()
+    probing.wait(5)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(MagicMock())
+    release.set()
+    worker.join()
+    assert breaker.state == CLOSED
+
+
+def test_probe_that_raises_does_not_block_later_probes():
+    """A probe ending in a non-backend error (even KeyboardInterrupt) frees the slot."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, probe_seconds=0, clock=clock)
+    with pytest.raises(BackendFailure):
+        breaker.call(MagicMock(side_effect=ConnectionError()))
+
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(MagicMock(side_effect=KeyboardInterrupt()))
+    with pytest.raises(TypeError):
+        breaker.call(MagicMock(side_effect=TypeError()))
+    assert breaker.call(MagicMock(return_value="ok")) == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_create_circuit_breaker_from_config():
+    breaker = create_circuit_breaker({"llm_breaker_failures": 3, "llm_breaker_probe_seconds": 10})
+    assert breaker.failure_threshold == 3
+    assert breaker.probe_seconds == 10
+
+
+def test_create_circuit_breaker_adds_backend_failure_types():
+    class SDKConnectionError(Exception):
+        pass
+
+    breaker = create_circuit_breaker({}, (SDKConnectionError,))
+    with pytest.raises(BackendFailure):
+        breaker.call(MagicMock(side_effect=SDKConnectionError()))
+    with pytest.raises(BackendFailure):
+        breaker.call(MagicMock(side_effect=ConnectionError()))
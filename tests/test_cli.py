@@ -1,5 +1,6 @@
 """Tests for CLI module."""
 
+import json
 from unittest.mock import patch
 
 import pytest
@@ -31,3 +32,51 @@ def test_cli_config_arg_parsing(tmp_path):
     with patch("sys.argv", ["obs-digest", "--config", bad_config]):
         result = main()
         assert result == 1  # Config load fails
+
+
+def test_cli_cache_gc(tmp_path, capsys):
+    """cache gc prunes with command-line limits and accepts --config after the subcommand."""
+    config = {"cache_dir": str(tmp_path / "cache"), "cache_backend": "sqlite"}
+    with patch("sys.argv", ["obs-digest", "cache", "gc", "--config", "c.yaml", "--max-entries", "5"]), \
+         patch("obs_summarizer.cli.load_config", return_value=config) as mock_load, \
+         patch("obs_summarizer.cli.run_pipeline") as mock_run:
+        result = main()
+
+    assert result == 0
+    mock_load.assert_called_once_with("c.yaml")
+    mock_run.assert_not_called()
+    assert "Removed 0 cache entries" in capsys.readouterr().err
+
+
+def test_cli_cache_gc_requires_limits(tmp_path):
+    """cache gc without any configured or given limit is an error."""
+    config = {"cache_dir": str(tmp_path / "cache"), "cache_backend": "sqlite"}
+    with patch("sys.argv", ["obs-digest", "cache", "gc"]), \
+         patch("obs_summarizer.cli.load_config", return_value=config):
+        assert main() == 1
+
+
+def test_cli_cache_migrate(tmp_path, capsys):
+    """cache migrate converts legacy JSON entries to records in place."""
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "a.json").write_text(json.dumps({"summary": "A"}, indent=2))
+    config = {"cache_dir": str(cache_dir), "cache_backend": "json", "cache_compression": "zlib"}
+    with patch("sys.argv", ["obs-digest", "cache", "migrate"]), \
+         patch("obs_summarizer.cli.load_config", return_value=config):
+        assert main() == 0
+
+    assert sorted(p.name for p in cache_dir.iterdir()) == ["a.rec"]
+    assert "Converted 1 cache entries to json records (compression: zlib)" in capsys.readouterr().err
+
+
+def test_cli_watch():
+    """watch runs the watch loop with the loaded config."""
+    config = {"vault_path": "/vault"}
+    with patch("sys.argv", ["obs-digest", "watch", "--config", "c.yaml"]), \
+         patch("obs_summarizer.cli.load_config", return_value=config) as mock_load, \
+         patch("obs_summarizer.cli.run_watch", return_value=0) as mock_watch:
+        assert main() == 0
+
+    mock_load.assert_called_once_with("c.yaml")
+    mock_watch.assert_called_once_with(config)
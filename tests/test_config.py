@@ -117,6 +117,10 @@ def test_load_config_valid(tmp_vault):
         assert config["max_input_chars"] == 16000
         assert config["cache_dir"] == ".cache/summaries"
         assert config["state_path"] == "state.json"
+        assert config["llm_concurrency"] == 1
+        assert config["cache_backend"] == "sqlite"
+        assert config["max_input_tokens"] == 4000
+        assert config["token_estimator"] == "auto"
 
 
 @pytest.mark.parametrize("path_key", ["cache_dir", "state_path"])
@@ -146,3 +150,158 @@ def test_load_config_expands_tilde(tmp_vault):
         )
         config = load_config(str(config_file))
         assert config["vault_path"] == str(tmp_vault)
+
+
+@pytest.mark.parametrize("value", [0, -2, "4", True])
+def test_load_config_rejects_invalid_llm_concurrency(tmp_vault, value):
+    """llm_concurrency must be a positive integer."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            f"llm_concurrency: {value!r}\n"
+        )
+        with pytest.raises(ConfigError, match="llm_concurrency"):
+            load_config(str(config_file))
+
+
+def test_load_config_rejects_unknown_cache_backend(tmp_vault):
+    """cache_backend must name a known backend."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            "cache_backend: lmdb\n"
+        )
+        with pytest.raises(ConfigError, match="cache_backend"):
+            load_config(str(config_file))
+
+
+def test_load_config_rejects_invalid_cache_limit(tmp_vault):
+    """Cache GC limits must be positive integers when set."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            "cache_max_bytes: 0\n"
+        )
+        with pytest.raises(ConfigError, match="cache_max_bytes"):
+            load_config(str(config_file))
+
+
+def test_load_config_rejects_unknown_token_estimator(tmp_vault):
+    """token_estimator must name a known estimator."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            "token_estimator: words\n"
+        )
+        with pytest.raises(ConfigError, match="token_estimator"):
+            load_config(str(config_file))
+
+
+def test_load_config_rejects_negative_report_history_runs(tmp_vault):
+    """report_history_runs must be a non-negative integer."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            "report_history_runs: -1\n"
+        )
+        with pytest.raises(ConfigError, match="report_history_runs"):
+            load_config(str(config_file))
+
+
+def test_load_config_rejects_negative_cache_fsync_every(tmp_vault):
+    """cache_fsync_every must be a non-negative integer when set."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            "cache_fsync_every: -1\n"
+        )
+        with pytest.raises(ConfigError, match="cache_fsync_every"):
+            load_config(str(config_file))
+
+
+@pytest.mark.parametrize(
+    "line,match",
+    [
+        ("watch_digest_at: 7:30", "watch_digest_at"),  # YAML 1.1 reads this as 450
+        ("watch_digest_at: '25:00'", "watch_digest_at"),
+        ("watch_backend: fsevents", "watch_backend"),
+        ("watch_poll_seconds: 0", "watch_poll_seconds"),
+    ],
+)
+def test_load_config_rejects_invalid_watch_settings(tmp_vault, line, match):
+    """Watch settings are validated up front."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            f"{line}\n"
+        )
+        with pytest.raises(ConfigError, match=match):
+            load_config(str(config_file))
+
+
+@pytest.mark.parametrize(
+    "lines,match",
+    [
+        ("llm_pricing:\n  my-model:\n    prompt: 1.0", "llm_pricing.my-model key"),
+        ("llm_pricing:\n  my-model:\n    input: -1", "llm_pricing.my-model.input"),
+        ("usage_outlier_factor: 1", "usage_outlier_factor"),
+    ],
+)
+def test_load_config_rejects_invalid_usage_settings(tmp_vault, lines, match):
+    """Pricing and the outlier factor are validated."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            f"{lines}\n"
+        )
+        with pytest.raises(ConfigError, match=match):
+            load_config(str(config_file))
+
+
+@pytest.mark.parametrize(
+    "line,match",
+    [
+        ("llm_retry_attempts: 0", "llm_retry_attempts"),
+        ("llm_retry_base_delay: -1", "llm_retry_base_delay"),
+        ("llm_retry_deadline: soon", "llm_retry_deadline"),
+        ("llm_retry_statuses: [429, 'busy']", "llm_retry_statuses"),
+        ("llm_breaker_failures: 0", "llm_breaker_failures"),
+        ("llm_breaker_probe_seconds: -5", "llm_breaker_probe_seconds"),
+    ],
+)
+def test_load_config_rejects_invalid_retry_settings(tmp_vault, line, match):
+    """Retry policy and circuit breaker settings are validated."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "config.yaml"
+        config_file.write_text(
+            f"vault_path: {tmp_vault}\n"
+            "llm_backend: local\n"
+            "local_base_url: http://localhost:1234/v1\n"
+            f"{line}\n"
+        )
+        with pytest.raises(ConfigError, match=match):
+            load_config(str(config_file))
@@ -1,12 +1,18 @@
 """Tests for digest_writer module."""
 
+import os
+import stat
 import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
 
 import pytest
 
-from obs_summarizer.digest_writer import format_digest_markdown, write_digest_note
+from obs_summarizer.digest_writer import (
+    format_digest_markdown,
+    iter_digest_markdown,
+    write_digest_note,
+)
 
 
 def test_format_digest_markdown_empty():
@@ -169,3 +175,72 @@ def test_write_digest_note_allows_nested_relative_paths():
         assert result.exists()
         assert "Archive/2026/February" in str(result)
         assert result.read_text() == "Content"
+
+
+def test_format_digest_markdown_includes_rollup(sample_summary):
+    """Rollup insights fill the Top Insights section."""
+    summaries = [sample_summary, {**sample_summary, "summary": "Second"}]
+    rollup = "- Insight one\n- Insight two\n"
+
+    result = format_digest_markdown(summaries, rollup=rollup)
+
+    assert result.endswith(
+        "## Top Insights\n\n_Cross-cutting themes across saved articles_\n\n"
+        "- Insight one\n- Insight two\n"
+    )
+
+
+def test_iter_digest_markdown_matches_format(sample_summary):
+    """The streamed pieces join to exactly the formatted digest."""
+    date = datetime(2026, 2, 25, tzinfo=timezone.utc)
+    summaries = [
+        {**sample_summary, "tags": ["ml"]},
+        {**sample_summary, "tags": ["ai"], "notable_quote": None},
+        {**sample_summary, "bullets": []},
+    ]
+
+    pieces = list(iter_digest_markdown(summaries, date, rollup="- Insight\n"))
+
+    assert len(pieces) > 3
+    assert "".join(pieces) == format_digest_markdown(summaries, date, rollup="- Insight\n")
+
+
+def test_write_digest_note_streams_pieces(tmp_vault):
+    """Pieces are written in order and no temp file is left behind."""
+    date = datetime(2026, 2, 25, tzinfo=timezone.utc)
+
+    path = write_digest_note(str(tmp_vault), "Digests", iter(["# A\n", "body ", "— end\n"]), date)
+
+    assert path.read_text(encoding="utf-8") == "# A\nbody — end\n"
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+def test_write_digest_note_failure_keeps_previous_digest(tmp_vault):
+    """A failure while producing the digest leaves the old note intact."""
+    date = datetime(2026, 2, 25, tzinfo=timezone.utc)
+    path = write_digest_note(str(tmp_vault), "Digests", "old digest", date)
+
+    def failing():
+        yield "new "
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        write_digest_note(str(tmp_vault), "Digests", failing(), date)
+
+    assert path.read_text(encoding="utf-8") == "old digest"
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+def test_write_digest_note_mode_follows_umask_or_existing_note(tmp_vault):
+    """New digests get 0666 less the umask; rewrites keep the note's mode."""
+    date = datetime(2026, 2, 25, tzinfo=timezone.utc)
+    old_umask = os.umask(0o022)
+    try:
+        path = write_digest_note(str(tmp_vault), "Digests", "digest", date)
+        assert stat.S_IMODE(path.stat().st_mode) == 0o644
+
+        path.chmod(0o640)
+        write_digest_note(str(tmp_vault), "Digests", "new digest", date)
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    finally:
+        os.umask(old_umask)
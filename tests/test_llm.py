@@ -1,11 +1,23 @@
 """Tests for LLM module."""
 
+import asyncio
 import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from obs_summarizer.llm import LLMResponse, _create_claude_client, _create_local_client
+from obs_summarizer.llm import (
+    LLMResponse,
+    _create_claude_client,
+    _create_local_client,
+    backend_failure_types,
+    create_async_llm_client,
+)
+
+
+def _raw(message, headers=None):
+    """Stand-in for an SDK raw response wrapping message."""
+    return MagicMock(headers=headers or {}, parse=MagicMock(return_value=message))
 
 
 def test_llm_response():
@@ -29,7 +41,7 @@ def test_create_claude_client_success():
 
             mock_response = MagicMock()
             mock_response.content = [MagicMock(text="Test response")]
-            mock_client.messages.create.return_value = mock_response
+            mock_client.messages.with_raw_response.create.return_value = _raw(mock_response)
 
             client = _create_claude_client(config)
             response = client(system="test system", user="test user")
@@ -53,7 +65,7 @@ def test_create_local_client_success():
 
         mock_response = MagicMock()
         mock_response.choices = [MagicMock(message=MagicMock(content="Local response"))]
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.with_raw_response.create.return_value = _raw(mock_response)
 
         client = _create_local_client(config)
         response = client(system="test system", user="test user")
@@ -78,17 +90,17 @@ def test_claude_client_retry_on_rate_limit():
                 # Fail twice, succeed on third try
                 import anthropic
 
-                mock_client.messages.create.side_effect = [
+                mock_client.messages.with_raw_response.create.side_effect = [
                     anthropic.RateLimitError("Rate limit", response=MagicMock(), body={}),
                     anthropic.RateLimitError("Rate limit", response=MagicMock(), body={}),
-                    MagicMock(content=[MagicMock(text="Success")]),
+                    _raw(MagicMock(content=[MagicMock(text="Success")])),
                 ]
 
                 client = _create_claude_client(config)
                 response = client(system="test", user="test")
 
                 assert response.content == "Success"
-                assert mock_client.messages.create.call_count == 3
+                assert mock_client.messages.with_raw_response.create.call_count == 3
 
 
 def test_local_client_retry_on_error():
@@ -107,16 +119,243 @@ def test_local_client_retry_on_error():
             import openai
 
             # Fail with 503 (transient), then succeed
-            mock_client.chat.completions.create.side_effect = [
+            mock_client.chat.completions.with_raw_response.create.side_effect = [
                 openai.APIStatusError(
                     "Service unavailable", response=MagicMock(status_code=503), body={}
                 ),
-                MagicMock(
-                    choices=[MagicMock(message=MagicMock(content="Success"))]
-                ),
+                _raw(MagicMock(choices=[MagicMock(message=MagicMock(content="Success"))])),
             ]
 
             client = _create_local_client(config)
             response = client(system="test", user="test")
 
             assert response.content == "Success"
+
+
+def test_async_claude_client_retry_on_rate_limit():
+    """Async Claude client retries with asyncio.sleep, not time.sleep."""
+    import anthropic
+
+    config = {"llm_backend": "claude", "claude_model": "claude-sonnet-4-6"}
+
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "sk-ant-test"}):
+        with patch("anthropic.AsyncAnthropic") as mock_anthropic, \
+             patch("obs_summarizer.retry.asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+             patch("obs_summarizer.llm.time.sleep") as mock_blocking_sleep:
+            mock_client = MagicMock()
+            mock_anthropic.return_value = mock_client
+            mock_client.messages.with_raw_response.create = AsyncMock(
+                side_effect=[
+                    anthropic.RateLimitError("Rate limit", response=MagicMock(), body={}),
+                    _raw(MagicMock(content=[MagicMock(text="Success")])),
+                ]
+            )
+
+            client = create_async_llm_client(config)
+            response = asyncio.run(client(system="test", user="test"))
+
+    assert response == LLMResponse(content="Success", retries=1)
+    assert mock_client.messages.with_raw_response.create.await_count == 2
+    # Full jitter: the first backoff is drawn from [0, 2s]
+    mock_sleep.assert_awaited_once()
+    assert 0 <= mock_sleep.await_args.args[0] <= 2
+    mock_blocking_sleep.assert_not_called()
+
+
+def test_async_local_client_retry_on_error():
+    """Async local client retries transient status errors."""
+    import openai
+
+    config = {
+        "llm_backend": "local",
+        "local_base_url": "http://localhost:1234/v1",
+        "local_model": "llama-3.2-3b-instruct",
+    }
+
+    with patch("openai.AsyncOpenAI") as mock_openai, \
+         patch("obs_summarizer.retry.asyncio.sleep", new_callable=AsyncMock):
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.with_raw_response.create = AsyncMock(
+            side_effect=[
+                openai.APIStatusError(
+                    "Service unavailable", response=MagicMock(status_code=503), body={}
+                ),
+                _raw(MagicMock(choices=[MagicMock(message=MagicMock(content="Success"))])),
+            ]
+        )
+
+        client = create_async_llm_client(config)
+        response = asyncio.run(client(system="test", user="test"))
+
+    assert response.content == "Success"
+
+
+def test_async_local_client_does_not_retry_client_errors():
+    """Non-transient status errors propagate immediately, as in the sync client."""
+    import openai
+
+    config = {"llm_backend": "local", "local_base_url": "http://localhost:1234/v1"}
+
+    with patch("openai.AsyncOpenAI") as mock_openai:
+        mock_client = MagicMock()
+        mock_openai.return_value = mock_client
+        mock_client.chat.completions.with_raw_response.create = AsyncMock(
+            side_effect=openai.APIStatusError(
+                "Bad request", response=MagicMock(status_code=400), body={}
+            )
+        )
+
+        client = create_async_llm_client(config)
+        with pytest.raises(openai.APIStatusError):
+            asyncio.run(client(system="test", user="test"))
+
+    assert mock_client.chat.completions.with_raw_response.create.await_count == 1
+
+
+def test_claude_client_caches_system_prompt_and_reports_usage():
+    """System prompt carries a cache breakpoint; cache token counts are surfaced."""
+    config = {"llm_backend": "claude", "claude_model": "claude-sonnet-4-6"}
+
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "sk-ant-test"}):
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            mock_client = MagicMock()
+            mock_anthropic.return_value = mock_client
+            mock_response = MagicMock()
+            mock_response.content = [MagicMock(text="ok")]
+            mock_response.usage.cache_read_input_tokens = 1200
+            mock_response.usage.cache_creation_input_tokens = 0
+            mock_client.messages.with_raw_response.create.return_value = _raw(mock_response)
+
+            client = _create_claude_client(config)
+            response = client(system="fixed prompt", user="note")
+
+    system = mock_client.messages.with_raw_response.create.call_args.kwargs["system"]
+    assert system == [
+        {"type": "text", "text": "fixed prompt", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert response.cache_read_tokens == 1200
+    assert response.cache_write_tokens == 0
+
+
+def test_claude_client_prompt_caching_disabled():
+    """prompt_caching: false sends the system prompt as a plain string."""
+    config = {"llm_backend": "claude", "prompt_caching": False}
+
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "sk-ant-test"}):
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            mock_client = MagicMock()
+            mock_anthropic.return_value = mock_client
+            mock_client.messages.with_raw_response.create.return_value = _raw(
+                MagicMock(content=[MagicMock(text="ok")])
+            )
+
+            _create_claude_client(config)(system="fixed prompt", user="note")
+
+    assert mock_client.messages.with_raw_response.create.call_args.kwargs["system"] == "fixed prompt"
+
+
+def test_responses_report_tokens_and_model():
+    """Token counts and model come through; OpenAI-style prompt tokens exclude cached ones."""
+    from types import SimpleNamespace
+
+    from obs_summarizer.llm import _local_response, claude_response
+
+    claude = SimpleNamespace(
+        content=[SimpleNamespace(text="ok")],
+        model="claude-sonnet-4-6",
+        usage=SimpleNamespace(
+            input_tokens=900, output_tokens=120,
+            cache_read_input_tokens=1200, cache_creation_input_tokens=0,
+        ),
+    )
+    assert claude_response(claude) == LLMResponse(
+        content="ok", cache_read_tokens=1200, input_tokens=900, output_tokens=120,
+        model="claude-sonnet-4-6",
+    )
+
+    local = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+        model="llama-3.2-3b-instruct",
+        usage=SimpleNamespace(
+            prompt_tokens=1000, completion_tokens=80,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=600),
+        ),
+    )
+    assert _local_response(local) == LLMResponse(
+        content="ok", cache_read_tokens=600, input_tokens=400, output_tokens=80,
+        model="llama-3.2-3b-instruct",
+    )
+
+
+def test_claude_client_learns_limits_from_successful_responses():
+    """Rate limit headers of successful responses reach the shared limiter."""
+    config = {"llm_backend": "claude", "claude_model": "claude-sonnet-4-6"}
+    headers = {
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-input-tokens-limit": "30000",
+    }
+
+    from obs_summarizer.ratelimit import RateLimiter
+
+    limiter = RateLimiter()
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "sk-ant-test"}):
+        with patch("anthropic.Anthropic") as mock_anthropic, \
+             patch("obs_summarizer.llm.create_rate_limiter", return_value=limiter):
+            mock_client = MagicMock()
+            mock_anthropic.return_value = mock_client
+            mock_client.messages.with_raw_response.create.return_value = _raw(
+                MagicMock(content=[MagicMock(text="ok")]), headers
+            )
+
+            _create_claude_client(config)(system="test", user="test")
+
+    assert limiter.requests.per_minute == 50
+    assert limiter.tokens.per_minute == 30000
+
+
+def test_claude_client_shares_retry_after_pause():
+    """A 429's retry-after pauses the client's shared limiter instead of a fixed backoff."""
+    import anthropic
+
+    from obs_summarizer.ratelimit import RateLimiter
+
+    config = {"llm_backend": "claude", "claude_model": "claude-sonnet-4-6"}
+    rate_limited = anthropic.RateLimitError(
+        "Rate limit", response=MagicMock(headers={"retry-after": "3"}), body={}
+    )
+    clock = [0.0]
+    limiter = RateLimiter(requests_per_minute=600, clock=lambda: clock[0])
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    with patch.dict(os.environ, {"ANTHROPIC_API_KEY": "sk-ant-test"}):
+        with patch("anthropic.Anthropic") as mock_anthropic, \
+             patch("obs_summarizer.llm.create_rate_limiter", return_value=limiter), \
+             patch("time.sleep", side_effect=sleep) as mock_sleep:
+            mock_client = MagicMock()
+            mock_anthropic.return_value = mock_client
+            mock_client.messages.with_raw_response.create.side_effect = [
+                rate_limited,
+                _raw(MagicMock(content=[MagicMock(text="Success")])),
+            ]
+
+            response = _create_claude_client(config)(system="test", user="test")
+
+    assert response.content == "Success"
+    assert response.retries == 1
+    # The pause is waiting, not request time
+    assert response.network_seconds <= response.latency_seconds
+    # Only the limiter slept, for the server's pause rather than a backoff
+    mock_sleep.assert_called_once_with(3.0)
+
+
+def test_backend_failure_types():
+    """The breaker counts each SDK's connection errors, which include its timeouts."""
+    import anthropic
+    import openai
+
+    assert backend_failure_types({"llm_backend": "claude"}) == (anthropic.APIConnectionError,)
+    assert backend_failure_types({"llm_backend": "local"}) == (openai.APIConnectionError,)
+    assert issubclass(anthropic.APITimeoutError, anthropic.APIConnectionError)
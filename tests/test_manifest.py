@@ -0,0 +1,113 @@
+"""Tests for manifest module and incremental discovery."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from obs_summarizer.manifest import hash_file, load_manifest, new_manifest, save_manifest
+from obs_summarizer.scanner import scan_vault
+
+EXCLUDES = ["**/.obsidian/**", "**/templates/**"]
+
+
+@pytest.fixture(autouse=True)
+def no_racy_window():
+    """Trust directory mtimes immediately so tests don't need to sleep."""
+    with patch("obs_summarizer.scanner._RACY_WINDOW_NS", 0):
+        yield
+
+
+def _scan(vault, manifest):
+    return scan_vault(str(vault), exclude_globs=EXCLUDES, manifest=manifest)
+
+
+def test_load_manifest_missing(tmp_path):
+    """Missing manifest starts empty."""
+    assert load_manifest(tmp_path / "state.manifest.json") == new_manifest()
+
+
+def test_load_manifest_corrupt(tmp_path):
+    """Corrupt manifest is discarded rather than failing the run."""
+    path = tmp_path / "state.manifest.json"
+    path.write_text("not json {")
+    assert load_manifest(path) == new_manifest()
+
+
+def test_save_and_load_manifest_roundtrip(tmp_vault, tmp_path):
+    """Scanned manifest survives a save/load cycle."""
+    manifest = new_manifest()
+    _scan(tmp_vault, manifest)
+
+    path = tmp_path / "state.manifest.json"
+    save_manifest(manifest, path)
+    assert load_manifest(path) == manifest
+
+
+def test_first_scan_reports_all_new_without_hashing(tmp_vault):
+    """Bootstrap scan records stats only."""
+    manifest = new_manifest()
+    records, changes = _scan(tmp_vault, manifest)
+
+    assert {r.path.name for r in records} == {"article1.md", "article2.md"}
+    assert len(changes.new) == 3  # includes the empty note
+    assert all(entry["sha256"] is None for entry in manifest["files"].values())
+
+
+def test_unchanged_vault_skips_directory_listing(tmp_vault):
+    """Second scan of an unchanged vault never calls scandir."""
+    manifest = new_manifest()
+    first, _ = _scan(tmp_vault, manifest)
+
+    with patch("obs_summarizer.scanner.os.scandir") as mock_scandir:
+        second, changes = _scan(tmp_vault, manifest)
+
+    mock_scandir.assert_not_called()
+    assert second == first
+    assert changes == ([], [], [])
+
+
+def test_detects_new_changed_and_deleted_notes(tmp_vault):
+    """New, edited and removed notes are reported against the manifest."""
+    manifest = new_manifest()
+    _scan(tmp_vault, manifest)
+
+    (tmp_vault / "Clippings" / "article3.md").write_text("# New")
+    (tmp_vault / "Clippings" / "article1.md").write_text("# Edited\n\nDifferent body")
+    (tmp_vault / "Clippings" / "article2.md").unlink()
+
+    records, changes = _scan(tmp_vault, manifest)
+
+    assert {r.path.name for r in records} == {"article1.md", "article3.md"}
+    assert [p.name for p in changes.new] == ["article3.md"]
+    assert [p.name for p in changes.changed] == ["article1.md"]
+    assert [p.name for p in changes.deleted] == ["article2.md"]
+
+
+def test_touch_without_content_change_is_not_changed(tmp_vault):
+    """A bumped mtime with identical content is not reported as changed."""
+    note = tmp_vault / "Clippings" / "article1.md"
+    manifest = new_manifest()
+    _scan(tmp_vault, manifest)
+    # Edit once so the entry gets a content hash
+    note.write_text("# Article 1\n\nRevised.")
+    _scan(tmp_vault, manifest)
+
+    st = note.stat()
+    os.utime(note, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    _, changes = _scan(tmp_vault, manifest)
+
+    assert changes.changed == []
+    rel = "Clippings/article1.md"
+    assert manifest["files"][rel]["sha256"] == hash_file(note)
+    assert manifest["files"][rel]["mtime_ns"] == st.st_mtime_ns + 10**9
+
+
+def test_changed_exclude_globs_invalidate_manifest(tmp_vault):
+    """A manifest built with other settings is not reused."""
+    manifest = new_manifest()
+    _scan(tmp_vault, manifest)
+
+    records, _ = scan_vault(str(tmp_vault), exclude_globs=[], manifest=manifest)
+
+    assert "template.md" in {r.path.name for r in records}
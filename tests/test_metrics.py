@@ -0,0 +1,211 @@
+"""Tests for metrics module."""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from obs_summarizer.llm import LLMResponse
+from obs_summarizer.metrics import (
+    DEFAULT_LLM_PRICING,
+    RunMetrics,
+    append_report_history,
+    note_usage,
+    percentile,
+    response_cost,
+)
+
+
+def test_instrument_records_cache_tokens():
+    """Instrumented client passes responses through and sums cache usage."""
+    metrics = RunMetrics()
+    client = metrics.instrument(
+        lambda system, user: LLMResponse(content=user, cache_read_tokens=100, cache_write_tokens=5)
+    )
+
+    assert client("sys", "hello").content == "hello"
+    client("sys", "again")
+
+    assert metrics.llm_calls == 2
+    assert metrics.cache_read_tokens == 200
+    assert metrics.cache_write_tokens == 10
+
+
+def test_instrument_counts_failed_calls_and_their_retries():
+    """A call that fails after retrying still shows up in the usage counters."""
+    metrics = RunMetrics()
+    error = ConnectionError("down")
+    error.retries = 2
+
+    def failing(system, user):
+        raise error
+
+    with pytest.raises(ConnectionError):
+        metrics.instrument(failing)("sys", "hello")
+
+    assert metrics.failed_calls == 1
+    assert metrics.retries == 2
+    assert metrics.llm_calls == 0
+    assert metrics.thread_usage()["failed_calls"] == 1
+
+
+def test_record_response_is_thread_safe():
+    """Concurrent workers don't lose updates."""
+    metrics = RunMetrics()
+    response = LLMResponse(content="", cache_read_tokens=1)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: metrics.record_response(response), range(1000)))
+
+    assert metrics.llm_calls == 1000
+    assert metrics.cache_read_tokens == 1000
+
+
+def test_record_input_sums_budget_usage():
+    """Input budgeting totals estimated tokens and truncations."""
+    metrics = RunMetrics()
+    metrics.record_input(100, False)
+    metrics.record_input(4000, True)
+
+    assert metrics.notes_sent == 2
+    assert metrics.input_tokens_estimated == 4100
+    assert metrics.notes_truncated == 1
+
+
+def test_percentile_nearest_rank():
+    """Percentiles pick an observed sample by nearest rank."""
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 95) == 95.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_instrument_times_calls_per_thread():
+    """LLM call time is recorded as llm_network and summed for the calling thread."""
+    metrics = RunMetrics()
+    client = metrics.instrument(lambda system, user: (time.sleep(0.01), LLMResponse(content=""))[1])
+
+    client("sys", "a")
+    client("sys", "b")
+
+    assert metrics.stage_stats()["llm_network"]["count"] == 2
+    assert metrics.thread_network_seconds() >= 0.02
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(metrics.thread_network_seconds).result() == 0.0
+
+
+def test_instrument_splits_waits_from_network_time():
+    """Reported request time is llm_network; the rest of the call is llm_queue."""
+    metrics = RunMetrics()
+
+    def client(system, user):
+        time.sleep(0.02)
+        return LLMResponse(content="", network_seconds=0.005)
+
+    def failing(system, user):
+        time.sleep(0.02)
+        error = ConnectionError("down")
+        error.network_seconds = 0.005
+        raise error
+
+    metrics.instrument(client)("sys", "a")
+    with pytest.raises(ConnectionError):
+        metrics.instrument(failing)("sys", "b")
+
+    stats = metrics.stage_stats()
+    assert stats["llm_network"]["count"] == 2
+    assert stats["llm_network"]["total"] == pytest.approx(0.01)
+    assert stats["llm_queue"]["count"] == 2
+    assert stats["llm_queue"]["total"] >= 0.03
+
+
+def test_timed_iter_excludes_consumer_time():
+    """timed_iter counts time producing items, not time the consumer spends on them."""
+    metrics = RunMetrics()
+
+    def produce():
+        for _ in range(2):
+            time.sleep(0.01)
+            yield "x"
+
+    for _ in metrics.timed_iter("format", produce()):
+        time.sleep(0.05)
+
+    assert 0.02 <= metrics.stage_total("format") < 0.1
+
+
+def test_write_report(tmp_path):
+    """The report holds run fields, counters and per-stage percentiles in stage order."""
+    metrics = RunMetrics()
+    for seconds in (0.3, 0.1, 0.2):
+        metrics.record_time("read", seconds)
+    with metrics.time_stage("load_state"):
+        pass
+    metrics.record_input(100, False)
+
+    path = tmp_path / "state.report.json"
+    metrics.write_report(path, target_notes=3)
+    report = json.loads(path.read_text())
+
+    assert report["target_notes"] == 3
+    assert report["notes_sent"] == 1
+    assert list(report["stages"]) == ["load_state", "read"]
+    assert report["stages"]["read"] == {
+        "count": 3, "total": 0.6, "p50": 0.2, "p95": 0.3, "p99": 0.3, "max": 0.3
+    }
+
+
+def test_response_cost_uses_longest_prefix():
+    """Dated model IDs are priced by their family entry; unknown models have no cost."""
+    pricing = {**DEFAULT_LLM_PRICING, "claude-sonnet-4-6": {"input": 2.0, "output": 10.0}}
+    response = LLMResponse(
+        content="", input_tokens=1_000_000, output_tokens=100_000,
+        cache_read_tokens=1_000_000, model="claude-sonnet-4-5-20250929",
+    )
+
+    assert response_cost(response, pricing) == pytest.approx(3.0 + 1.5 + 0.3)
+    response.model = "claude-sonnet-4-6"
+    assert response_cost(response, pricing) == pytest.approx(2.0 + 1.0)
+    response.model = "llama-3.2-3b-instruct"
+    assert response_cost(response, pricing) is None
+
+
+def test_record_response_tracks_note_usage():
+    """Per-thread usage snapshots give one note's tokens, retries and cost."""
+    metrics = RunMetrics(pricing=DEFAULT_LLM_PRICING, model="claude-sonnet-4-6")
+    metrics.record_response(LLMResponse(content="", input_tokens=5000, model="other"))
+    before = metrics.thread_usage()
+    metrics.record_response(
+        LLMResponse(content="", input_tokens=1000, output_tokens=200, retries=2, latency_seconds=1.5)
+    )
+    metrics.record_response(LLMResponse(content="", input_tokens=1000, output_tokens=200))
+
+    usage = note_usage(before, metrics.thread_usage(), metrics.model)
+    assert usage == {
+        "model": "claude-sonnet-4-6",
+        "calls": 2,
+        "input_tokens": 2000,
+        "output_tokens": 400,
+        "cached_tokens": 0,
+        "cache_write_tokens": 0,
+        "retries": 2,
+        "latency_seconds": 1.5,
+        "cost_usd": pytest.approx(0.012),
+    }
+    # The unpriced "other" call leaves the run total cost unknown
+    assert metrics.unpriced_calls == 1
+    assert metrics.llm_calls == 3
+
+
+def test_append_report_history_keeps_last_runs(tmp_path):
+    """Reports are appended one per line; past keep, the oldest are dropped."""
+    path = tmp_path / "state.reports.jsonl"
+    for run in range(4):
+        append_report_history(path, {"run": run}, keep=3)
+
+    assert [json.loads(line)["run"] for line in path.read_text().splitlines()] == [1, 2, 3]
+
+    append_report_history(path, {"run": 4}, keep=1)
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{"run": 4}]
@@ -1,12 +1,17 @@
 """Tests for pipeline module."""
 
+import json
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, call, patch
 
 import pytest
 
+from obs_summarizer import pipeline
 from obs_summarizer.llm import LLMResponse
-from obs_summarizer.pipeline import run_pipeline
+from obs_summarizer.pipeline import run_pipeline, summarize_long_text
+from obs_summarizer.scanner import FileRecord
+from obs_summarizer.summarizer import MERGE_SUMMARY_SYSTEM_PROMPT
 
 
 def test_run_pipeline_no_files(sample_config, tmp_vault):
@@ -38,6 +43,18 @@ def _make_summary(path="/vault/note.md"):
     }
 
 
+def _mock_cache(*hits):
+    """Summary cache stand-in; hits are the cached summaries in lookup order (None = miss).
+
+    Only the first lookup hits; later ones (misses retried under their
+    legacy path+mtime keys) find nothing.
+    """
+    lookups = iter([hits])
+    cache = MagicMock()
+    cache.get_many.side_effect = lambda keys: {k: h for k, h in zip(keys, next(lookups, ())) if h}
+    return cache
+
+
 def test_run_pipeline_happy_path(sample_config, tmp_vault):
     """Happy path: file summarized, digest written, state saved, exit 0."""
     note = tmp_vault / "note.md"
@@ -45,14 +62,15 @@ def test_run_pipeline_happy_path(sample_config, tmp_vault):
 
     mock_summary = _make_summary(str(note))
     mock_llm = MagicMock()
+    cache = _mock_cache()
 
+    records = [FileRecord.from_path(note)]
     with patch("obs_summarizer.pipeline.create_llm_client", return_value=mock_llm), \
-         patch("obs_summarizer.pipeline.list_markdown_files", return_value=[note]), \
-         patch("obs_summarizer.pipeline.filter_files_since", return_value=[note]), \
-         patch("obs_summarizer.pipeline.load_cache", return_value=None), \
-         patch("obs_summarizer.pipeline.save_cache"), \
-         patch("obs_summarizer.pipeline.summarize_note", return_value=mock_summary), \
-         patch("obs_summarizer.pipeline.create_rollup", return_value="rollup text"), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", return_value=mock_summary), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup text"), \
          patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")) as mock_write, \
          patch("obs_summarizer.pipeline.save_state") as mock_save_state:
 
@@ -70,12 +88,13 @@ def test_run_pipeline_cache_hit(sample_config, tmp_vault):
     cached_summary = _make_summary(str(note))
     mock_llm = MagicMock()
 
+    records = [FileRecord.from_path(note)]
     with patch("obs_summarizer.pipeline.create_llm_client", return_value=mock_llm), \
-         patch("obs_summarizer.pipeline.list_markdown_files", return_value=[note]), \
-         patch("obs_summarizer.pipeline.filter_files_since", return_value=[note]), \
-         patch("obs_summarizer.pipeline.load_cache", return_value=cached_summary), \
-         patch("obs_summarizer.pipeline.summarize_note") as mock_summarize, \
-         patch("obs_summarizer.pipeline.create_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=_mock_cache(cached_summary)), \
+         patch("obs_summarizer.pipeline.summarize_text") as mock_summarize, \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
          patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
          patch("obs_summarizer.pipeline.save_state"):
 
@@ -94,14 +113,15 @@ def test_run_pipeline_summarization_failure_skips_file(sample_config, tmp_vault)
 
     summary_b = _make_summary(str(note_b))
     mock_llm = MagicMock()
+    cache = _mock_cache()
 
+    records = [FileRecord.from_path(note_a), FileRecord.from_path(note_b)]
     with patch("obs_summarizer.pipeline.create_llm_client", return_value=mock_llm), \
-         patch("obs_summarizer.pipeline.list_markdown_files", return_value=[note_a, note_b]), \
-         patch("obs_summarizer.pipeline.filter_files_since", return_value=[note_a, note_b]), \
-         patch("obs_summarizer.pipeline.load_cache", return_value=None), \
-         patch("obs_summarizer.pipeline.save_cache"), \
-         patch("obs_summarizer.pipeline.summarize_note", side_effect=[ValueError("bad json"), summary_b]), \
-         patch("obs_summarizer.pipeline.create_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=[ValueError("bad json"), summary_b]), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
          patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
          patch("obs_summarizer.pipeline.save_state"):
 
@@ -116,8 +136,9 @@ def test_run_pipeline_dry_run(sample_config, tmp_vault):
     note = tmp_vault / "note.md"
     note.write_text("# Test\nContent")
 
-    with patch("obs_summarizer.pipeline.list_markdown_files", return_value=[note]), \
-         patch("obs_summarizer.pipeline.filter_files_since", return_value=[note]), \
+    records = [FileRecord.from_path(note)]
+    with patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
          patch("obs_summarizer.pipeline.write_digest_note") as mock_write, \
          patch("obs_summarizer.pipeline.save_state") as mock_save_state:
 
@@ -139,16 +160,538 @@ def test_run_pipeline_cache_count_accurate(sample_config, tmp_vault):
     summary_b = _make_summary(str(note_b))
     mock_llm = MagicMock()
 
+    records = [FileRecord.from_path(note_a), FileRecord.from_path(note_b)]
     with patch("obs_summarizer.pipeline.create_llm_client", return_value=mock_llm), \
-         patch("obs_summarizer.pipeline.list_markdown_files", return_value=[note_a, note_b]), \
-         patch("obs_summarizer.pipeline.filter_files_since", return_value=[note_a, note_b]), \
-         patch("obs_summarizer.pipeline.load_cache", side_effect=[cached_a, None]), \
-         patch("obs_summarizer.pipeline.save_cache"), \
-         patch("obs_summarizer.pipeline.summarize_note", return_value=summary_b), \
-         patch("obs_summarizer.pipeline.create_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=_mock_cache(cached_a, None)), \
+         patch("obs_summarizer.pipeline.summarize_text", return_value=summary_b), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+         patch("obs_summarizer.pipeline.save_state"):
+
+        result = run_pipeline(sample_config)
+
+    assert result == 0
+
+
+def test_run_pipeline_concurrent_preserves_order(sample_config, tmp_vault):
+    """With several workers, summaries keep discovery order and counts stay exact."""
+    notes = []
+    for name in ("a", "b", "c", "d"):
+        note = tmp_vault / f"{name}.md"
+        note.write_text(f"# {name}")
+        notes.append(note)
+    records = [FileRecord.from_path(n) for n in notes]
+    sample_config["llm_concurrency"] = 4
+
+    def slow_first(llm, text, title):
+        # The first note finishes last
+        time.sleep(0.05 if title == "a" else 0)
+        if title == "c":
+            raise ValueError("bad json")
+        return _make_summary(title)
+
+    cache = _mock_cache(None, _make_summary("b"), None, None)
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=slow_first), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.iter_digest_markdown", return_value="digest") as mock_format, \
+         patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+         patch("obs_summarizer.pipeline.save_state"):
+
+        result = run_pipeline(sample_config)
+
+    assert result == 0
+    summaries = mock_format.call_args[0][0]
+    assert [s["path"] for s in summaries] == [str(notes[0]), str(notes[1]), str(notes[3])]
+    assert cache.put.call_count == 2
+    cache.close.assert_called_once()
+
+
+def test_run_pipeline_unexpected_error_fails_with_workers(sample_config, tmp_vault):
+    """Unexpected worker errors still fail the run."""
+    note = tmp_vault / "note.md"
+    note.write_text("# Test")
+    records = [FileRecord.from_path(note)]
+    sample_config["llm_concurrency"] = 2
+    cache = _mock_cache()
+
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=RuntimeError("boom")), \
+         patch("obs_summarizer.pipeline.write_digest_note") as mock_write:
+
+        result = run_pipeline(sample_config)
+
+    assert result == 1
+    mock_write.assert_not_called()
+
+
+def test_run_pipeline_batch_mode_falls_back_per_note(sample_config, tmp_vault):
+    """Batch results fill the cache; notes the batch missed go through summarize_text."""
+    note_a = tmp_vault / "a.md"
+    note_b = tmp_vault / "b.md"
+    note_a.write_text("# A")
+    note_b.write_text("# B")
+    records = [FileRecord.from_path(note_a), FileRecord.from_path(note_b)]
+
+    def batch_first_only(config, pending, state, metrics):
+        cache_key, record, text = pending[0]
+        return {cache_key: _make_summary(str(record.path))}
+
+    cache = _mock_cache()
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.run_summary_batch", side_effect=batch_first_only), \
+         patch("obs_summarizer.pipeline.summarize_text", return_value=_make_summary()) as mock_summarize, \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+         patch("obs_summarizer.pipeline.save_state"):
+
+        result = run_pipeline(sample_config, batch=True)
+
+    assert result == 0
+    assert mock_summarize.call_count == 1
+    assert mock_summarize.call_args[0][2] == "b"
+    assert cache.put_many.call_count == 1
+    assert cache.put.call_count == 1
+
+
+def test_run_pipeline_batch_mode_requires_claude(sample_config):
+    """Batch mode on another backend fails before any discovery or cache work."""
+    sample_config["llm_backend"] = "local"
+    with patch("obs_summarizer.pipeline.list_markdown_files") as mock_list:
+        assert run_pipeline(sample_config, batch=True) == 1
+    mock_list.assert_not_called()
+
+
+def test_summarize_records_batch_requires_state(sample_config):
+    """Batch mode checkpoints into the state, so it must be given one."""
+    with pytest.raises(ValueError, match="requires the pipeline state"):
+        pipeline.summarize_records(sample_config, [], MagicMock(), _mock_cache(), MagicMock(), batch=True)
+
+
+def test_run_pipeline_touched_note_keeps_cache_key(sample_config, tmp_vault):
+    """Cache keys follow note content, so a touch or move still hits the cache."""
+    note = tmp_vault / "note.md"
+    note.write_text("---\ntags: [a]\n---\n# Test\nContent")
+    lookups = []
+    cache = MagicMock()
+    cache.get_many.side_effect = lambda ks: lookups.append(list(ks)) or {}
+
+    def run_once(path):
+        records = [FileRecord.from_path(path)]
+        with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+             patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+             patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+             patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+             patch("obs_summarizer.pipeline.summarize_text", return_value=_make_summary()), \
+             patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+             patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+             patch("obs_summarizer.pipeline.save_state"):
+            assert run_pipeline(sample_config) == 0
+
+    run_once(note)
+    note.write_text("---\ntags: [a, b]\n---\n# Test\nContent")
+    run_once(note)
+    moved = note.rename(tmp_vault / "moved.md")
+    run_once(moved)
+
+    # Each run looks its miss up by content key, then by legacy key
+    keys = lookups[0::2]
+    assert len(keys) == 3
+    assert keys[0] == keys[1] == keys[2]
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_run_pipeline_rekeys_legacy_cache_entries(sample_config, tmp_vault, backend):
+    """Summaries cached under the old path+mtime key are re-keyed, not re-summarized."""
+    import hashlib
+
+    from obs_summarizer.cache import open_cache
+
+    note = tmp_vault / "note.md"
+    note.write_text("# Test\nContent")
+    record = FileRecord.from_path(note)
+    legacy_key = hashlib.sha256(f"{note}:{record.mtime_ns}".encode()).hexdigest()
+    cache_dir = Path(sample_config["cache_dir"])
+    cache_dir.mkdir(parents=True)
+    # As the original JSON cache wrote it
+    (cache_dir / f"{legacy_key}.json").write_text(json.dumps(_make_summary(str(note)), indent=2))
+    sample_config["cache_backend"] = backend
+
+    for _ in range(2):
+        with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+             patch("obs_summarizer.pipeline.list_markdown_files", return_value=[record]), \
+             patch("obs_summarizer.pipeline.filter_files_since", return_value=[record]), \
+             patch("obs_summarizer.pipeline.summarize_text") as mock_summarize, \
+             patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")):
+            assert run_pipeline(sample_config) == 0
+        mock_summarize.assert_not_called()
+
+    with open_cache(sample_config) as cache:
+        keys = [entry.key for entry in cache.entries()]
+    assert len(keys) == 1
+    assert keys != [legacy_key]
+
+
+def test_run_pipeline_key_index_skips_unchanged_reads(sample_config, tmp_vault):
+    """A note whose size and mtime match the key index is not re-read."""
+    note = tmp_vault / "note.md"
+    note.write_text("# Test\nContent")
+    records = [FileRecord.from_path(note)]
+
+    def run_once():
+        with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+             patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+             patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+             patch("obs_summarizer.pipeline.open_cache", return_value=_mock_cache(_make_summary())), \
+             patch("obs_summarizer.pipeline.read_note", wraps=pipeline.read_note) as mock_read, \
+             patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+             patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+             patch("obs_summarizer.pipeline.save_state"):
+            assert run_pipeline(sample_config) == 0
+        return mock_read.call_count
+
+    assert run_once() == 1
+    assert run_once() == 0
+
+
+def test_run_pipeline_auto_prunes_cache(sample_config, tmp_vault):
+    """cache_auto_prune evicts over-budget entries after the digest is written."""
+    note = tmp_vault / "note.md"
+    note.write_text("# Test\nContent")
+    records = [FileRecord.from_path(note)]
+    sample_config.update(cache_auto_prune=True, cache_max_entries=100)
+    cache = _mock_cache()
+
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", return_value=_make_summary()), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+         patch("obs_summarizer.pipeline.save_state"), \
+         patch("obs_summarizer.pipeline.prune_cache") as mock_prune:
+
+        result = run_pipeline(sample_config)
+
+    assert result == 0
+    mock_prune.assert_called_once_with(
+        cache, max_entries=100, max_bytes=None, max_age_days=None
+    )
+
+
+def _run_two_notes(sample_config, tmp_vault, cache):
+    """Run the pipeline over two fresh notes; returns (result, build_rollup mock, format mock)."""
+    notes = [tmp_vault / "a.md", tmp_vault / "b.md"]
+    for note in notes:
+        note.write_text(f"# {note.stem}")
+    records = [FileRecord.from_path(n) for n in notes]
+
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=lambda llm, text, title: _make_summary(title)), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="- Insight") as mock_rollup, \
+         patch("obs_summarizer.pipeline.iter_digest_markdown", return_value="digest") as mock_format, \
+         patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+         patch("obs_summarizer.pipeline.save_state"):
+        result = run_pipeline(sample_config)
+    return result, mock_rollup, mock_format
+
+
+def test_run_pipeline_rollup_feeds_digest(sample_config, tmp_vault):
+    """The rollup is built over all summaries with the run's cache and reaches the digest."""
+    cache = _mock_cache()
+    sample_config["rollup_chunk_tokens"] = 500
+
+    result, mock_rollup, mock_format = _run_two_notes(sample_config, tmp_vault, cache)
+
+    assert result == 0
+    args, kwargs = mock_rollup.call_args
+    assert [s["path"] for s in args[1]] == [str(tmp_vault / "a.md"), str(tmp_vault / "b.md")]
+    assert args[2] is cache
+    assert kwargs["max_tokens"] == 500
+    assert mock_format.call_args[1]["rollup"] == "- Insight"
+
+
+def test_run_pipeline_rollup_disabled(sample_config, tmp_vault):
+    """rollup: false skips the extra LLM call."""
+    sample_config["rollup"] = False
+
+    result, mock_rollup, mock_format = _run_two_notes(sample_config, tmp_vault, _mock_cache())
+
+    assert result == 0
+    mock_rollup.assert_not_called()
+    assert mock_format.call_args[1]["rollup"] is None
+
+
+def test_run_pipeline_reports_input_budget(sample_config, tmp_vault, capsys):
+    """Notes are cut to max_input_tokens and the run reports estimated input."""
+    note = tmp_vault / "note.md"
+    note.write_text("日本語" * 500)
+    records = [FileRecord.from_path(note)]
+    sample_config["max_input_tokens"] = 100
+    sent = []
+
+    def summarize(llm, text, title):
+        sent.append(text)
+        return _make_summary()
+
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=_mock_cache()), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=summarize), \
          patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
          patch("obs_summarizer.pipeline.save_state"):
 
         result = run_pipeline(sample_config)
 
     assert result == 0
+    assert sent[0].endswith("[... truncated]")
+    assert len(sent[0]) < 120
+    assert "1 truncated to max_input_tokens=100" in capsys.readouterr().err
+
+
+def test_run_pipeline_long_note_mode(sample_config, tmp_vault):
+    """With long_note_mode, only notes over budget are chunked; both are keyed stably."""
+    short = tmp_vault / "short.md"
+    short.write_text("# Short\nContent")
+    long = tmp_vault / "long.md"
+    long.write_text("# Book\n\n" + "highlight " * 3000)
+    records = [FileRecord.from_path(short), FileRecord.from_path(long)]
+    sample_config.update(long_note_mode=True, max_input_tokens=500)
+
+    def summarize(llm, text, title, *args, **kwargs):
+        return _make_summary(text)
+
+    def run_once():
+        cache = _mock_cache()
+        with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+             patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+             patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+             patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+             patch("obs_summarizer.pipeline.summarize_text", side_effect=summarize) as mock_short, \
+             patch("obs_summarizer.pipeline.summarize_long_text", side_effect=summarize) as mock_long, \
+             patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+             patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")), \
+             patch("obs_summarizer.pipeline.save_state"):
+            assert run_pipeline(sample_config) == 0
+        return mock_short, mock_long, [c.args[0] for c in cache.put.call_args_list]
+
+    mock_short, mock_long, keys = run_once()
+
+    assert mock_short.call_args.args[1] == "# Short\nContent"
+    long_text = mock_long.call_args.args[1]
+    assert not long_text.endswith("[... truncated]")
+    assert len(long_text) > sample_config["max_input_chars"]
+    assert mock_long.call_args.args[4] == "claude-sonnet-4-6"
+    assert mock_long.call_args.args[5] == 500
+
+    # The key index remembers the note is long, so the next run keys it the same way
+    assert run_once()[2] == keys
+
+
+def test_prefetch_summaries_caches_changed_notes(sample_config, tmp_vault, sample_state_dict):
+    """prefetch_summaries fills the cache with the given LLM client, skipping gone and empty notes."""
+    pipeline.save_state(sample_state_dict, sample_config["state_path"])
+    note = tmp_vault / "note.md"
+    note.write_text("# Test\nContent")
+    cache = _mock_cache()
+    cache.__enter__.return_value = cache
+    llm = MagicMock()
+
+    with patch("obs_summarizer.pipeline.create_llm_client") as mock_create, \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", return_value=_make_summary(str(note))) as mock_summarize, \
+         patch("obs_summarizer.pipeline.write_digest_note") as mock_write, \
+         patch("obs_summarizer.pipeline.save_state") as mock_save_state:
+        summarized = pipeline.prefetch_summaries(
+            sample_config, [note, note, tmp_vault / "empty.md", tmp_vault / "gone.md"], llm
+        )
+
+    assert summarized == 1
+    mock_create.assert_not_called()
+    assert mock_summarize.call_count == 1
+    cache.put.assert_called_once()
+    cache.__exit__.assert_called_once()
+    mock_write.assert_not_called()
+    mock_save_state.assert_not_called()
+
+
+def test_run_pipeline_writes_timing_report(sample_config, tmp_vault):
+    """Each run writes per-stage timings next to the state file and appends them to the history."""
+    note = tmp_vault / "note.md"
+    note.write_text("# Test\nContent")
+    records = [FileRecord.from_path(note)]
+
+    for _ in range(2):
+        with patch("obs_summarizer.pipeline.create_llm_client", return_value=MagicMock()), \
+             patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+             patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+             patch("obs_summarizer.pipeline.open_cache", return_value=_mock_cache()), \
+             patch("obs_summarizer.pipeline.summarize_text", return_value=_make_summary(str(note))):
+            assert run_pipeline(sample_config) == 0
+
+    report = json.loads((tmp_vault.parent / "state.report.json").read_text())
+    history = (tmp_vault.parent / "state.reports.jsonl").read_text().splitlines()
+    assert len(history) == 2
+    assert json.loads(history[-1]) == report
+    assert report["target_notes"] == 1
+    assert report["summarized"] == 1
+    assert report["digest_path"].endswith(".md")
+    assert report["wall_seconds"] > 0
+    for stage in ("load_state", "discovery", "filter", "read", "cache_lookup",
+                  "llm_queue", "llm_parse", "format", "write"):
+        assert report["stages"][stage]["count"] >= 1, stage
+
+
+def test_run_pipeline_accounts_usage_per_note(sample_config, tmp_vault, capsys, caplog):
+    """Each new summary carries its usage; the run prints totals and flags outliers."""
+    import json as _json
+
+    notes = []
+    for name in ("a", "b", "c", "huge"):
+        note = tmp_vault / f"{name}.md"
+        note.write_text(f"# {name}\nContent {name}")
+        notes.append(note)
+    records = [FileRecord.from_path(n) for n in notes]
+
+    def llm(system, user):
+        tokens = 50_000 if "Content huge" in user else 1000
+        return LLMResponse(
+            content=_json.dumps({"summary": "S", "bullets": [], "why_it_matters": "", "tags": ["t"]}),
+            input_tokens=tokens,
+            output_tokens=100,
+            model="claude-sonnet-4-6",
+        )
+
+    cache = _mock_cache()
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=llm), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"):
+        assert run_pipeline(sample_config) == 0
+
+    cached = {c.args[1]["path"]: c.args[1]["usage"] for c in cache.put.call_args_list}
+    usage = cached[str(tmp_vault / "a.md")]
+    assert usage["calls"] == 1
+    assert usage["input_tokens"] == 1000
+    assert usage["cost_usd"] == pytest.approx((1000 * 3.0 + 100 * 15.0) / 1e6)
+
+    err = capsys.readouterr().err
+    assert "✓ LLM usage: 53000 input + 0 cached + 400 output tokens, 0 retries, $0.1650" in err
+    assert "huge.md used 50100 tokens" in caplog.text
+    assert "a.md used" not in caplog.text
+
+
+def test_run_pipeline_circuit_breaker_checkpoints_and_resumes(sample_config, tmp_vault):
+    """A dead backend trips the breaker: no digest, checkpoint kept, next run resumes."""
+    notes = []
+    for name in ("a", "b", "c"):
+        note = tmp_vault / f"{name}.md"
+        note.write_text(f"# {name.upper()}")
+        notes.append(note)
+    records = [FileRecord.from_path(note) for note in notes]
+    sample_config["llm_breaker_failures"] = 1
+    Path(sample_config["state_path"]).write_text(json.dumps({"last_run_iso": "2026-01-01T00:00:00+00:00"}))
+
+    def summarize(llm, text, title):
+        llm("system", text)
+        return _make_summary(title)
+
+    down = MagicMock(side_effect=[LLMResponse(content="{}"), ConnectionError("refused")])
+    cache = _mock_cache()
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=down), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=cache), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=summarize), \
+         patch("obs_summarizer.pipeline.write_digest_note") as mock_write:
+
+        assert run_pipeline(sample_config) == 1
+
+    # The third note never reached the backend
+    assert down.call_count == 2
+    mock_write.assert_not_called()
+    cache.put.assert_called_once()
+    state = json.loads(Path(sample_config["state_path"]).read_text())
+    assert state["last_run_iso"] == "2026-01-01T00:00:00+00:00"
+    assert state["resume"]["done"] == 1
+    assert state["resume"]["pending"] == 2
+
+    back = MagicMock(return_value=LLMResponse(content="{}"))
+    with patch("obs_summarizer.pipeline.create_llm_client", return_value=back), \
+         patch("obs_summarizer.pipeline.list_markdown_files", return_value=records), \
+         patch("obs_summarizer.pipeline.filter_files_since", return_value=records), \
+         patch("obs_summarizer.pipeline.open_cache", return_value=_mock_cache(_make_summary())), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=summarize), \
+         patch("obs_summarizer.pipeline.build_rollup", return_value="rollup"), \
+         patch("obs_summarizer.pipeline.write_digest_note", return_value=Path("/vault/digest.md")):
+
+        assert run_pipeline(sample_config) == 0
+
+    # The note finished before the outage came from the cache
+    assert back.call_count == 2
+    state = json.loads(Path(sample_config["state_path"]).read_text())
+    assert "resume" not in state
+    assert state["last_run_iso"] != "2026-01-01T00:00:00+00:00"
+
+
+def _part_summary(name):
+    return {"summary": name, "bullets": [], "why_it_matters": "", "tags": [], "notable_quote": None}
+
+
+def test_summarize_long_text_caches_chunks():
+    """Chunks are summarized once; a second run only summarizes the new tail."""
+    text = "\n\n".join(f"## Part {i}\n\n" + f"text{i} " * 40 for i in range(4))
+    store = {}
+    cache = MagicMock()
+    cache.get_many.side_effect = lambda keys: {k: store[k] for k in keys if k in store}
+    cache.put.side_effect = store.__setitem__
+
+    calls = []
+
+    def llm(system, user):
+        calls.append(system)
+        if system == MERGE_SUMMARY_SYSTEM_PROMPT:
+            return LLMResponse(content=json.dumps(_part_summary("merged")))
+        return LLMResponse(content=json.dumps(_part_summary(user[-20:])))
+
+    result = summarize_long_text(llm, text, "Book", cache, "model", 60, concurrency=3)
+    first_parts = len(calls) - 1
+
+    assert result["summary"] == "merged"
+    assert first_parts == len(store) > 1
+    assert calls[-1] == MERGE_SUMMARY_SYSTEM_PROMPT
+
+    calls.clear()
+    summarize_long_text(llm, text + "\n\n## Part 4\n\n" + "tail " * 40, "Book", cache, "model", 60)
+
+    assert calls.count(MERGE_SUMMARY_SYSTEM_PROMPT) == 1
+    assert len(calls) - 1 <= 2
+
+
+def test_summarize_long_text_short_note_is_one_call():
+    """Text that fits one chunk is summarized directly, without a merge."""
+    mock_llm = MagicMock(return_value=LLMResponse(content=json.dumps(_part_summary("s"))))
+    cache = MagicMock()
+
+    result = summarize_long_text(mock_llm, "short note", "Note", cache, "model", 100)
+
+    assert result["summary"] == "s"
+    mock_llm.assert_called_once()
+    cache.get_many.assert_not_called()
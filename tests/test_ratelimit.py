@@ -0,0 +1,137 @@
+"""Tests for ratelimit module."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from obs_summarizer.ratelimit import RateLimiter, _reset_seconds, _retry_after, create_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_request_bucket_allows_burst_then_meters():
+    """60 requests/min allows a 10-second burst, then one request per second."""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, clock=clock)
+
+    assert [limiter._reserve(0) for _ in range(10)] == [0.0] * 10
+    assert limiter._reserve(0) == pytest.approx(1.0)
+    clock.now += 1
+    assert limiter._reserve(0) == 0.0
+
+
+def test_token_bucket_debt_and_settle():
+    """An oversized request goes through on a full bucket; later ones wait off the debt."""
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock)  # 1000-token burst
+
+    assert limiter._reserve(3000) == 0.0
+    assert limiter._reserve(100) == pytest.approx(21.0)  # 2100 tokens at 100/s
+
+    # The response was smaller than estimated: the difference is given back
+    limiter.settle(3000, 1000)
+    assert limiter._reserve(100) == pytest.approx(1.0)
+
+
+def test_acquire_sleeps_until_granted():
+    """acquire and acquire_async sleep for the wait the bucket reports."""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=6, clock=clock)  # capacity 1
+
+    def advance(seconds):
+        clock.now += seconds
+
+    async def advance_async(seconds):
+        advance(seconds)
+
+    with patch("obs_summarizer.ratelimit.time.sleep", side_effect=advance) as mock_sleep:
+        limiter.acquire()
+        limiter.acquire()
+    mock_sleep.assert_called_once_with(pytest.approx(10.0))
+
+    with patch("obs_summarizer.ratelimit.asyncio.sleep", side_effect=advance_async) as mock_sleep:
+        asyncio.run(limiter.acquire_async())
+    mock_sleep.assert_called_once_with(pytest.approx(10.0))
+
+
+def test_rate_limited_pauses_everyone_and_adopts_server_limits():
+    """retry-after pauses all callers; lower server limits replace configured ones."""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1000, clock=clock)
+    headers = {
+        "retry-after": "7",
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-requests-remaining": "0",
+        "anthropic-ratelimit-input-tokens-limit": "30000",
+        "anthropic-ratelimit-input-tokens-remaining": "12000",
+    }
+
+    assert limiter.on_rate_limited(headers) == 7.0
+    assert limiter.requests.per_minute == 50
+    assert limiter.tokens.per_minute == 30000
+    assert limiter._reserve(0) == pytest.approx(7.0)
+
+    clock.now += 7
+    assert limiter._reserve(0) == 0.0
+
+
+def test_observe_learns_quota_from_successful_responses():
+    """Headers on ordinary responses set limits before any 429, and an exhausted quota pauses."""
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    assert limiter.observe({
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-requests-remaining": "3",
+    }) == 0.0
+    assert limiter.requests.per_minute == 50
+    assert limiter.requests.level == 3
+    assert limiter.tokens is None
+
+    headers = {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "4s"}
+    assert limiter.observe(headers) == 4.0
+    assert limiter._reserve(0) == pytest.approx(4.0)
+
+
+def test_rate_limited_without_retry_after_uses_reset_time():
+    """With nothing remaining and no retry-after, the quota reset time sets the pause."""
+    limiter = RateLimiter(clock=FakeClock())
+    headers = {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m30s"}
+    assert limiter.on_rate_limited(headers) == 90.0
+
+
+def test_rate_limited_ignores_missing_headers():
+    """Errors without usable headers don't pause anyone."""
+    limiter = RateLimiter(clock=FakeClock())
+    assert limiter.on_rate_limited(None) == 0.0
+    assert limiter.on_rate_limited(object()) == 0.0
+    assert limiter._reserve(0) == 0.0
+
+
+def test_retry_after_http_date_without_zone():
+    """HTTP dates with an unknown zone ("-0000") are read as UTC instead of failing."""
+    assert _retry_after({"retry-after": "Sat, 01 Jan 2000 00:00:00 -0000"}) == 0.0
+    assert _retry_after({"retry-after": "Sat, 01 Jan 2000 00:00:00 GMT"}) == 0.0
+
+
+def test_reset_seconds_formats():
+    """Durations and RFC 3339 reset times are both understood."""
+    assert _reset_seconds({"x-ratelimit-reset-tokens": "20ms"}, ("x-ratelimit-reset-tokens",)) == 0.02
+    assert _reset_seconds(
+        {"anthropic-ratelimit-requests-reset": "2000-01-01T00:00:00Z"},
+        ("anthropic-ratelimit-requests-reset",),
+    ) == 0.0
+
+
+def test_create_rate_limiter_from_config():
+    """Unset limits leave those buckets off."""
+    limiter = create_rate_limiter({"llm_requests_per_minute": 50})
+    assert limiter.requests.per_minute == 50
+    assert limiter.tokens is None
@@ -0,0 +1,75 @@
+"""Tests for reader module."""
+
+import random
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from obs_summarizer import reader
+from obs_summarizer.reader import read_note, read_note_head
+from obs_summarizer.summarizer import normalize_note
+from obs_summarizer.tokens import InputBudget
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        "   \n\n",
+        "---\ntitle: T\n---\n\n  Body text  \n\n",
+        "---\ntitle: never closed\nBody",
+        "----\n---\nBody with --- inside\n---",
+        "  ---\nnot: frontmatter\n---\nBody",
+        "Line one\r\nLine two\rLine three\n",
+        "日本語のノート\n" * 20,
+    ],
+)
+@pytest.mark.parametrize("max_chars", [1, 5, 12, 1000])
+def test_read_note_matches_normalize_note(tmp_path, content, max_chars):
+    """Streaming read is identical to reading the whole file and normalizing."""
+    path = tmp_path / "note.md"
+    path.write_bytes(content.encode("utf-8"))
+    expected = normalize_note(path.read_text(encoding="utf-8", errors="ignore"), max_chars)
+
+    with patch.object(reader, "_READ_CHUNK", 4):
+        assert read_note(path, max_chars) == expected
+    assert read_note(path, max_chars) == expected
+
+
+def test_read_note_matches_normalize_note_randomized(tmp_path):
+    """Random notes, chunk sizes and budgets all match the in-memory path."""
+    rng = random.Random(0)
+    pieces = ["-", "---", "\n---\n", "a", "word ", " ", "\n", "\r\n", "\t", "日", "é"]
+    path = tmp_path / "note.md"
+    for _ in range(2000):
+        data = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30))).encode("utf-8")
+        if rng.random() < 0.1:
+            data += b"\xff\xfe"
+        path.write_bytes(data)
+        max_chars = rng.randint(1, 40)
+        budget = InputBudget(rng.randint(3, 20)) if rng.random() < 0.3 else None
+
+        expected = normalize_note(
+            path.read_text(encoding="utf-8", errors="ignore"), max_chars, budget
+        )
+        with patch.object(reader, "_READ_CHUNK", rng.randint(1, 8)):
+            assert read_note(path, max_chars, budget) == expected, data
+
+
+def test_read_note_head_bounded_memory(tmp_path):
+    """A huge note is not loaded whole."""
+    path = tmp_path / "dump.md"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("---\ntitle: dump\n---\n")
+        for _ in range(2000):
+            f.write("log line with some text\n" * 400)  # ~19 MB total
+
+    tracemalloc.start()
+    head = read_note_head(path, 16000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert head.truncated
+    assert len(head.text) == 16000
+    assert peak < 2 * 1024 * 1024
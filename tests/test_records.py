@@ -0,0 +1,89 @@
+"""Tests for records module."""
+
+import json
+
+import pytest
+
+from obs_summarizer.records import (
+    RECORD_MAGIC,
+    RecordFormat,
+    create_record_format,
+    decode_record,
+)
+
+SUMMARY = {
+    "summary": "Privacy — in the digital age",
+    "bullets": ["One", "Two"],
+    "why_it_matters": "日本語",
+    "tags": ["privacy"],
+    "notable_quote": None,
+}
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_record_roundtrip(compression):
+    """Records decode back to the same summary and carry a versioned header."""
+    record = RecordFormat("json", compression).encode(SUMMARY)
+
+    assert record.startswith(RECORD_MAGIC + b"\x01")
+    assert decode_record(record) == SUMMARY
+
+
+def test_record_is_smaller_than_pretty_json():
+    """Compact and compressed records beat the indented JSON layout."""
+    pretty = len(json.dumps(SUMMARY, indent=2).encode("utf-8"))
+    compact = RecordFormat().encode(SUMMARY)
+
+    assert len(compact) < pretty
+
+
+def test_decode_record_reads_legacy_json():
+    """Entries written before records existed still decode, as bytes or text."""
+    legacy = json.dumps(SUMMARY, indent=2)
+
+    assert decode_record(legacy) == SUMMARY
+    assert decode_record(legacy.encode("utf-8")) == SUMMARY
+
+
+def test_decode_record_is_independent_of_current_format():
+    """A record names its own encoding, so any format decodes it."""
+    record = RecordFormat("json", "zlib").encode(SUMMARY)
+    assert RecordFormat().matches(record) is False
+    assert decode_record(record) == SUMMARY
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        RECORD_MAGIC + b"\x09\x01\x00{}",
+        RECORD_MAGIC + b"\x01\x07\x00{}",
+        RECORD_MAGIC + b"\x01\x01\x01not zlib",
+        RECORD_MAGIC + b"\x01\x01\x00[1, 2]",
+        RECORD_MAGIC + b"\x01",
+        b"{broken",
+    ],
+)
+def test_decode_record_rejects_bad_records(raw):
+    """Corrupt, unknown or future records raise ValueError."""
+    with pytest.raises(ValueError):
+        decode_record(raw)
+
+
+def test_record_format_optional_packages():
+    """msgpack and zstd work when installed and explain themselves when not."""
+    for serializer, compression, module in (("msgpack", "none", "msgpack"), ("json", "zstd", "zstandard")):
+        try:
+            __import__(module)
+        except ImportError:
+            with pytest.raises(ValueError, match=module):
+                RecordFormat(serializer, compression)
+        else:
+            assert decode_record(RecordFormat(serializer, compression).encode(SUMMARY)) == SUMMARY
+
+
+def test_create_record_format_from_config():
+    """Config names map onto the format; unknown names are rejected."""
+    assert create_record_format({}) == RecordFormat("json", "none")
+    assert create_record_format({"cache_compression": "zlib"}).compression == "zlib"
+    with pytest.raises(ValueError, match="cache_serializer"):
+        create_record_format({"cache_serializer": "pickle"})
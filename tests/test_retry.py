@@ -0,0 +1,119 @@
+"""Tests for retry module."""
+
+import asyncio
+import random
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from obs_summarizer.retry import RetryPolicy, create_retry_policy
+
+
+class Transient(Exception):
+    pass
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def flaky(errors, result="ok"):
+    """A call that raises each of errors in turn, then returns result."""
+    remaining = list(errors)
+
+    def call():
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    return call
+
+
+def test_backoff_is_full_jitter_and_capped():
+    """Delays are drawn from [0, min(max_delay, base * 2**n)]."""
+    policy = RetryPolicy(base_delay=2, max_delay=5, rng=random.Random(1))
+    for retry, cap in ((0, 2), (1, 4), (2, 5), (6, 5)):
+        delays = [policy.backoff(retry) for _ in range(200)]
+        assert all(0 <= d <= cap for d in delays)
+        assert max(delays) > cap * 0.9
+
+
+def test_run_retries_retryable_errors():
+    """Retryable classes and statuses are retried; the retry count is returned."""
+    policy = RetryPolicy(max_attempts=3, retryable=(Transient,))
+    with patch("obs_summarizer.retry.time.sleep") as mock_sleep:
+        assert policy.run(flaky([Transient(), StatusError(503)])) == ("ok", 2)
+    assert mock_sleep.call_count == 2
+
+
+def test_run_gives_up_and_records_retries():
+    """Non-retryable errors raise at once; exhausted ones carry their retry count."""
+    policy = RetryPolicy(max_attempts=2, retryable=(Transient,))
+
+    with pytest.raises(StatusError) as excinfo:
+        policy.run(flaky([StatusError(400)]))
+    assert excinfo.value.retries == 0
+
+    with patch("obs_summarizer.retry.time.sleep"):
+        with pytest.raises(Transient) as excinfo:
+            policy.run(flaky([Transient(), Transient()]))
+    assert excinfo.value.retries == 1
+
+
+def test_run_stops_at_deadline():
+    """No retry starts if its backoff would end past the deadline."""
+    clock = [0.0]
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    policy = RetryPolicy(
+        max_attempts=10, base_delay=4, deadline=5, retryable=(Transient,), clock=lambda: clock[0]
+    )
+    with patch("obs_summarizer.retry.time.sleep", side_effect=sleep):
+        with pytest.raises(Transient) as excinfo:
+            policy.run(flaky([Transient()] * 10))
+    assert clock[0] <= 5
+    assert excinfo.value.retries < 9
+
+
+def test_hook_pause_replaces_backoff():
+    """When the hook reports a pause already imposed, the policy doesn't sleep too."""
+    seen = []
+
+    def on_retry(error):
+        seen.append(error)
+        return 3.0
+
+    policy = RetryPolicy(retryable=(Transient,))
+    with patch("obs_summarizer.retry.time.sleep") as mock_sleep:
+        assert policy.run(flaky([Transient()]), on_retry) == ("ok", 1)
+    mock_sleep.assert_not_called()
+    assert len(seen) == 1
+
+
+def test_run_async_uses_asyncio_sleep():
+    """The async variant backs off without blocking the event loop."""
+    policy = RetryPolicy(retryable=(Transient,))
+    call = AsyncMock(side_effect=[Transient(), "ok"])
+
+    with patch("obs_summarizer.retry.asyncio.sleep", new_callable=AsyncMock) as mock_sleep, \
+         patch("obs_summarizer.retry.time.sleep") as mock_blocking_sleep:
+        assert asyncio.run(policy.run_async(call)) == ("ok", 1)
+    assert mock_sleep.await_count <= 1
+    mock_blocking_sleep.assert_not_called()
+
+
+def test_create_retry_policy_from_config():
+    """Config settings map onto the policy; the backend supplies error classes."""
+    policy = create_retry_policy(
+        {"llm_retry_attempts": 5, "llm_retry_deadline": 60, "llm_retry_statuses": [503]},
+        (Transient,),
+    )
+    assert policy.max_attempts == 5
+    assert policy.deadline == 60
+    assert policy.is_retryable(Transient())
+    assert policy.is_retryable(StatusError(503))
+    assert not policy.is_retryable(StatusError(429))
@@ -0,0 +1,104 @@
+"""Tests for rollup module."""
+
+from obs_summarizer.cache import SqliteCache
+from obs_summarizer.llm import LLMResponse
+from obs_summarizer.rollup import build_rollup, chunk_items
+from obs_summarizer.summarizer import MERGE_ROLLUP_SYSTEM_PROMPT, rollup_cache_key
+from obs_summarizer.tokens import estimate_tokens_heuristic
+
+
+def _summaries(n, start=0):
+    return [
+        {
+            "summary": f"Article {i} " + "words " * 40,
+            "bullets": [f"Point {i}"],
+            "why_it_matters": "It matters.",
+            "tags": ["test"],
+            "path": f"/vault/{i}.md",
+        }
+        for i in range(start, start + n)
+    ]
+
+
+class _FakeLLM:
+    """Thread-safe LLM stand-in that records which prompts it saw."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, system, user):
+        self.calls.append(system)
+        return LLMResponse(content=f"- Insight {len(self.calls)}")
+
+    @property
+    def merges(self):
+        return sum(1 for system in self.calls if system == MERGE_ROLLUP_SYSTEM_PROMPT)
+
+
+def test_chunk_items_keeps_small_input_together():
+    """Items within budget stay in one chunk."""
+    items = [("0" * 64, "short"), ("f" * 64, "text")]
+    assert chunk_items(items, max_tokens=100) == [items]
+    assert chunk_items([], max_tokens=100) == []
+
+
+def test_chunk_items_respects_token_budget():
+    """Over budget, no chunk exceeds the cap (unless a single item does)."""
+    items = [(f"{i:064x}", "x" * 400) for i in range(1, 30)]
+    chunks = chunk_items(items, max_tokens=350)
+
+    assert [item for chunk in chunks for item in chunk] == items
+    assert len(chunks) > 1
+    assert all(sum(estimate_tokens_heuristic(t) for _, t in chunk) <= 350 for chunk in chunks)
+
+
+def test_chunk_items_min_items():
+    """Reduce levels always merge at least two items per chunk."""
+    items = [(f"{i:064x}", "x" * 4000) for i in range(1, 6)]
+    chunks = chunk_items(items, max_tokens=100, min_items=2)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+
+def test_build_rollup_single_chunk_is_one_cached_call(tmp_path):
+    """A digest that fits in one prompt is one call, cached under rollup_cache_key."""
+    llm = _FakeLLM()
+    summaries = _summaries(3)
+    with SqliteCache(tmp_path / "cache.sqlite3") as cache:
+        result = build_rollup(llm, summaries, cache, "model", max_tokens=8000)
+        again = build_rollup(llm, list(reversed(summaries)), cache, "model", max_tokens=8000)
+        stored = cache.get(rollup_cache_key(summaries, "model"))
+
+    assert result == again == "- Insight 1"
+    assert len(llm.calls) == 1
+    assert stored == {"rollup": "- Insight 1"}
+
+
+def test_build_rollup_tree_recomputes_one_branch(tmp_path):
+    """Large inputs map-reduce; adding a note only recomputes part of the tree."""
+    llm = _FakeLLM()
+    summaries = _summaries(60)
+    with SqliteCache(tmp_path / "cache.sqlite3") as cache:
+        build_rollup(llm, summaries, cache, "model", max_tokens=600, concurrency=4)
+        first_calls = len(llm.calls)
+        assert llm.merges >= 1
+        assert first_calls > llm.merges
+
+        # Unchanged input: everything from cache
+        build_rollup(llm, summaries, cache, "model", max_tokens=600, concurrency=4)
+        assert len(llm.calls) == first_calls
+
+        # One more note: a fraction of the tree
+        build_rollup(llm, summaries + _summaries(1, start=60), cache, "model", max_tokens=600)
+        recomputed = len(llm.calls) - first_calls
+        assert 1 <= recomputed < first_calls / 2
+
+
+def test_build_rollup_no_cache_recomputes(tmp_path):
+    """no_cache ignores cached nodes."""
+    llm = _FakeLLM()
+    summaries = _summaries(2)
+    with SqliteCache(tmp_path / "cache.sqlite3") as cache:
+        build_rollup(llm, summaries, cache, "model")
+        build_rollup(llm, summaries, cache, "model", no_cache=True)
+
+    assert len(llm.calls) == 2
@@ -1,18 +1,20 @@
 """Tests for scanner module."""
 
+import os
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
-from obs_summarizer.scanner import filter_files_since, list_markdown_files
+from obs_summarizer.scanner import FileRecord, filter_files_since, list_markdown_files
 
 
 def test_list_markdown_files_basic(tmp_vault):
     """Find all markdown files in vault."""
     files = list_markdown_files(str(tmp_vault))
 
-    file_names = {f.name for f in files}
+    file_names = {f.path.name for f in files}
     assert "article1.md" in file_names
     assert "article2.md" in file_names
     assert "template.md" in file_names
@@ -26,7 +28,7 @@ def test_list_markdown_files_exclude_globs(tmp_vault):
         exclude_globs=["**/.obsidian", "templates"],
     )
 
-    file_names = {f.name for f in files}
+    file_names = {f.path.name for f in files}
     assert "article1.md" in file_names
     assert "article2.md" in file_names
     assert "template.md" not in file_names  # Excluded by globs
@@ -39,7 +41,7 @@ def test_list_markdown_files_include_folders(tmp_vault):
         include_folders=["Clippings"],
     )
 
-    file_names = {f.name for f in files}
+    file_names = {f.path.name for f in files}
     assert "article1.md" in file_names
     assert "article2.md" in file_names
     assert "template.md" not in file_names  # Not in Clippings
@@ -55,7 +57,7 @@ def test_list_markdown_files_skip_symlinks(tmp_vault):
     symlink.symlink_to(tmp_vault / "Clippings" / "article1.md")
 
     files = list_markdown_files(str(tmp_vault), exclude_globs=["**/.obsidian/**", "**/templates/**"])
-    file_names = {f.name for f in files}
+    file_names = {f.path.name for f in files}
     assert "link.md" not in file_names
 
 
@@ -67,7 +69,7 @@ def test_list_markdown_files_sorted_by_mtime(tmp_vault):
     )
 
     # Verify sorted by mtime
-    mtimes = [f.stat().st_mtime for f in files]
+    mtimes = [f.mtime_ns for f in files]
     assert mtimes == sorted(mtimes)
 
 
@@ -123,5 +125,63 @@ def test_filter_files_since_sorted(tmp_vault):
     past = datetime.now(timezone.utc) - timedelta(hours=1)
     filtered = filter_files_since(all_files, past)
 
-    mtimes = [f.stat().st_mtime for f in filtered]
+    mtimes = [f.mtime_ns for f in filtered]
     assert mtimes == sorted(mtimes)
+
+
+def test_list_markdown_files_prunes_excluded_directories(tmp_vault):
+    """Excluded directories are never listed, at any depth."""
+    nested = tmp_vault / "Clippings" / ".obsidian" / "plugins"
+    nested.mkdir(parents=True)
+    (nested / "readme.md").write_text("plugin docs")
+
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(Path(path).name)
+        return real_scandir(path)
+
+    with patch("obs_summarizer.scanner.os.scandir", side_effect=recording_scandir):
+        files = list_markdown_files(
+            str(tmp_vault),
+            exclude_globs=["**/.obsidian/**", "**/templates/**"],
+        )
+
+    file_names = {f.path.name for f in files}
+    assert "readme.md" not in file_names
+    assert "template.md" not in file_names
+    assert ".obsidian" not in scanned
+    assert "plugins" not in scanned
+    assert "templates" not in scanned
+
+
+def test_list_markdown_files_exclude_file_glob(tmp_vault):
+    """File-level globs exclude individual notes."""
+    (tmp_vault / "Clippings" / "draft.tmp.md").write_text("draft")
+
+    files = list_markdown_files(str(tmp_vault), exclude_globs=["**/*.tmp.md"])
+
+    file_names = {f.path.name for f in files}
+    assert "draft.tmp.md" not in file_names
+    assert "article1.md" in file_names
+
+
+def test_list_markdown_files_returns_stat_records(tmp_vault):
+    """Records carry size, mtime and inode from a single lstat."""
+    files = list_markdown_files(str(tmp_vault))
+
+    for record in files:
+        st = record.path.lstat()
+        assert record.size == st.st_size
+        assert record.mtime_ns == st.st_mtime_ns
+        assert record.inode == st.st_ino
+
+
+def test_filter_files_since_does_not_stat(tmp_vault):
+    """Filtering works purely from the captured record fields."""
+    missing = FileRecord(tmp_vault / "gone.md", 10, 2_000_000_000 * 10**9, 1)
+    old = FileRecord(tmp_vault / "old.md", 10, 1_000_000_000 * 10**9, 2)
+
+    since = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    assert filter_files_since([missing, old], since) == [missing]
@@ -9,10 +9,16 @@ from obs_summarizer.llm import LLMResponse
 from obs_summarizer.summarizer import (
     _parse_json,
     create_rollup,
+    normalize_note,
+    rollup_cache_key,
+    split_note,
     strip_frontmatter,
     summarize_note,
+    summarize_text,
     truncate_to_chars,
+    truncate_to_tokens,
 )
+from obs_summarizer.tokens import InputBudget, estimate_tokens_heuristic
 
 
 def test_strip_frontmatter_with_yaml():
@@ -44,6 +50,69 @@ def test_truncate_to_chars_over_limit():
     assert "[... truncated]" in result
 
 
+def test_normalize_note_strips_and_truncates():
+    """Normalization drops frontmatter, outer whitespace and overflow."""
+    content = "---\ntitle: Test\n---\n\n  Body text that is long  \n"
+    assert normalize_note(content, 100) == "Body text that is long"
+    assert normalize_note(content, 4).startswith("Body")
+    assert "[... truncated]" in normalize_note(content, 4)
+
+
+def test_summarize_text_uses_text_as_is():
+    """summarize_text sends already-normalized text without re-processing."""
+    mock_llm = MagicMock(
+        return_value=LLMResponse(
+            json.dumps({"summary": "S", "bullets": [], "why_it_matters": "", "tags": []})
+        )
+    )
+
+    result = summarize_text(mock_llm, "---\nkept: yes\n---", "note")
+
+    assert result["summary"] == "S"
+    user_prompt = mock_llm.call_args[0][1]
+    assert "kept: yes" in user_prompt
+
+
+def test_truncate_to_tokens_within_budget():
+    """Text within both limits is returned unchanged."""
+    text = "Short note text"
+    assert truncate_to_tokens(text, InputBudget(100), max_chars=1000) == text
+
+
+def test_truncate_to_tokens_fits_budget():
+    """Cut text plus marker fits the token budget, ending on a word boundary."""
+    budget = InputBudget(50)
+    text = " ".join(f"word{i}" for i in range(200))
+
+    result = truncate_to_tokens(text, budget)
+
+    assert result.endswith("[... truncated]")
+    assert budget.estimate(result) <= 50
+    assert text.startswith(result[: -len("\n[... truncated]")] + " ")
+
+
+def test_truncate_to_tokens_cjk_cut_shorter():
+    """Dense CJK text is cut to fewer characters than English for the same budget."""
+    budget = InputBudget(100)
+    english = truncate_to_tokens("alpha beta gamma delta " * 200, budget)
+    cjk = truncate_to_tokens("日本語のテキスト" * 200, budget)
+    assert len(cjk) < len(english) / 3
+
+
+def test_truncate_to_tokens_char_ceiling():
+    """max_chars still caps the text, matching truncate_to_chars when tokens fit."""
+    text = "a b " * 100
+    assert truncate_to_tokens(text, InputBudget(10_000), max_chars=20) == truncate_to_chars(text, 20)
+
+
+def test_normalize_note_with_budget():
+    """A budget makes normalize_note cut by tokens."""
+    content = "---\ntitle: T\n---\n" + "日本語" * 1000
+    result = normalize_note(content, 16000, InputBudget(100))
+    assert result.startswith("日本語")
+    assert InputBudget(100).estimate(result) <= 100
+
+
 def test_parse_json_direct():
     """Direct JSON parse succeeds."""
     assert _parse_json('{"key": "value"}') == {"key": "value"}
@@ -207,3 +276,52 @@ def test_create_rollup_formats_summaries():
     assert "Article 2 summary" in user_message
     assert "Point 1" in user_message
     assert result == "# Digest\n\nFormatted content"
+
+
+def test_rollup_cache_key_ignores_order_and_metadata():
+    """Rollup keys depend on summary content only, not order or path."""
+    a = {"summary": "A", "bullets": ["x"], "why_it_matters": "w", "tags": ["t"], "path": "/a.md"}
+    b = {"summary": "B", "bullets": [], "why_it_matters": "", "tags": [], "path": "/b.md"}
+    moved_a = {**a, "path": "/moved.md", "mtime_utc": "2026-01-01T00:00:00+00:00"}
+
+    key = rollup_cache_key([a, b], "model")
+    assert rollup_cache_key([b, moved_a], "model") == key
+    assert rollup_cache_key([a, {**b, "summary": "B2"}], "model") != key
+    assert rollup_cache_key([a, b], "other-model") != key
+
+
+def test_split_note_at_headings_within_budget():
+    """Chunks end at headings, stay within budget and skip headings in code fences."""
+    sections = [f"# Section {i}\n\n" + "words " * 25 for i in range(6)]
+    fenced = "# Code\n\n```\n# not a heading\n" + "x = 1\n" * 10 + "```\n"
+    text = "\n\n".join(sections[:3] + [fenced] + sections[3:])
+
+    chunks = split_note(text, 60, estimate_tokens_heuristic)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens_heuristic(c) <= 60 for c in chunks)
+    assert all(c.startswith("# ") for c in chunks)
+    assert not any(c.startswith("# not a heading") for c in chunks)
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+
+
+def test_split_note_splits_oversized_section():
+    """A single section over budget is split at paragraphs, then at whitespace."""
+    text = "# Only\n\n" + "alpha " * 300 + "\n\n" + "beta " * 30
+
+    chunks = split_note(text, 50, estimate_tokens_heuristic)
+
+    assert len(chunks) > 2
+    assert all(estimate_tokens_heuristic(c) <= 50 for c in chunks)
+    assert chunks[-1].startswith("beta")
+
+
+def test_split_note_append_keeps_earlier_chunks():
+    """Appending to a note leaves every chunk before the tail unchanged."""
+    text = "\n\n".join(f"## Highlight {i}\n\n" + f"note{i} " * 25 for i in range(10))
+    appended = text + "\n\n## Highlight 10\n\n" + "new " * 25
+
+    before = split_note(text, 80, estimate_tokens_heuristic)
+    after = split_note(appended, 80, estimate_tokens_heuristic)
+
+    assert after[: len(before) - 1] == before[:-1]
@@ -0,0 +1,58 @@
+"""Tests for tokens module."""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from obs_summarizer.tokens import (
+    InputBudget,
+    create_input_budget,
+    estimate_tokens_heuristic,
+    resolve_estimator_name,
+)
+
+
+def test_heuristic_counts_cjk_per_character():
+    """CJK text costs about a token per character, unlike English prose."""
+    english = "The quick brown fox jumps over the lazy dog again and again."
+    japanese = "日本語のテキストはトークンが多い"
+
+    assert estimate_tokens_heuristic(english) < len(english) / 3
+    assert estimate_tokens_heuristic(japanese) == len(japanese)
+
+
+def test_heuristic_counts_symbols():
+    """Punctuation-dense code costs more per character than prose."""
+    code = "if (a[i] != b[j]) { x += y; }"
+    prose = "the quick brown fox jumps over"
+    assert estimate_tokens_heuristic(code) > estimate_tokens_heuristic(prose)
+    assert estimate_tokens_heuristic("") == 0
+
+
+def test_resolve_auto_estimator():
+    """auto picks the heuristic for claude, tiktoken for local when installed."""
+    assert resolve_estimator_name("auto", "claude") == "heuristic"
+    assert resolve_estimator_name("heuristic", "local") == "heuristic"
+    with patch.dict(sys.modules, {"tiktoken": None}):
+        assert resolve_estimator_name("auto", "local") == "heuristic"
+
+
+def test_tiktoken_estimator_requires_package():
+    """Selecting tiktoken without the package is a clear error."""
+    with patch.dict(sys.modules, {"tiktoken": None}):
+        with pytest.raises(ValueError, match="tiktoken"):
+            InputBudget(100, "tiktoken")
+
+
+def test_unknown_estimator_rejected():
+    """Unknown estimator names raise ValueError."""
+    with pytest.raises(ValueError, match="Unknown token_estimator"):
+        InputBudget(100, "wordcount")
+
+
+def test_create_input_budget_from_config():
+    """Budget settings come from config with defaults."""
+    budget = create_input_budget({"llm_backend": "claude", "max_input_tokens": 1234})
+    assert budget == InputBudget(1234, "heuristic")
+    assert budget.estimate("hello world") == 2
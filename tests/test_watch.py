@@ -0,0 +1,195 @@
+"""Tests for watch mode."""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from obs_summarizer.llm import LLMResponse
+from obs_summarizer.scanner import note_matcher
+from obs_summarizer.state import load_state
+from obs_summarizer.watch import (
+    ChangeSource,
+    Debouncer,
+    PollingSource,
+    create_change_source,
+    next_digest_time,
+    run_watch,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_debouncer_waits_for_quiet():
+    """A path is due only once delay seconds pass without another change."""
+    clock = FakeClock()
+    debouncer = Debouncer(5, clock=clock)
+    debouncer.add(["a.md"])
+    clock.now = 3
+    debouncer.add(["a.md", "b.md"])
+    assert debouncer.due() == []
+    assert debouncer.next_due_in() == 5
+
+    clock.now = 8
+    assert sorted(debouncer.due()) == ["a.md", "b.md"]
+    assert debouncer.due() == []
+    assert debouncer.next_due_in() is None
+
+
+def test_next_digest_time():
+    """The digest is scheduled today if the time is still ahead, else tomorrow."""
+    tz = timezone(timedelta(hours=2))
+    morning = datetime(2026, 3, 1, 6, 30, tzinfo=tz)
+    assert next_digest_time(morning, "07:00") == datetime(2026, 3, 1, 7, 0, tzinfo=tz)
+    assert next_digest_time(morning.replace(hour=7), "07:00") == datetime(2026, 3, 2, 7, 0, tzinfo=tz)
+
+
+def test_note_matcher(tmp_vault):
+    """note_matcher agrees with the scanner's include and exclude rules."""
+    matches = note_matcher(str(tmp_vault), ["Clippings"], ["**/drafts/**"])
+    assert matches(tmp_vault / "Clippings" / "article1.md")
+    assert matches(tmp_vault / "Clippings" / "new.md")  # need not exist
+    assert not matches(tmp_vault / "Clippings" / "image.png")
+    assert not matches(tmp_vault / "templates" / "template.md")
+    assert not matches(tmp_vault / "Clippings" / "drafts" / "draft.md")
+    assert not matches(tmp_vault.parent / "outside.md")
+
+
+def test_polling_source_reports_new_and_changed(sample_config, tmp_vault):
+    """Polling reports notes added or edited since the previous poll."""
+    source = PollingSource(sample_config, interval=0)
+    first = source.changes(0)
+    assert tmp_vault / "Clippings" / "article1.md" in first
+
+    assert source.changes(0) == []
+    note = tmp_vault / "Clippings" / "fresh.md"
+    note.write_text("# Fresh")
+    assert source.changes(0) == [note]
+    source.close()
+
+
+def test_create_change_source_without_watchdog(sample_config):
+    """auto falls back to polling; inotify without watchdog is an error."""
+    with patch.dict("sys.modules", {"watchdog": None, "watchdog.events": None, "watchdog.observers": None}):
+        assert isinstance(create_change_source(sample_config), PollingSource)
+        with pytest.raises(ValueError, match="watchdog"):
+            create_change_source({**sample_config, "watch_backend": "inotify"})
+    with pytest.raises(ValueError, match="Unknown watch_backend"):
+        create_change_source({**sample_config, "watch_backend": "fsevents"})
+
+
+class ScriptedSource(ChangeSource):
+    """Returns one batch of changes per call, then sets stop."""
+
+    def __init__(self, batches, stop, clock):
+        self.batches = list(batches)
+        self.stop = stop
+        self.clock = clock
+        self.closed = False
+
+    def changes(self, timeout):
+        self.clock.now += timeout
+        if not self.batches:
+            self.stop.set()
+            return []
+        return self.batches.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_run_watch_debounces_and_writes_digest(sample_config, tmp_vault):
+    """Edits are summarized once after the burst; the digest runs on schedule."""
+    config = {**sample_config, "watch_debounce_seconds": 5, "watch_digest_at": "07:00"}
+    note = tmp_vault / "Clippings" / "article1.md"
+    digest = tmp_vault / "Daily Digests" / "2026-03-01.md"
+    ignored = tmp_vault / "templates" / "template.md"
+
+    clock = FakeClock()
+    start = datetime(2026, 3, 1, 6, 59, 50, tzinfo=timezone.utc)
+    stop = threading.Event()
+    source = ScriptedSource([[note, ignored], [note], [digest]] + [[]] * 8, stop, clock)
+    llm = MagicMock()
+
+    with patch("obs_summarizer.watch.time.monotonic", clock), \
+         patch("obs_summarizer.watch.create_llm_client", return_value=llm) as mock_create, \
+         patch("obs_summarizer.watch.prefetch_summaries", return_value=1) as mock_prefetch, \
+         patch("obs_summarizer.watch.run_pipeline", return_value=0) as mock_run:
+        result = run_watch(
+            config, stop=stop, source=source, now=lambda: start + timedelta(seconds=clock.now)
+        )
+
+    assert result == 0
+    assert source.closed
+    mock_create.assert_called_once()
+    breaker = mock_prefetch.call_args.args[3]
+    mock_prefetch.assert_called_once_with(config, [note], llm, breaker)
+    mock_run.assert_called_once_with(config, llm_client=llm, breaker=breaker)
+    # Without a checkpoint, notes count from the start of the watch
+    assert load_state(config["state_path"])["last_run_iso"] == start.isoformat()
+
+
+def test_run_watch_checkpoints_when_breaker_opened_during_prefetch(sample_config, tmp_vault):
+    """A breaker tripped by a prefetch still stops the digest: no partial digest, checkpoint kept."""
+    config = {
+        **sample_config,
+        "watch_debounce_seconds": 0,
+        "watch_digest_at": "07:00",
+        "llm_breaker_failures": 1,
+        "llm_breaker_probe_seconds": 3600,
+    }
+    first = tmp_vault / "Clippings" / "article2.md"
+    second = tmp_vault / "Clippings" / "article1.md"
+    clock = FakeClock()
+    start = datetime(2026, 3, 1, 6, 59, 50, tzinfo=timezone.utc)
+    stop = threading.Event()
+    source = ScriptedSource([[first], [second]] + [[]] * 12, stop, clock)
+    llm = MagicMock(side_effect=[LLMResponse(content="{}"), ConnectionError("refused")])
+
+    def summarize(llm_client, text, title):
+        llm_client("system", text)
+        return {"summary": title, "bullets": [], "why_it_matters": "", "tags": [], "notable_quote": None}
+
+    with patch("obs_summarizer.watch.time.monotonic", clock), \
+         patch("obs_summarizer.watch.create_llm_client", return_value=llm), \
+         patch("obs_summarizer.pipeline.summarize_text", side_effect=summarize), \
+         patch("obs_summarizer.pipeline.write_digest_note") as mock_write:
+        result = run_watch(
+            config, stop=stop, source=source, now=lambda: start + timedelta(seconds=clock.now)
+        )
+
+    assert result == 0
+    # The second prefetch opened the circuit; the digest run never called the backend
+    assert llm.call_count == 2
+    mock_write.assert_not_called()
+    state = load_state(config["state_path"])
+    assert state["last_run_iso"] == start.isoformat()
+    assert state["resume"]["done"] == 1
+    assert state["resume"]["pending"] == 1
+
+
+def test_run_watch_survives_prefetch_errors(sample_config, tmp_vault):
+    """A failed summarization pass is logged and the watch continues."""
+    config = {**sample_config, "watch_debounce_seconds": 0}
+    note = tmp_vault / "Clippings" / "article1.md"
+    clock = FakeClock()
+    stop = threading.Event()
+    source = ScriptedSource([[note], [note]], stop, clock)
+    start = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+    with patch("obs_summarizer.watch.time.monotonic", clock), \
+         patch("obs_summarizer.watch.create_llm_client"), \
+         patch("obs_summarizer.watch.prefetch_summaries", side_effect=RuntimeError("boom")) as mock_prefetch, \
+         patch("obs_summarizer.watch.run_pipeline") as mock_run:
+        result = run_watch(config, stop=stop, source=source, now=lambda: start)
+
+    assert result == 0
+    assert mock_prefetch.call_count == 2
+    mock_run.assert_not_called()